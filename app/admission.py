@@ -0,0 +1,250 @@
+import asyncio
+import math
+import os
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 不受限制：健康检查、静态资源与限流器自身的统计
+EXEMPT_PREFIXES = ("/health", "/ready", "/static", "/admission")
+# 处理函数在事件循环上执行不定量同步查询的路由
+EXPENSIVE_ROUTES = (
+    ("GET", re.compile(r"^/events/?$")),
+    ("GET", re.compile(r"^/events/search$")),
+    ("GET", re.compile(r"^/stats$")),
+    ("GET", re.compile(r"^/recurring-events/\d+/instances$")),
+    ("POST", re.compile(r"^/availability/find$")),
+    ("DELETE", re.compile(r"^/events/by-(category|title)$")),
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """按客户端的令牌桶：每秒 ``rate`` 个请求，突发最多 ``burst`` 个"""
+
+    def __init__(self, rate: float, burst: float, *, max_clients: int = 10000) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, client: str, now: float) -> float:
+        """消耗一个令牌；允许时返回 0，否则返回距下一个可用令牌的秒数"""
+        tokens, stamp = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens < 1.0:
+            self._buckets[client] = (tokens, now)
+            return (1.0 - tokens) / self.rate
+        if client not in self._buckets and len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        self._buckets[client] = (tokens - 1.0, now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        # 已完全补满的桶没有需要保留的状态
+        full_after = self.burst / self.rate
+        self._buckets = {
+            client: (tokens, stamp)
+            for client, (tokens, stamp) in self._buckets.items()
+            if now - stamp < full_after
+        }
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """高开销请求的先进先出准入，排队长度与等待时间都有上限
+
+    处理函数在事件循环上同步执行查询，每个放行的请求都可能让提醒调度器推迟其整个耗时。
+    调度器持有 ``reserved()`` 期间暂扣 ``reserve`` 个名额（至少保留一个），
+    使其每一步最多等待这么多个处理函数。
+    """
+
+    def __init__(
+        self, limit: int, *, reserve: int = 0, queue_limit: int = 32, queue_timeout: float = 2.0
+    ) -> None:
+        self.limit = max(1, limit)
+        self.reserve = min(max(0, reserve), self.limit - 1)
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._reserved = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time = 0.05  # 请求耗时的指数滑动平均，用于 Retry-After
+        self.max_queue_wait = 0.0
+
+    def _can_admit(self) -> bool:
+        limit = self.limit - self.reserve if self._reserved else self.limit
+        return self._active < limit
+
+    def _retry_after(self) -> float:
+        return self._service_time * (len(self._waiters) + 1) / self.limit
+
+    async def acquire(self) -> None:
+        if self._can_admit() and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.queue_limit:
+            raise Overloaded(503, "Server busy, try again later", self._retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded(503, "Server busy, queue wait exceeded", self._retry_after()) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # 名额刚交接过来客户端就断开了
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.max_queue_wait = max(self.max_queue_wait, time.monotonic() - queued_at)
+
+    def release(self, duration: Optional[float] = None) -> None:
+        self._active -= 1
+        if duration is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * duration
+        self._wake_next()
+
+    def _wake_next(self) -> None:
+        while self._waiters and self._can_admit():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def reserved(self) -> AsyncIterator[None]:
+        self._reserved += 1
+        try:
+            yield
+        finally:
+            self._reserved -= 1
+            self._wake_next()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "queue_limit": self.queue_limit,
+            "queue_timeout_seconds": self.queue_timeout,
+            "reserve": self.reserve,
+            "reserved": bool(self._reserved),
+            "avg_service_seconds": round(self._service_time, 4),
+            "max_queue_wait_seconds": round(self.max_queue_wait, 4),
+        }
+
+
+class AdmissionControl:
+    """中间件与调度器共用的限流与高开销路由并发控制"""
+
+    def __init__(self, buckets: Optional[TokenBuckets], limiter: Optional[ConcurrencyLimiter]) -> None:
+        self.buckets = buckets
+        self.limiter = limiter
+        self.counters = {"requests": 0, "rate_limited": 0, "shed": 0, "expensive_admitted": 0}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionControl":
+        rate = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+        concurrency = int(os.getenv("EXPENSIVE_CONCURRENCY", "4"))
+        return cls(
+            TokenBuckets(rate, float(os.getenv("RATE_LIMIT_BURST", "40"))) if rate > 0 else None,
+            ConcurrencyLimiter(
+                concurrency,
+                reserve=int(os.getenv("EXPENSIVE_RESERVED_FOR_REMINDERS", str(max(0, concurrency - 1)))),
+                queue_limit=int(os.getenv("EXPENSIVE_QUEUE_LIMIT", "32")),
+                queue_timeout=float(os.getenv("EXPENSIVE_QUEUE_TIMEOUT", "2")),
+            )
+            if concurrency > 0
+            else None,
+        )
+
+    def reserved(self):
+        """调用方（提醒循环）运行期间暂扣高开销请求的名额"""
+        if self.limiter is None:
+            return nullcontext()
+        return self.limiter.reserved()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "rate_limit": {
+                "per_second": self.buckets.rate,
+                "burst": self.buckets.burst,
+                "clients": len(self.buckets),
+            }
+            if self.buckets is not None
+            else None,
+            "expensive": self.limiter.stats() if self.limiter is not None else None,
+        }
+
+
+def _is_expensive(method: str, path: str) -> bool:
+    return any(method == route_method and pattern.match(path) for route_method, pattern in EXPENSIVE_ROUTES)
+
+
+class AdmissionMiddleware:
+    """超限的客户端返回 429，过载时高开销请求返回 503
+
+    两种响应都带 ``Retry-After``。客户端按对端地址区分；在自带的 nginx 配置之后，
+    uvicorn 已从 ``X-Forwarded-For`` 取得该地址。
+    """
+
+    def __init__(self, app: ASGIApp, *, control: AdmissionControl) -> None:
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(EXEMPT_PREFIXES) or path == "/":
+            await self.app(scope, receive, send)
+            return
+        control = self.control
+        control.counters["requests"] += 1
+        if control.buckets is not None:
+            client = scope["client"][0] if scope.get("client") else "unknown"
+            wait = control.buckets.take(client, time.monotonic())
+            if wait > 0:
+                control.counters["rate_limited"] += 1
+                await _reject(Overloaded(429, "Too many requests", wait), scope, receive, send)
+                return
+        if control.limiter is None or not _is_expensive(scope["method"], path):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await control.limiter.acquire()
+        except Overloaded as exc:
+            control.counters["shed"] += 1
+            await _reject(exc, scope, receive, send)
+            return
+        control.counters["expensive_admitted"] += 1
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.limiter.release(time.monotonic() - started)
+
+
+async def _reject(exc: Overloaded, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse(
+        {"detail": exc.detail},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+    await response(scope, receive, send)
@@ -0,0 +1,70 @@
+import json
+import mimetypes
+import os
+from functools import lru_cache
+from typing import Dict
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .negotiation import acceptable_encodings
+
+STATIC_DIR = "app/static"
+MANIFEST_PATH = os.path.join(STATIC_DIR, "dist", "manifest.json")
+# 带内容指纹的构建产物（scripts/build_assets.py），文件名随内容变化
+HASHED_PREFIX = "dist/"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> Dict[str, str]:
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(logical_path: str) -> str:
+    """静态资源的 URL；存在构建产物时使用带指纹的文件名"""
+    return "/static/" + load_manifest().get(logical_path, logical_path)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """客户端接受时改为返回同名 ``.br``/``.gz`` 文件的 StaticFiles
+
+    按 Accept-Encoding 的 q 值依次尝试（q=0 的编码不使用），对应文件不存在时退回下一个，最后返回原文件。
+    """
+
+    encodings = {"br": ".br", "gzip": ".gz"}
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        accept_encoding = Headers(scope=scope).get("accept-encoding")
+        response = None
+        for encoding in acceptable_encodings(accept_encoding, self.encodings):
+            suffix = self.encodings[encoding]
+            try:
+                candidate = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            if candidate.status_code in (200, 304):
+                candidate.headers["content-encoding"] = encoding
+                media_type = mimetypes.guess_type(path)[0]
+                if media_type is not None:
+                    if media_type.startswith("text/") or media_type.endswith("javascript"):
+                        media_type += "; charset=utf-8"
+                    candidate.headers["content-type"] = media_type
+                response = candidate
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        # 无论最终是否返回压缩文件，响应内容都取决于 Accept-Encoding
+        response.headers.add_vary_header("Accept-Encoding")
+        is_hashed = path.replace(os.sep, "/").startswith(HASHED_PREFIX)
+        response.headers["cache-control"] = IMMUTABLE if is_hashed else REVALIDATE
+        return response
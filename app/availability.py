@@ -0,0 +1,84 @@
+"""
+空闲时段查找（扫描线）
+
+忙碌区间按开始时间有序输入，一次扫描合并；工作时段按指定时区逐日生成（跨夏令时按当地时间）。
+两者都是有序、互不重叠的区间表，双指针求差即得空闲区间，再在其中按步长取最早的若干时段。
+全程使用 UTC 纪元秒（int），不为中间结果创建 datetime。
+"""
+from datetime import datetime, time, timedelta
+from typing import Collection, Iterable, List, Tuple
+
+from .utils import get_zone
+
+Interval = Tuple[int, int]
+# (开始, 结束, 对齐基准)：基准为当天工作开始时刻，时段起点按步长从基准对齐
+Window = Tuple[int, int, int]
+
+
+def merge_busy(intervals: Iterable[Interval]) -> List[Interval]:
+    """合并按开始时间排序的忙碌区间（重叠或首尾相接即合并）"""
+    merged: List[Interval] = []
+    current_start = current_end = None
+    for start, end in intervals:
+        if current_end is not None and start <= current_end:
+            if end > current_end:
+                current_end = end
+            continue
+        if current_end is not None:
+            merged.append((current_start, current_end))
+        current_start, current_end = start, end
+    if current_end is not None:
+        merged.append((current_start, current_end))
+    return merged
+
+
+def working_windows(
+    window_start: datetime,
+    window_end: datetime,
+    *,
+    day_start: time,
+    day_end: time,
+    weekdays: Collection[int],
+    zone_name: str,
+) -> List[Window]:
+    """搜索窗口内每个工作日的工作时段（weekdays 为 ISO 星期，day_end 为 00:00 表示到当天结束）"""
+    zone = get_zone(zone_name)
+    lower, upper = int(window_start.timestamp()), int(window_end.timestamp())
+    windows: List[Window] = []
+    day = window_start.astimezone(zone).date()
+    last_day = window_end.astimezone(zone).date()
+    while day <= last_day:
+        if day.isoweekday() in weekdays:
+            opens = int(datetime.combine(day, day_start, tzinfo=zone).timestamp())
+            close_day = day + timedelta(days=1) if day_end == time(0) else day
+            closes = int(datetime.combine(close_day, day_end, tzinfo=zone).timestamp())
+            start, end = max(opens, lower), min(closes, upper)
+            if start < end:
+                windows.append((start, end, opens))
+        day += timedelta(days=1)
+    return windows
+
+
+def free_slots(busy: List[Interval], windows: List[Window], *, duration: int, step: int, limit: int) -> List[Interval]:
+    """最早的 limit 个可用时段：落在工作时段内、不与任何忙碌区间重叠，起点按 step 秒对齐"""
+    slots: List[Interval] = []
+    first = 0
+    for window_start, window_end, anchor in windows:
+        # 合并后的区间结束时间递增，已结束的区间对后续工作时段也不再相关
+        while first < len(busy) and busy[first][1] <= window_start:
+            first += 1
+        cursor = window_start
+        index = first
+        while cursor + duration <= window_end:
+            gap_end = min(busy[index][0], window_end) if index < len(busy) else window_end
+            slot = anchor + -(-(cursor - anchor) // step) * step
+            while slot + duration <= gap_end:
+                slots.append((slot, slot + duration))
+                if len(slots) >= limit:
+                    return slots
+                slot += step
+            if index >= len(busy) or busy[index][0] >= window_end:
+                break
+            cursor = max(cursor, busy[index][1])
+            index += 1
+    return slots
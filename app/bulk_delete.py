@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from . import crud, models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class BulkDeleteRunner:
+    """以后台任务按有限的 id 区间分段执行按分类/标题的批量删除
+
+    每段是一个单独的短事务（在工作线程中执行），同时推进任务游标，之后稍作停顿；
+    大批量清理不会长时间占用 SQLite 的写锁而卡住 API 写入或提醒调度器。
+    因关闭而中断的任务在下次启动时从游标处续跑。每段还会刷新任务心跳：心跳早于
+    ``stale_after_seconds`` 的 ``running`` 任务说明执行进程已退出（SIGKILL、OOM），
+    由任一存活 worker 的定期巡检重新认领。
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 500,
+        pause_seconds: float = 0.05,
+        stale_after_seconds: float = 60.0,
+    ) -> None:
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.owner = uuid.uuid4().hex
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    async def start(self) -> None:
+        self._stop_event.clear()
+        await self._resume_jobs()
+        self._sweeper = asyncio.create_task(self._sweep(), name="bulk-delete-sweep")
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        if self._sweeper is not None:
+            await self._sweeper
+            self._sweeper = None
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def submit(self, field: str, value: str) -> models.DeleteJob:
+        job = await asyncio.to_thread(self._create, field, value)
+        self._spawn(job.id, resume=False)
+        return job
+
+    async def _resume_jobs(self) -> None:
+        for job_id in await asyncio.to_thread(self._resumable):
+            if job_id not in self._tasks:
+                self._spawn(job_id, resume=True)
+
+    async def _sweep(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=self.stale_after_seconds / 2)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                return
+            try:
+                await self._resume_jobs()
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Bulk delete sweep failed: %s", exc)
+
+    def _stale_before(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.stale_after_seconds)
+
+    def _spawn(self, job_id: str, *, resume: bool) -> None:
+        task = asyncio.create_task(self._run(job_id, resume=resume), name="bulk-delete")
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str, *, resume: bool) -> None:
+        statuses = ("pending", "interrupted") if resume else ("pending",)
+        if not await asyncio.to_thread(self._claim, job_id, statuses, self._stale_before() if resume else None):
+            return  # 已被其他进程认领
+        try:
+            while True:
+                if self._stop_event.is_set():
+                    await asyncio.to_thread(self._finish, job_id, "interrupted", None)
+                    return
+                done = await asyncio.to_thread(self._delete_chunk, job_id)
+                if done:
+                    return
+                await asyncio.sleep(self.pause_seconds)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Bulk delete job %s failed: %s", job_id, exc)
+            await asyncio.to_thread(self._finish, job_id, "failed", str(exc))
+
+    def _resumable(self) -> list:
+        with SessionLocal() as db:
+            return crud.resumable_delete_jobs(db, stale_before=self._stale_before())
+
+    def _create(self, field: str, value: str) -> models.DeleteJob:
+        with SessionLocal() as db:
+            job = crud.create_delete_job(db, field=field, value=value)
+            db.expunge(job)
+            return job
+
+    def _claim(self, job_id: str, statuses: tuple, stale_before: Optional[datetime]) -> bool:
+        with SessionLocal() as db:
+            return crud.claim_delete_job(db, job_id, owner=self.owner, statuses=statuses, stale_before=stale_before)
+
+    def _delete_chunk(self, job_id: str) -> bool:
+        with SessionLocal() as db:
+            job = crud.get_delete_job(db, job_id)
+            if job is None:
+                return True
+            if job.claimed_by != self.owner:
+                # 心跳过期后（例如长时间停顿）已被其他 worker 认领
+                logger.warning("Bulk delete job %s was taken over by another worker", job_id)
+                return True
+            crud.delete_events_chunk(db, job, batch_size=self.batch_size)
+            if job.status == "completed":
+                logger.info("Bulk delete job %s removed %d events (%s=%r)", job.id, job.deleted, job.field, job.value)
+                return True
+            return False
+
+    def _finish(self, job_id: str, status: str, error: Optional[str]) -> None:
+        with SessionLocal() as db:
+            job = crud.get_delete_job(db, job_id)
+            if job is not None and job.claimed_by == self.owner:
+                crud.finish_delete_job(db, job, status=status, error=error)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from . import emailer, models
+from .schemas import CHANNEL_TARGETS
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """拉开调用间隔，每秒最多开始 ``rate_per_second`` 次"""
+
+    def __init__(self, rate_per_second: Optional[float]) -> None:
+        self._interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Channel:
+    """通知渠道；子类实现 ``target_for`` 与 ``_deliver``
+
+    现有渠道都是阻塞调用（smtplib、urllib），``_deliver`` 通过 ``asyncio.to_thread`` 放入默认线程池，
+    事件循环不被阻塞。``concurrency`` 限制同一渠道同时占用的线程数；各渠道之和应小于线程池大小
+    （默认 min(32, CPU 数 + 4)，归档与批量删除任务也使用该线程池），否则多出的投递在池中排队。
+    """
+
+    name = ""
+
+    def __init__(self, *, concurrency: int = 4, rate_per_second: Optional[float] = None) -> None:
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._limiter = RateLimiter(rate_per_second)
+
+    def target_for(self, event: models.Event) -> Optional[str]:
+        raise NotImplementedError
+
+    async def send(self, target: str, subject: str, body: str, events: List[models.Event]) -> None:
+        async with self._semaphore:
+            await self._limiter.wait()
+            await self._deliver(target, subject, body, events)
+
+    async def _deliver(self, target: str, subject: str, body: str, events: List[models.Event]) -> None:
+        raise NotImplementedError
+
+
+class EmailChannel(Channel):
+    name = "email"
+
+    def __init__(self, settings: emailer.SMTPSettings, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.settings = settings
+
+    def target_for(self, event: models.Event) -> Optional[str]:
+        return event.reminder_email
+
+    async def _deliver(self, target: str, subject: str, body: str, events: List[models.Event]) -> None:
+        await asyncio.to_thread(emailer.send_email, target, subject, body, self.settings)
+
+
+class WebhookChannel(Channel):
+    """向行程的 ``webhook_url``（例如本地聊天机器人）POST JSON"""
+
+    name = "webhook"
+
+    def __init__(self, *, timeout_seconds: float = 10.0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.timeout_seconds = timeout_seconds
+
+    def target_for(self, event: models.Event) -> Optional[str]:
+        return event.webhook_url
+
+    async def _deliver(self, target: str, subject: str, body: str, events: List[models.Event]) -> None:
+        payload = {
+            "subject": subject,
+            "body": body,
+            "events": [
+                {
+                    "id": event.id,
+                    "title": event.title,
+                    "location": event.location,
+                    "start_time": event.start_time.isoformat(),
+                    "end_time": event.end_time.isoformat(),
+                }
+                for event in events
+            ],
+        }
+        await asyncio.to_thread(self._post, target, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def _post(self, url: str, data: bytes) -> None:
+        import urllib.request
+
+        request = urllib.request.Request(
+            url,
+            data=data,
+            headers={"Content-Type": "application/json; charset=utf-8"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            response.read()
+
+
+def _env_rate(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def load_channels(smtp_settings: emailer.SMTPSettings) -> Dict[str, Channel]:
+    channels: List[Channel] = [
+        EmailChannel(
+            smtp_settings,
+            concurrency=int(os.getenv("EMAIL_CONCURRENCY", "4")),
+            rate_per_second=_env_rate("EMAIL_RATE_LIMIT"),
+        ),
+        WebhookChannel(
+            concurrency=int(os.getenv("WEBHOOK_CONCURRENCY", "8")),
+            rate_per_second=_env_rate("WEBHOOK_RATE_LIMIT"),
+            timeout_seconds=float(os.getenv("WEBHOOK_TIMEOUT", "10")),
+        ),
+    ]
+    return {channel.name: channel for channel in channels}
+
+
+def channel_names_for(event: models.Event) -> List[str]:
+    """行程指定的渠道；未指定时为所有已填写目标的渠道"""
+    if not event.notification_channels:
+        return [name for name, field in CHANNEL_TARGETS.items() if getattr(event, field)]
+    return [name.strip() for name in event.notification_channels.split(",") if name.strip()]
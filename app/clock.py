@@ -0,0 +1,68 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+
+class Clock:
+    """提醒调度器使用的真实时钟"""
+
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        """等待 ``event`` 被设置或超过 ``timeout`` 秒，返回是否已设置"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class VirtualClock(Clock):
+    """模拟用的确定性时钟：等待时时间立即推进
+
+    ``wait`` 直接跳到截止时间与下一个 ``call_at`` 回调中较早的那个（回调在其虚拟时间执行，
+    例如注入一次唤醒调度器的写入）。到达 ``freeze_at`` 后时间停止，``wait`` 只在事件
+    被设置时返回，模拟因此有确定的终点。
+    """
+
+    def __init__(self, start: datetime, *, freeze_at: Optional[datetime] = None) -> None:
+        self._now = start
+        self.freeze_at = freeze_at
+        self._timers: List[Tuple[datetime, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self.frozen = asyncio.Event()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def call_at(self, when: datetime, callback: Callable[[], None]) -> None:
+        heapq.heappush(self._timers, (when, next(self._sequence), callback))
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        deadline = self._now + timedelta(seconds=timeout)
+        while True:
+            # 先让出控制权，上一步安排的回调（如唤醒）先执行
+            await asyncio.sleep(0)
+            if event.is_set():
+                return True
+            if self.freeze_at is not None and self._now >= self.freeze_at:
+                self.frozen.set()
+                await event.wait()
+                return True
+            if self._timers and self._timers[0][0] <= deadline:
+                when, _, callback = heapq.heappop(self._timers)
+                self._advance(when)
+                callback()
+                continue
+            self._advance(deadline)
+            if self.freeze_at is None or self._now < self.freeze_at:
+                return False
+
+    def _advance(self, when: datetime) -> None:
+        if self.freeze_at is not None:
+            when = min(when, self.freeze_at)
+        self._now = max(self._now, when)
+
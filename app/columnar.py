@@ -0,0 +1,85 @@
+"""
+行程列表的列式紧凑表示（Accept: application/vnd.calendar4me.columnar+json）
+
+同一系列的实例重复携带标题、备注、地点等字符串。列式格式把字符串放入字典、
+各列只存字典下标，时间列存 UTC 纪元秒，显著减小体积并加快前端解析：
+
+    {
+      "format": "columnar-v1",
+      "count": 2,
+      "strings": ["自然语言处理", "107", ...],
+      "columns": {
+        "id": [1, 2],
+        "title": [0, 0],            # strings 下标，null 表示空值
+        "start_time": [1757896200, 1758501000],   # UTC 纪元秒
+        ...
+      }
+    }
+"""
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from .negotiation import media_type_quality, parse_qvalues
+
+if TYPE_CHECKING:
+    from . import models
+
+MEDIA_TYPE = "application/vnd.calendar4me.columnar+json"
+FORMAT_VERSION = "columnar-v1"
+
+STRING_COLUMNS = (
+    "title",
+    "description",
+    "category",
+    "location",
+    "reminder_email",
+    "notification_channels",
+    "webhook_url",
+    "recurrence_rule",
+    "timezone",
+)
+TIME_COLUMNS = ("start_time", "end_time", "recurrence_end_date", "created_at", "updated_at")
+PLAIN_COLUMNS = ("id", "reminder_minutes_before", "parent_event_id", "series_id")
+FLAG_COLUMNS = ("reminder_sent", "is_recurring")
+
+
+def accepts_columnar(accept_header: Optional[str]) -> bool:
+    """客户端明确列出列式格式（q > 0，通配符不算），且其 q 不低于普通 JSON 时返回列式"""
+    qualities = parse_qvalues(accept_header)
+    quality = qualities.get(MEDIA_TYPE, 0.0)
+    return quality > 0 and quality >= media_type_quality(qualities, "application/json")
+
+
+def _epoch(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else int(value.timestamp())
+
+
+def encode_events(events: Iterable["models.Event"]) -> dict:
+    strings: List[str] = []
+    index: Dict[str, int] = {}
+    columns: Dict[str, list] = {
+        name: [] for name in (*PLAIN_COLUMNS, *STRING_COLUMNS, *TIME_COLUMNS, *FLAG_COLUMNS)
+    }
+
+    def intern(value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(strings)
+            strings.append(value)
+        return position
+
+    count = 0
+    for event in events:
+        count += 1
+        for name in PLAIN_COLUMNS:
+            columns[name].append(getattr(event, name))
+        for name in STRING_COLUMNS:
+            columns[name].append(intern(getattr(event, name)))
+        for name in TIME_COLUMNS:
+            columns[name].append(_epoch(getattr(event, name)))
+        for name in FLAG_COLUMNS:
+            columns[name].append(1 if getattr(event, name) else 0)
+
+    return {"format": FORMAT_VERSION, "count": count, "strings": strings, "columns": columns}
@@ -0,0 +1,114 @@
+import gzip
+import os
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .negotiation import choose_encoding
+
+try:  # 可选：CPU 开销相近时 brotli 压缩的 JSON 明显小于 gzip
+    import brotli
+except ImportError:  # pragma: no cover - 取决于部署环境
+    brotli = None
+
+# 同等偏好时优先 brotli
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith("+json")
+
+
+class CompressionMiddleware:
+    """按协商结果对超过 ``minimum_size`` 字节的响应做 brotli/gzip 压缩
+
+    已带 Content-Encoding（如预压缩的静态文件）或非文本类型的响应原样通过。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def from_env(cls, app: ASGIApp) -> "CompressionMiddleware":
+        return cls(
+            app,
+            minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+            gzip_level=int(os.getenv("COMPRESSION_LEVEL", "6")),
+            brotli_quality=int(os.getenv("BROTLI_QUALITY", "4")),
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), ENCODINGS)
+        if encoding is None:
+            await self.app(scope, receive, self._vary_only(send))
+            return
+
+        start_message: Optional[Message] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(send, start_message, b"".join(chunks), encoding)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _vary_only(send: Send) -> Send:
+        """不压缩时仍为可压缩的响应声明 Vary，避免共享缓存把未压缩的版本当作唯一版本"""
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if "content-encoding" not in headers and is_compressible(headers.get("content-type", "")):
+                    headers.add_vary_header("Accept-Encoding")
+            await send(message)
+
+        return send_wrapper
+
+    async def _finish(self, send: Send, start_message: Message, body: bytes, encoding: str) -> None:
+        headers = MutableHeaders(raw=start_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if len(body) >= self.minimum_size and start_message["status"] not in (204, 304):
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(body))
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
@@ -1,24 +1,57 @@
+import heapq
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Tuple
 
-from sqlalchemy import asc
+from sqlalchemy import and_, asc, func, insert, or_, select
 from sqlalchemy.orm import Session
 
-from . import models, schemas
+from . import models, schemas, search, wakeup
+from .occurrences import occurrence_cache, to_intervals
 from .utils import (
-    generate_recurrence_dates,
+    DEFAULT_TIMEZONE,
+    get_zone,
     create_rrule_string,
     parse_ical_rrule,
     get_week_number,
 )
 
 
+def _validate_reminder_fields(
+    reminder_minutes_before: Optional[int],
+    reminder_email: Optional[str],
+    webhook_url: Optional[str],
+    notification_channels: Optional[str] = None,
+) -> None:
+    has_target = reminder_email is not None or webhook_url is not None
+    if reminder_minutes_before is not None and not has_target:
+        raise ValueError("Reminder email or webhook URL must be supplied when setting reminder minutes")
+    if has_target and reminder_minutes_before is None:
+        raise ValueError("Reminder minutes must be supplied when reminder email is set")
+    _validate_channel_targets(notification_channels, reminder_email, webhook_url)
+
+
+def _validate_channel_targets(
+    notification_channels: Optional[str],
+    reminder_email: Optional[str],
+    webhook_url: Optional[str],
+) -> None:
+    """指定的渠道必须有投递目标，否则该渠道的提醒会被静默丢弃"""
+    missing = schemas.channels_without_target(
+        notification_channels, {"reminder_email": reminder_email, "webhook_url": webhook_url}
+    )
+    if missing:
+        raise ValueError(f"Notification channel(s) without a target: {', '.join(missing)}")
+
+
 def create_event(db: Session, event_in: schemas.EventCreate) -> models.Event:
     """创建单个事件"""
-    if event_in.reminder_minutes_before is not None and event_in.reminder_email is None:
-        raise ValueError("Reminder email must be supplied when setting reminder minutes")
-    if event_in.reminder_email is not None and event_in.reminder_minutes_before is None:
-        raise ValueError("Reminder minutes must be supplied when reminder email is set")
+    _validate_reminder_fields(
+        event_in.reminder_minutes_before,
+        event_in.reminder_email,
+        event_in.webhook_url,
+        event_in.notification_channels,
+    )
 
     event = models.Event(
         title=event_in.title,
@@ -30,12 +63,17 @@ def create_event(db: Session, event_in: schemas.EventCreate) -> models.Event:
         reminder_minutes_before=event_in.reminder_minutes_before,
         reminder_email=event_in.reminder_email,
         reminder_sent=False,
+        notification_channels=event_in.notification_channels,
+        webhook_url=event_in.webhook_url,
         is_recurring=event_in.is_recurring or False,
         recurrence_rule=event_in.recurrence_rule,
         recurrence_end_date=event_in.recurrence_end_date,
         parent_event_id=None,
+        timezone=event_in.timezone,
     )
     db.add(event)
+    if event.reminder_minutes_before is not None:
+        wakeup.publish(db)
     db.commit()
     db.refresh(event)
     return event
@@ -43,19 +81,11 @@ def create_event(db: Session, event_in: schemas.EventCreate) -> models.Event:
 
 def create_recurring_event(db: Session, event_in: schemas.RecurringEventCreate) -> List[models.Event]:
     """创建周期性事件"""
-    if event_in.reminder_minutes_before is not None and event_in.reminder_email is None:
-        raise ValueError("Reminder email must be supplied when setting reminder minutes")
-    if event_in.reminder_email is not None and event_in.reminder_minutes_before is None:
-        raise ValueError("Reminder minutes must be supplied when reminder email is set")
-
-    # 生成重复日期
-    recurrence_dates = generate_recurrence_dates(
-        start_date=event_in.start_time,
-        end_date=event_in.end_time,
-        frequency=event_in.recurrence_frequency,
-        interval=event_in.recurrence_interval,
-        until_date=event_in.recurrence_end_date,
-        count=event_in.recurrence_count
+    _validate_reminder_fields(
+        event_in.reminder_minutes_before,
+        event_in.reminder_email,
+        event_in.webhook_url,
+        event_in.notification_channels,
     )
 
     # 创建RRULE字符串
@@ -66,60 +96,92 @@ def create_recurring_event(db: Session, event_in: schemas.RecurringEventCreate)
         count=event_in.recurrence_count
     )
 
-    events = []
-    parent_event = None
+    # 生成重复日期（经展开缓存）；按本地墙上时间展开，未指定时区时使用 DEFAULT_TIMEZONE，
+    # 否则夏令时地区的系列会在切换后整体偏移一小时
+    tz_name = event_in.timezone or DEFAULT_TIMEZONE
+    duration = event_in.end_time - event_in.start_time
+    starts = occurrence_cache.starts(rrule, event_in.start_time, duration, tz=tz_name)
+    recurrence_dates = to_intervals(starts, duration)
 
-    for i, (start_time, end_time) in enumerate(recurrence_dates):
-        event = models.Event(
-            title=event_in.title,
-            description=event_in.description,
-            category=event_in.category,
-            location=event_in.location,
+    if not recurrence_dates:
+        return []
+
+    # 共享属性只写入 series 一行，实例行仅保存时间与系列引用
+    series = models.Series(
+        title=event_in.title,
+        description=event_in.description,
+        category=event_in.category,
+        location=event_in.location,
+        reminder_minutes_before=event_in.reminder_minutes_before,
+        reminder_email=event_in.reminder_email,
+        notification_channels=event_in.notification_channels,
+        webhook_url=event_in.webhook_url,
+        recurrence_rule=rrule,
+        recurrence_end_date=event_in.recurrence_end_date,
+        timezone=tz_name,
+    )
+    db.add(series)
+    db.flush()
+
+    def build(start_time: datetime, end_time: datetime) -> models.Event:
+        return models.Event(
+            series_id=series.id,
             start_time=start_time,
             end_time=end_time,
-            reminder_minutes_before=event_in.reminder_minutes_before,
-            reminder_email=event_in.reminder_email,
             reminder_sent=False,
             is_recurring=True,
-            recurrence_rule=rrule if i == 0 else None,  # 只在第一个事件中存储RRULE
-            recurrence_end_date=event_in.recurrence_end_date,
-            parent_event_id=None if i == 0 else (parent_event.id if parent_event else None),
         )
-        
-        db.add(event)
-        db.commit()
-        db.refresh(event)
-        
-        if i == 0:
-            parent_event = event
-            # 更新父事件的parent_event_id为自己
-            parent_event.parent_event_id = parent_event.id
-            db.commit()
-            db.refresh(parent_event)
-        
+
+    # 先写入父事件以获得ID，其余实例在同一事务中批量插入
+    first_start, first_end = recurrence_dates[0]
+    parent_event = build(first_start, first_end)
+    db.add(parent_event)
+    db.flush()
+    parent_event.parent_event_id = parent_event.id
+
+    events = [parent_event]
+    for start_time, end_time in recurrence_dates[1:]:
+        event = build(start_time, end_time)
+        event.parent_event_id = parent_event.id
         events.append(event)
+    db.add_all(events[1:])
+    if series.reminder_minutes_before is not None:
+        wakeup.publish(db)
+    db.commit()
+    db.refresh(parent_event)
+    models.hydrate_series([parent_event])
 
     return events
 
 
+def _split_ical_tzid(value: str) -> Tuple[Optional[str], str]:
+    """拆分 "TZID=<zone>:<time>" 形式的时间值，以Z结尾的时间视为UTC"""
+    if value.startswith('TZID=') and ':' in value:
+        tzid, time_str = value[len('TZID='):].split(':', 1)
+        return tzid, time_str
+    if value.endswith('Z'):
+        return 'UTC', value[:-1]
+    return None, value
+
+
 def create_recurring_event_from_ical(db: Session, ical_data: dict) -> List[models.Event]:
     """从iCal数据创建周期性事件"""
     # 解析RRULE
     rrule_data = parse_ical_rrule(ical_data.get('RRULE', ''))
     
-    # 解析时间
-    start_time_str = ical_data.get('DTSTART', '').replace('TZID=Asia/Shanghai:', '')
-    end_time_str = ical_data.get('DTEND', '').replace('TZID=Asia/Shanghai:', '')
+    # 解析时间（DTSTART/DTEND 形如 "TZID=Asia/Shanghai:20250915T080000"）
+    start_tz, start_time_str = _split_ical_tzid(ical_data.get('DTSTART', ''))
+    end_tz, end_time_str = _split_ical_tzid(ical_data.get('DTEND', ''))
+    tz_name = start_tz or end_tz or DEFAULT_TIMEZONE
     
     if not start_time_str or not end_time_str:
         raise ValueError("Invalid iCal time format")
     
-    start_time = datetime.strptime(start_time_str, '%Y%m%dT%H%M%S')
-    start_time = start_time.replace(tzinfo=timezone(timedelta(hours=8)))  # 北京时间
+    zone = get_zone(tz_name)
+    start_time = datetime.strptime(start_time_str, '%Y%m%dT%H%M%S').replace(tzinfo=zone)
     start_time = start_time.astimezone(timezone.utc)
     
-    end_time = datetime.strptime(end_time_str, '%Y%m%dT%H%M%S')
-    end_time = end_time.replace(tzinfo=timezone(timedelta(hours=8)))  # 北京时间
+    end_time = datetime.strptime(end_time_str, '%Y%m%dT%H%M%S').replace(tzinfo=zone)
     end_time = end_time.astimezone(timezone.utc)
     
     # 创建周期性事件
@@ -134,13 +196,20 @@ def create_recurring_event_from_ical(db: Session, ical_data: dict) -> List[model
         recurrence_frequency=rrule_data.get('frequency', 'weekly'),
         recurrence_interval=rrule_data.get('interval', 1),
         recurrence_end_date=rrule_data.get('until_date'),
+        timezone=tz_name,
     )
     
     return create_recurring_event(db, recurring_event)
 
 
-def get_event(db: Session, event_id: int) -> Optional[models.Event]:
-    return db.query(models.Event).filter(models.Event.id == event_id).first()
+def get_event(db: Session, event_id: int, *, include_archive: bool = False) -> Optional[models.Event]:
+    """按ID获取事件；include_archive 时在主表中找不到则查归档表（归档行程只读）"""
+    event = db.query(models.Event).filter(models.Event.id == event_id).first()
+    if event is None and include_archive:
+        event = db.query(models.ArchivedEvent).filter(models.ArchivedEvent.id == event_id).first()
+    if event is not None:
+        models.hydrate_series([event])
+    return event
 
 
 def list_events(
@@ -150,24 +219,148 @@ def list_events(
     end_before: Optional[datetime] = None,
     category: Optional[str] = None,
     include_recurring: bool = True,
+    include_archive: bool = True,
 ) -> List[models.Event]:
-    query = db.query(models.Event).order_by(asc(models.Event.start_time))
+    events = _filtered_events(
+        db,
+        models.Event,
+        start_after=start_after,
+        end_before=end_before,
+        category=category,
+        include_recurring=include_recurring,
+    )
+    if not include_archive:
+        return events
+
+    # 仅当查询窗口触及归档范围时才读取归档表
+    horizon = archive_horizon(db)
+    if horizon is None or (start_after is not None and start_after > horizon):
+        return events
+    archived = _filtered_events(
+        db,
+        models.ArchivedEvent,
+        start_after=start_after,
+        end_before=end_before,
+        category=category,
+        include_recurring=include_recurring,
+    )
+    if not archived:
+        return events
+    return sorted(archived + events, key=lambda event: event.start_time)
+
+
+def _filtered_events(
+    db: Session,
+    model,
+    *,
+    start_after: Optional[datetime],
+    end_before: Optional[datetime],
+    category: Optional[str],
+    include_recurring: bool,
+) -> list:
+    query = db.query(model).order_by(asc(model.start_time))
     
     if start_after is not None:
-        query = query.filter(models.Event.end_time >= start_after)
+        query = query.filter(model.end_time >= start_after)
     if end_before is not None:
-        query = query.filter(models.Event.start_time <= end_before)
+        query = query.filter(model.start_time <= end_before)
     if category is not None:
-        query = query.filter(models.Event.category == category)
+        query = query.filter(models.effective(model, "category") == category)
     if not include_recurring:
-        query = query.filter(models.Event.is_recurring == False)
+        query = query.filter(model.is_recurring == False)
     
-    return query.all()
+    return models.hydrate_series(query.all())
+
+
+def archive_horizon(db: Session) -> Optional[datetime]:
+    """归档表中最晚的结束时间
+
+    每次查询都重新读取（end_time 有索引，只读索引末端）：归档可能由其他 worker 完成，进程内缓存会漏掉归档行程。
+    """
+    horizon = db.query(func.max(models.ArchivedEvent.end_time)).scalar()
+    if horizon is not None and horizon.tzinfo is None:
+        horizon = horizon.replace(tzinfo=timezone.utc)
+    return horizon
+
+
+def archive_events_batch(db: Session, *, ended_before: datetime, batch_size: int = 500) -> int:
+    """将一批已结束的行程迁移到归档表（单个短事务），返回迁移数量
+
+    周期性事件的父事件保存着重复规则，不参与归档。
+    """
+    ids = [
+        row[0]
+        for row in db.query(models.Event.id)
+        .filter(models.Event.end_time < ended_before)
+        .filter(or_(models.Event.parent_event_id.is_(None), models.Event.parent_event_id != models.Event.id))
+        .order_by(asc(models.Event.id))
+        .limit(batch_size)
+        .all()
+    ]
+    if not ids:
+        return 0
+
+    columns = [column.name for column in models.Event.__table__.columns]
+    source = select(*(models.Event.__table__.c[name] for name in columns)).where(models.Event.id.in_(ids))
+    db.execute(insert(models.ArchivedEvent.__table__).from_select(columns, source))
+    db.query(models.Event).filter(models.Event.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(ids)
+
+
+def search_events(db: Session, query: str, *, offset: int = 0, limit: int = 20) -> List[search.SearchHit]:
+    """全文检索行程（标题、备注、地点）"""
+    return search.search_events(db, query, offset=offset, limit=limit)
+
+
+def busy_intervals(
+    db: Session,
+    *,
+    participants: Iterable[str],
+    locations: Iterable[str],
+    window_start: datetime,
+    window_end: datetime,
+) -> Iterable[Tuple[int, int]]:
+    """窗口内参与者（按提醒邮箱）或地点被占用的时间段（UTC 纪元秒，秒以下舍去），按开始时间排序
+
+    每张表一次查询，只取起止时间；周期实例的邮箱/地点可能只存于 series，经 effective() 在 SQL 中合并。
+    """
+    busy = _busy_intervals(db, models.Event, participants, locations, window_start, window_end)
+    horizon = archive_horizon(db)
+    if horizon is None or window_start > horizon:
+        return busy
+    archived = _busy_intervals(db, models.ArchivedEvent, participants, locations, window_start, window_end)
+    return heapq.merge(archived, busy)
+
+
+def _busy_intervals(db: Session, model, participants, locations, window_start, window_end) -> list:
+    conditions = []
+    if participants:
+        conditions.append(models.effective(model, "reminder_email").in_(list(participants)))
+    if locations:
+        conditions.append(models.effective(model, "location").in_(list(locations)))
+    if not conditions:
+        return []
+    dialect = db.get_bind().dialect.name
+    start, end = models.epoch_seconds(model.start_time, dialect), models.epoch_seconds(model.end_time, dialect)
+    # 在 SQL 中换算为整数秒，省去逐行构造带时区的 datetime
+    columns = (start, end) if start is not None else (model.start_time, model.end_time)
+    rows = (
+        db.query(*columns)
+        .filter(model.start_time < window_end)
+        .filter(model.end_time > window_start)
+        .filter(or_(*conditions))
+        .order_by(asc(model.start_time))
+        .all()
+    )
+    if start is None:
+        return [(int(start_time.timestamp()), int(end_time.timestamp())) for start_time, end_time in rows]
+    return [tuple(row) for row in rows]
 
 
 def list_recurring_events(db: Session) -> List[models.Event]:
     """获取所有周期性事件（只返回父事件）"""
-    return (
+    return models.hydrate_series(
         db.query(models.Event)
         .filter(models.Event.is_recurring == True)
         .filter(models.Event.parent_event_id == models.Event.id)  # 只返回父事件
@@ -176,17 +369,77 @@ def list_recurring_events(db: Session) -> List[models.Event]:
     )
 
 
-def get_recurring_event_instances(db: Session, parent_event_id: int) -> List[models.Event]:
-    """获取周期性事件的所有实例"""
-    return (
-        db.query(models.Event)
-        .filter(
-            (models.Event.parent_event_id == parent_event_id) |
-            (models.Event.id == parent_event_id)
+def get_recurring_event_instances(
+    db: Session,
+    parent_event_id: int,
+    *,
+    start_after: Optional[datetime] = None,
+    end_before: Optional[datetime] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    include_archive: bool = True,
+) -> List[models.Event]:
+    """获取周期性事件的实例（含已归档的实例），可按时间窗口过滤并分页"""
+    sources = [models.Event]
+    if include_archive:
+        horizon = archive_horizon(db)
+        if horizon is not None and (start_after is None or start_after <= horizon):
+            sources.append(models.ArchivedEvent)
+
+    results = []
+    for model in sources:
+        query = (
+            db.query(model)
+            .filter((model.parent_event_id == parent_event_id) | (model.id == parent_event_id))
+            .order_by(asc(model.start_time), asc(model.id))
         )
-        .order_by(asc(models.Event.start_time))
-        .all()
+        if start_after is not None:
+            query = query.filter(model.end_time >= start_after)
+        if end_before is not None:
+            query = query.filter(model.start_time <= end_before)
+        if len(sources) == 1:
+            if offset:
+                query = query.offset(offset)
+            if limit is not None:
+                query = query.limit(limit)
+        elif limit is not None:
+            # 两表合并后再分页：每张表最多只需要前 offset + limit 行
+            query = query.limit(offset + limit)
+        results.append(query.all())
+
+    if len(results) == 1:
+        return models.hydrate_series(results[0])
+    merged = list(heapq.merge(*results, key=lambda event: (event.start_time, event.id)))
+    end = None if limit is None else offset + limit
+    return models.hydrate_series(merged[offset:end])
+
+
+def get_series(db: Session, series_id: int) -> Optional[models.Series]:
+    return db.query(models.Series).filter(models.Series.id == series_id).first()
+
+
+def get_recurring_parent(db: Session, parent_event_id: int) -> Optional[models.Event]:
+    """获取周期性事件的父事件"""
+    parent = (
+        db.query(models.Event)
+        .filter(models.Event.id == parent_event_id)
+        .filter(models.Event.is_recurring == True)
+        .filter(models.Event.parent_event_id == models.Event.id)
+        .first()
     )
+    if parent is not None:
+        models.hydrate_series([parent])
+    return parent
+
+
+# 这些字段变化会改变提醒的发送时间或对象，需要唤醒提醒调度器
+_REMINDER_TIMING_FIELDS = {
+    "start_time",
+    "reminder_minutes_before",
+    "reminder_email",
+    "webhook_url",
+    "notification_channels",
+}
 
 
 def update_event(
@@ -202,65 +455,285 @@ def update_event(
     if event.end_time <= event.start_time:
         raise ValueError("End time must be after start time")
 
-    if event.reminder_email is None:
+    # 显式写入（微秒精度），避免同一秒内的多次修改得到相同的 ETag
+    event.updated_at = datetime.now(timezone.utc)
+
+    if event.reminder_email is None and event.webhook_url is None:
         event.reminder_minutes_before = None
         event.reminder_sent = False
     else:
         if event.reminder_minutes_before is None:
             raise ValueError("Reminder minutes must be supplied when reminder email is set")
+        _validate_channel_targets(event.notification_channels, event.reminder_email, event.webhook_url)
         event.reminder_sent = False
+        if _REMINDER_TIMING_FIELDS & data.keys():
+            wakeup.publish(db)
 
     db.add(event)
     db.commit()
     db.refresh(event)
+    models.hydrate_series([event])
     return event
 
 
+def update_series(db: Session, *, series: models.Series, series_in: schemas.SeriesUpdate) -> models.Series:
+    """修改系列共享属性：单行更新即作用于所有未单独覆盖的实例"""
+    data = series_in.dict(exclude_unset=True)
+    if "title" in data and not data["title"]:
+        raise ValueError("Series title cannot be empty")
+    for field, value in data.items():
+        setattr(series, field, value)
+    if series.reminder_email is None and series.webhook_url is None:
+        series.reminder_minutes_before = None
+    elif series.reminder_minutes_before is None:
+        raise ValueError("Reminder minutes must be supplied when reminder email is set")
+    _validate_channel_targets(series.notification_channels, series.reminder_email, series.webhook_url)
+
+    db.add(series)
+    if _REMINDER_TIMING_FIELDS & data.keys():
+        # 提醒设置变更后，尚未开始的实例需要重新提醒
+        db.query(models.Event).filter(models.Event.series_id == series.id).filter(
+            models.Event.start_time >= datetime.now(timezone.utc)
+        ).update({models.Event.reminder_sent: False}, synchronize_session=False)
+        if series.reminder_minutes_before is not None:
+            wakeup.publish(db)
+    db.commit()
+    db.refresh(series)
+    return series
+
+
 def delete_event(db: Session, *, event: models.Event) -> None:
-    """删除事件"""
+    """删除事件（包括已归档的行程）"""
     if event.is_recurring and event.parent_event_id == event.id:
-        # 删除整个周期性事件系列
-        instances = get_recurring_event_instances(db, event.id)
+        # 删除整个周期性事件系列，已归档的实例一并删除
+        instances = get_recurring_event_instances(db, event.id, include_archive=False)
         for instance in instances:
             db.delete(instance)
+        db.query(models.ArchivedEvent).filter(models.ArchivedEvent.parent_event_id == event.id).delete(
+            synchronize_session=False
+        )
+        series_id = event.series_id
+        if series_id is not None and not (
+            db.query(models.ArchivedEvent.id).filter(models.ArchivedEvent.series_id == series_id).first()
+        ):
+            # 其他父事件的归档实例仍引用该系列时保留系列行
+            db.query(models.Series).filter(models.Series.id == series_id).delete(synchronize_session=False)
     else:
         db.delete(event)
     db.commit()
 
 
-def delete_events_by_category(db: Session, category: str) -> int:
-    deleted = db.query(models.Event).filter(models.Event.category == category).delete(synchronize_session=False)
+DELETE_JOB_FIELDS = ("category", "title")
+
+
+def count_matching_events(db: Session, *, field: str, value: str) -> Tuple[int, int]:
+    """统计按分类/标题批量删除将影响的行程数（不加写锁），返回 (总数, 其中已归档的数量)"""
+    live, archived = (
+        db.query(func.count(model.id)).filter(models.effective(model, field) == value).scalar()
+        for model in (models.Event, models.ArchivedEvent)
+    )
+    return live + archived, archived
+
+
+def create_delete_job(db: Session, *, field: str, value: str) -> models.DeleteJob:
+    """登记批量删除任务；只处理登记时已存在的行程（id 不超过当时的最大值），归档表中匹配的行程一并删除"""
+    if field not in DELETE_JOB_FIELDS:
+        raise ValueError(f"field must be one of: {', '.join(DELETE_JOB_FIELDS)}")
+    job = models.DeleteJob(
+        id=uuid.uuid4().hex,
+        field=field,
+        value=value,
+        status="pending",
+        matched=count_matching_events(db, field=field, value=value)[0],
+        deleted=0,
+        last_id=0,
+        max_id=max(
+            db.query(func.max(models.Event.id)).scalar() or 0,
+            db.query(func.max(models.ArchivedEvent.id)).scalar() or 0,
+        ),
+    )
+    db.add(job)
     db.commit()
-    return deleted
+    db.refresh(job)
+    return job
+
 
+def get_delete_job(db: Session, job_id: str) -> Optional[models.DeleteJob]:
+    return db.query(models.DeleteJob).filter(models.DeleteJob.id == job_id).first()
 
-def delete_events_by_title(db: Session, title: str) -> int:
-    deleted = db.query(models.Event).filter(models.Event.title == title).delete(synchronize_session=False)
+
+def _claimable(statuses: Tuple[str, ...], stale_before: Optional[datetime]):
+    condition = models.DeleteJob.status.in_(statuses)
+    if stale_before is None:
+        return condition
+    # 执行进程被强制终止（SIGKILL、OOM）时任务停在 running，心跳过期后可被重新认领
+    return or_(
+        condition,
+        and_(
+            models.DeleteJob.status == "running",
+            or_(models.DeleteJob.heartbeat_at.is_(None), models.DeleteJob.heartbeat_at < stale_before),
+        ),
+    )
+
+
+def claim_delete_job(
+    db: Session,
+    job_id: str,
+    *,
+    owner: str,
+    statuses: Tuple[str, ...] = ("pending",),
+    stale_before: Optional[datetime] = None,
+) -> bool:
+    """原子地把任务置为 running 并记录执行者；多个进程同时续跑时只有一个能认领成功"""
+    claimed = (
+        db.query(models.DeleteJob)
+        .filter(models.DeleteJob.id == job_id)
+        .filter(_claimable(statuses, stale_before))
+        .update(
+            {
+                models.DeleteJob.status: "running",
+                models.DeleteJob.claimed_by: owner,
+                models.DeleteJob.heartbeat_at: datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return claimed == 1
+
+
+def delete_events_chunk(db: Session, job: models.DeleteJob, *, batch_size: int = 500) -> int:
+    """删除下一段 id 区间内匹配的行程（主表与归档表），并在同一短事务中推进任务进度，返回删除数量
+
+    归档保留原 id，两张表按同一 id 区间推进；区间上界取两表各自第 batch_size 个匹配 id 中较小者。
+    """
+    bounds = [
+        db.query(model.id)
+        .filter(model.id > job.last_id, model.id <= job.max_id)
+        .filter(models.effective(model, job.field) == job.value)
+        .order_by(asc(model.id))
+        .offset(batch_size - 1)
+        .limit(1)
+        .scalar()
+        for model in (models.Event, models.ArchivedEvent)
+    ]
+    # 剩余不足一批时直接推进到 max_id
+    upper = min((bound for bound in bounds if bound is not None), default=job.max_id)
+    deleted = 0
+    for model in (models.Event, models.ArchivedEvent):
+        deleted += (
+            db.query(model)
+            .filter(model.id > job.last_id, model.id <= upper)
+            .filter(models.effective(model, job.field) == job.value)
+            .delete(synchronize_session=False)
+        )
+    job.deleted += deleted
+    job.last_id = upper
+    job.heartbeat_at = datetime.now(timezone.utc)
+    if upper >= job.max_id:
+        _delete_orphan_series(db)
+        job.status = "completed"
+        job.finished_at = datetime.now(timezone.utc)
     db.commit()
     return deleted
 
 
+def finish_delete_job(db: Session, job: models.DeleteJob, *, status: str, error: Optional[str] = None) -> None:
+    job.status = status
+    job.error = error
+    if status in ("completed", "failed"):
+        job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def resumable_delete_jobs(db: Session, *, stale_before: Optional[datetime] = None) -> List[str]:
+    """待续跑的任务：pending/interrupted，以及心跳早于 stale_before 的 running 任务"""
+    return [
+        row[0]
+        for row in db.query(models.DeleteJob.id)
+        .filter(_claimable(("pending", "interrupted"), stale_before))
+        .order_by(asc(models.DeleteJob.created_at))
+        .all()
+    ]
+
+
+def _delete_orphan_series(db: Session) -> None:
+    """删除已没有任何实例（含归档）的系列"""
+    db.query(models.Series).filter(
+        ~select(models.Event.id).where(models.Event.series_id == models.Series.id).exists(),
+        ~select(models.ArchivedEvent.id).where(models.ArchivedEvent.series_id == models.Series.id).exists(),
+    ).delete(synchronize_session=False)
+
+
+def _reminder_candidates(db: Session, *, earliest: datetime, latest: datetime) -> List[Tuple[int, datetime]]:
+    """提醒时间（约）落在 [earliest, latest] 内的待发提醒，返回 (id, 精确提醒时间)
+
+    能在 SQL 中按提醒时间过滤时只取少量行；否则按开始时间粗筛（提醒最多提前 7 天）后在 Python 中计算。
+    """
+    minutes = models.effective(models.Event, "reminder_minutes_before")
+    query = (
+        db.query(models.Event.id, models.Event.start_time, minutes)
+        .filter(models.Event.reminder_sent.is_(False))
+        # 提醒时间不晚于开始时间，且最多提前 7 天（schemas 中 reminder_minutes_before 的上限）
+        .filter(models.Event.start_time >= earliest)
+        .filter(models.Event.start_time <= latest + timedelta(days=7))
+    )
+    epoch = models.reminder_epoch(models.Event, db.get_bind().dialect.name)
+    if epoch is not None:
+        # 放在其他条件之前，先排除绝大多数行；向下取整到秒，范围两端各放宽一秒，精确比较留给下面
+        query = query.filter(epoch.between(int(earliest.timestamp()) - 1, int(latest.timestamp()) + 1))
+    else:
+        query = query.filter(minutes.is_not(None))
+    query = query.filter(
+        or_(
+            models.effective(models.Event, "reminder_email").is_not(None),
+            models.effective(models.Event, "webhook_url").is_not(None),
+        )
+    )
+    candidates = []
+    for event_id, start_time, reminder_minutes in query.all():
+        reminder_time = start_time - timedelta(minutes=reminder_minutes)
+        if earliest <= reminder_time <= latest:
+            candidates.append((event_id, reminder_time))
+    return candidates
+
+
 def due_reminders(db: Session, *, as_of: datetime, lookback_minutes: int = 5) -> Iterable[models.Event]:
     if as_of.tzinfo is None or as_of.tzinfo.utcoffset(as_of) is None:
         as_of = as_of.replace(tzinfo=timezone.utc)
-    candidates = (
+    candidates = _reminder_candidates(db, earliest=as_of - timedelta(minutes=lookback_minutes), latest=as_of)
+    if not candidates:
+        return []
+    # 只为到期的提醒加载完整行程
+    return models.hydrate_series(
         db.query(models.Event)
-        .filter(models.Event.reminder_sent.is_(False))
-        .filter(models.Event.reminder_email.is_not(None))
-        .filter(models.Event.reminder_minutes_before.is_not(None))
-        .filter(models.Event.start_time >= as_of - timedelta(days=7))
+        .filter(models.Event.id.in_([event_id for event_id, _ in candidates]))
         .order_by(asc(models.Event.start_time))
         .all()
     )
-    due: List[models.Event] = []
-    for event in candidates:
-        reminder_time = event.start_time - timedelta(minutes=event.reminder_minutes_before)
-        if reminder_time <= as_of and reminder_time >= as_of - timedelta(minutes=lookback_minutes):
-            due.append(event)
-    return due
+
+
+def next_reminder_at(db: Session, *, after: datetime, horizon: timedelta) -> Optional[datetime]:
+    """(after, after + horizon] 内最早的待发提醒时间；没有则返回 None"""
+    candidates = _reminder_candidates(db, earliest=after, latest=after + horizon)
+    return min((reminder_time for _, reminder_time in candidates if reminder_time > after), default=None)
 
 
 def mark_reminder_sent(db: Session, event: models.Event) -> None:
     event.reminder_sent = True
     db.add(event)
     db.commit()
+
+
+def mark_reminders_sent(db: Session, event_ids: Iterable[int]) -> int:
+    """批量标记提醒已发送（单条 UPDATE）"""
+    ids = list(event_ids)
+    if not ids:
+        return 0
+    updated = (
+        db.query(models.Event)
+        .filter(models.Event.id.in_(ids))
+        .update({models.Event.reminder_sent: True}, synchronize_session=False)
+    )
+    db.commit()
+    return updated
@@ -1,29 +1,188 @@
+import hashlib
+import logging
 import os
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Generator
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Deque, Generator, List, Optional
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./itinerary.db")
+# 可选的只读连接，供 GET 请求使用：流复制的只读副本，或 SQLite 上指向同一文件的
+# ``mode=ro`` URI（例如 ``sqlite:///file:itinerary.db?mode=ro&uri=true``）
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
+
+def _connect_args(url: str) -> dict:
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+
+engine = create_engine(DATABASE_URL, connect_args=_connect_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 未设置 DATABASE_READ_URL 时读写共用主库引擎
+read_engine = (
+    create_engine(DATABASE_READ_URL, connect_args=_connect_args(DATABASE_READ_URL))
+    if DATABASE_READ_URL
+    else engine
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+READ_REPLICA = read_engine is not engine
+
 
 if DATABASE_URL.startswith("sqlite"):
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(dbapi_connection, connection_record):
+        # 在此处导入：search 导入 models，而 models 导入本模块
+        from .search import search_terms
+
+        # 短查询索引的触发器在每次写入 events/series 时调用
+        dbapi_connection.create_function("search_terms", 1, search_terms, deterministic=True)
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        if READ_REPLICA:
+            # 同一文件上的只读连接只有在 WAL 模式下才能与写连接并行
+            cursor.execute("PRAGMA journal_mode=WAL")
         cursor.close()
 
 
+# 开启 Server-Timing 时按请求设置：[SQL 耗时（秒）, 语句数]
+query_timing: ContextVar[Optional[list]] = ContextVar("query_timing", default=None)
+
+
+class QueryMonitor:
+    """按需开启的 SQL 观测：慢查询日志与每个请求的数据库耗时
+
+    只有两者之一开启时才挂载游标监听器，关闭时每条语句没有额外开销。超过 ``slow_ms``
+    的语句写入日志并保留在内存中；设置 ``capture_params`` 时附带绑定参数，
+    设置 ``explain`` 时为 SELECT 附带执行计划。
+    """
+
+    def __init__(self, engines: List[Engine], *, max_entries: int = 200) -> None:
+        self.engines = engines
+        self.slow_log = False
+        self.slow_ms = 200.0
+        self.explain = True
+        self.capture_params = False
+        self.request_timing = False
+        self.entries: Deque[dict] = deque(maxlen=max_entries)
+        self._attached = False
+
+    def configure(
+        self,
+        *,
+        slow_log: Optional[bool] = None,
+        slow_ms: Optional[float] = None,
+        explain: Optional[bool] = None,
+        capture_params: Optional[bool] = None,
+        request_timing: Optional[bool] = None,
+    ) -> None:
+        """运行时修改设置；为 None 的参数保持当前值"""
+        if slow_log is not None:
+            self.slow_log = slow_log
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if explain is not None:
+            self.explain = explain
+        if capture_params is not None:
+            self.capture_params = capture_params
+        if request_timing is not None:
+            self.request_timing = request_timing
+        wanted = self.slow_log or self.request_timing
+        if wanted == self._attached:
+            return
+        for bind in self.engines:
+            if wanted:
+                event.listen(bind, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(bind, "after_cursor_execute", self._after_cursor_execute)
+            else:
+                event.remove(bind, "before_cursor_execute", self._before_cursor_execute)
+                event.remove(bind, "after_cursor_execute", self._after_cursor_execute)
+        self._attached = wanted
+
+    def status(self) -> dict:
+        return {
+            "slow_log": self.slow_log,
+            "slow_ms": self.slow_ms,
+            "explain": self.explain,
+            "capture_params": self.capture_params,
+            "request_timing": self.request_timing,
+            "logged": len(self.entries),
+        }
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._monitor_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        # 监听器在该语句执行期间才挂载时没有开始时间
+        started = getattr(context, "_monitor_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        timing = query_timing.get()
+        if timing is not None:
+            timing[0] += elapsed
+            timing[1] += 1
+        if self.slow_log and elapsed * 1000 >= self.slow_ms:
+            self._record(conn, statement, parameters, elapsed, executemany)
+
+    def _record(self, conn, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "engine": "primary" if conn.engine is engine else "read",
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement,
+        }
+        if self.capture_params:
+            entry["parameters"] = repr(parameters)[:2000]
+        if self.explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            entry["plan"] = _explain(conn, statement, parameters)
+        self.entries.append(entry)
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:500])
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """刚执行完的语句的执行计划（在同一连接的原始游标上执行）
+
+    原始游标不触发引擎事件，EXPLAIN 本身不会被计时或记录。
+    """
+    dialect = conn.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if dialect == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+        # 没有保存点时，失败的语句会中止调用方的事务
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as exc:  # noqa: BLE001 - the plan is best effort
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        cursor.close()
+
+
+query_monitor = QueryMonitor([engine, read_engine] if READ_REPLICA else [engine])
+
+
 @contextmanager
 def get_db() -> Generator:
     db = SessionLocal()
@@ -31,3 +190,70 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+def add_missing_columns(bind: Engine) -> None:
+    """为已有表补上模型中声明、表中缺少的可空列
+
+    ``create_all`` 只创建不存在的表，旧版本创建的数据库否则会缺少新增的可选列。
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                )
+
+
+def add_missing_indexes(bind: Engine) -> None:
+    """为已有表补建模型中声明、表中缺少的索引"""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present:
+                    index.create(connection)
+
+
+def schema_fingerprint(extra: str = "") -> str:
+    """模型声明的表、列、索引（及可选的功能开关）的哈希"""
+    parts = [extra]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type!r}:{column.nullable}" for column in table.columns)
+        parts.extend(sorted(f"index:{index.name}" for index in table.indexes))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def run_migrations_once(bind: Engine, migrate: Callable[[], None], *, extra: str = "") -> bool:
+    """仅当保存的 schema 指纹缺失或过期时执行 ``migrate``，返回是否执行了迁移
+
+    热启动因此只需一次单行 SELECT，无需反射所有表、重复执行 DDL。
+    """
+    fingerprint = schema_fingerprint(extra)
+    try:
+        with bind.connect() as connection:
+            stored = connection.execute(text("SELECT fingerprint FROM schema_state")).scalar()
+    except DBAPIError:
+        stored = None
+    if stored == fingerprint:
+        return False
+
+    migrate()
+    with bind.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_state (fingerprint VARCHAR(64) NOT NULL)"))
+        connection.execute(text("DELETE FROM schema_state"))
+        connection.execute(text("INSERT INTO schema_state (fingerprint) VALUES (:fingerprint)"), {"fingerprint": fingerprint})
+    return True
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import QueryMonitor, query_timing
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# 线程处于等待（而非执行 Python 代码）时的栈顶帧
+_IDLE_LEAVES = (
+    ("/selectors.py", "select"),
+    ("/threading.py", "wait"),
+    ("/concurrent/futures/thread.py", "_worker"),
+)
+
+
+def require_admin(request: Request) -> None:
+    """管理路由需 ``Authorization: Bearer $ADMIN_TOKEN``；未设置该令牌时路由视为不存在"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.strip(), ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Admin token required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+class SamplingProfiler:
+    """采样分析器：按固定间隔采集每个线程的 Python 调用栈
+
+    只在 ``start`` 与 ``stop`` 之间（最长 ``max_seconds``）由独立线程采样，空闲时没有开销。
+    事件循环上的调用栈以当前任务名为根（"reminder-dispatcher"，请求为 "task"），空闲等待不计入。
+    ``collapsed()`` 返回 flamegraph.pl、speedscope 与 inferno 可读的折叠栈格式。
+    """
+
+    def __init__(self) -> None:
+        self.interval = 0.01
+        self.started_at: Optional[datetime] = None
+        self.ticks = 0
+        self._samples: Counter = Counter()
+        self._labels: Dict[CodeType, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, *, interval: float = 0.01, max_seconds: float = 60.0) -> bool:
+        """在事件循环线程上开始采样；已在运行时返回 False"""
+        if self.running:
+            return False
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.ticks = 0
+        self._samples = Counter()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(max_seconds,), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> str:
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self._samples.items()]
+        return "\n".join(sorted(lines)) + ("\n" if lines else "")
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "ticks": self.ticks,
+            "samples": sum(self._samples.values()),
+            "distinct_stacks": len(self._samples),
+        }
+
+    def _run(self, max_seconds: float) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + max_seconds
+        while not self._stop_event.wait(self.interval) and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._stack(frame)
+                if stack is None:
+                    continue
+                root: Tuple[str, ...] = (_thread_label(names.get(ident, "thread")),)
+                if ident == self._loop_thread:
+                    task = asyncio.current_task(self._loop)
+                    if task is not None:
+                        root += (_task_label(task),)
+                self._samples[root + stack] += 1
+            self.ticks += 1
+
+    def _stack(self, frame: FrameType) -> Optional[Tuple[str, ...]]:
+        code = frame.f_code
+        if any(code.co_name == name and code.co_filename.endswith(path) for path, name in _IDLE_LEAVES):
+            return None
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+
+def _short_path(filename: str) -> str:
+    _, marker, tail = filename.rpartition("site-packages/")
+    if marker:
+        return tail
+    cwd = os.getcwd() + os.sep
+    return filename[len(cwd):] if filename.startswith(cwd) else filename
+
+
+def _thread_label(name: str) -> str:
+    # 线程池中的线程（"asyncio_3"、"AnyIO worker thread"）按池合并为一个根
+    return re.sub(r"[_-]?\d+$", "", name) or "thread"
+
+
+def _task_label(task: asyncio.Task) -> str:
+    name = task.get_name()
+    return "task" if name.startswith("Task-") else name
+
+
+class ServerTimingMiddleware:
+    """开启时添加 ``Server-Timing`` 响应头（处理耗时、SQL 耗时与语句数）
+
+    每个请求检查 ``monitor.request_timing``，可在运行时切换，关闭时只多一次属性读取。
+    """
+
+    def __init__(self, app: ASGIApp, *, monitor: QueryMonitor) -> None:
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.monitor.request_timing:
+            await self.app(scope, receive, send)
+            return
+        timing = [0.0, 0]
+        token = query_timing.set(timing)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = (time.perf_counter() - started) * 1000
+                MutableHeaders(raw=message["headers"]).append(
+                    "Server-Timing",
+                    f'app;dur={elapsed:.1f}, db;dur={timing[0] * 1000:.1f};desc="{timing[1]} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_timing.reset(token)
@@ -1,8 +1,10 @@
 import os
-import smtplib
 from dataclasses import dataclass
-from email.mime.text import MIMEText
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+# smtplib/email 在首次发送时才导入，减少启动开销
+if TYPE_CHECKING:
+    from email.mime.text import MIMEText
 
 
 @dataclass
@@ -35,11 +37,21 @@ def load_smtp_settings() -> SMTPSettings:
     )
 
 
-def send_email(recipient: str, subject: str, body: str, settings: SMTPSettings) -> None:
+def build_message(recipient: str, subject: str, body: str, settings: SMTPSettings) -> "MIMEText":
+    from email.mime.text import MIMEText
+
     message = MIMEText(body, "plain", "utf-8")
     message["Subject"] = subject
     message["From"] = settings.sender
     message["To"] = recipient
+    return message
+
+
+def send_email(recipient: str, subject: str, body: str, settings: SMTPSettings) -> None:
+    """同步发送（阻塞直到 SMTP 会话结束）；在事件循环中由 channels.EmailChannel 放入线程池调用"""
+    import smtplib
+
+    message = build_message(recipient, subject, body, settings)
 
     if settings.use_ssl:
         server = smtplib.SMTP_SSL(settings.host, settings.port)
@@ -56,3 +68,4 @@ def send_email(recipient: str, subject: str, body: str, settings: SMTPSettings)
         server.sendmail(settings.sender, [recipient], message.as_string())
     finally:
         server.quit()
+
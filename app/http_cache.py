@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+
+from . import models
+
+# 窗口内任一行程变化都会改变列表，客户端每次都需重新验证
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+def last_modified(event: models.Event) -> datetime:
+    """行程的最后修改时间，包括在所属系列行上修改的共享属性"""
+    series = event.series
+    if series is not None and series.updated_at > event.updated_at:
+        return series.updated_at
+    return event.updated_at
+
+
+def event_etag(event: models.Event) -> str:
+    """由行ID、所属系列及两者的 ``updated_at`` 生成的弱校验值"""
+    stamp = int(last_modified(event).timestamp() * 1_000_000)
+    series = f"s{event.series_id}-" if event.series_id is not None else ""
+    return f'W/"{event.id}-{series}{stamp}-{int(event.reminder_sent)}"'
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """按 RFC 9110 判断 If-None-Match（优先）或 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        weak_etag = etag[2:] if etag.startswith("W/") else etag
+        return "*" in candidates or etag in candidates or weak_etag in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            return last_modified.replace(microsecond=0) <= since
+    return False
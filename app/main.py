@@ -2,41 +2,123 @@ import logging
 import os
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Generator, Optional
+from email.utils import format_datetime
+from typing import Generator, Optional, Union
 
-from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from .startup import profile
 
-from . import crud, schemas
-from .database import Base, SessionLocal, engine
-from .scheduler import ReminderDispatcher
+with profile.phase("load .env"):
+    from dotenv import load_dotenv
 
-load_dotenv()
+    # 须在导入应用模块之前加载：database.py 在导入时读取 DATABASE_URL
+    load_dotenv()
+
+with profile.phase("import fastapi/sqlalchemy"):
+    from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+
+with profile.phase("import app modules"):
+    from . import availability, columnar, crud, models, schemas
+    from .admission import AdmissionControl, AdmissionMiddleware
+    from .compression import CompressionMiddleware
+    from .diagnostics import SamplingProfiler, ServerTimingMiddleware, require_admin
+    from .read_routing import ReadYourWritesMiddleware, reads_from_primary
+    from .http_cache import LIST_CACHE_CONTROL, event_etag, is_not_modified, last_modified
+    from .bulk_delete import BulkDeleteRunner
+    from .assets import STATIC_DIR, PrecompressedStaticFiles, asset_url
+    from .utils import DEFAULT_TIMEZONE, get_zone, to_zone
+    from .database import READ_REPLICA, ReadSessionLocal, SessionLocal, query_monitor
+    from .migrations import migrate_database
+    from .retention import RetentionJob
+    from .scheduler import ReminderDispatcher
+    from .wakeup import create_listener
+    from .stats import GROUP_BY_CHOICES, compute_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("itinerary_app")
 
+admission = AdmissionControl.from_env()
+profiler = SamplingProfiler()
+query_monitor.configure(
+    slow_log=os.getenv("SLOW_QUERY_LOG", "false").lower() in {"1", "true", "yes"},
+    slow_ms=float(os.getenv("SLOW_QUERY_MS", "200")),
+    explain=os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in {"1", "true", "yes"},
+    capture_params=os.getenv("SLOW_QUERY_PARAMS", "false").lower() in {"1", "true", "yes"},
+    request_timing=os.getenv("SERVER_TIMING", "false").lower() in {"1", "true", "yes"},
+)
 poll_interval = int(os.getenv("REMINDER_POLL_INTERVAL", "60"))
-dispatcher = ReminderDispatcher(poll_interval_seconds=poll_interval)
+dispatcher = ReminderDispatcher(
+    poll_interval_seconds=poll_interval,
+    digest=os.getenv("REMINDER_DIGEST", "false").lower() in {"1", "true", "yes"},
+    digest_window_minutes=int(os.getenv("REMINDER_DIGEST_WINDOW", "30")),
+    max_concurrency=int(os.getenv("REMINDER_MAX_CONCURRENCY", "16")),
+    wakeup=create_listener(),
+    reconcile_interval_seconds=int(os.getenv("REMINDER_RECONCILE_INTERVAL", "300")),
+    admission=admission,
+)
+archive_after_days = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+retention_job = (
+    RetentionJob(
+        archive_after_days,
+        interval_seconds=int(os.getenv("ARCHIVE_INTERVAL", "3600")),
+        batch_size=int(os.getenv("ARCHIVE_BATCH_SIZE", "500")),
+    )
+    if archive_after_days > 0
+    else None
+)
+bulk_deleter = BulkDeleteRunner(
+    batch_size=int(os.getenv("BULK_DELETE_BATCH_SIZE", "500")),
+    pause_seconds=float(os.getenv("BULK_DELETE_PAUSE", "0.05")),
+    stale_after_seconds=float(os.getenv("BULK_DELETE_STALE_AFTER", "60")),
+)
+
+
+app_state = {"draining": False, "index_html": ""}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    await dispatcher.start()
+    with profile.phase("schema check"):
+        migrated = migrate_database()
+        if migrated:
+            logger.info("Database schema created/upgraded")
+    with profile.phase("render index page"):
+        app_state["index_html"] = render_index()
+    with profile.phase("start background jobs"):
+        await dispatcher.start()
+        if retention_job is not None:
+            await retention_job.start()
+        await bulk_deleter.start()
+    profile.report()
     try:
         yield
     finally:
+        app_state["draining"] = True
+        await bulk_deleter.stop()
+        if retention_job is not None:
+            await retention_job.stop()
         await dispatcher.stop()
+        profiler.stop()
 
 
 app = FastAPI(title="Itinerary Planner", version="1.0.0", lifespan=lifespan)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(ReadYourWritesMiddleware.from_env)
+app.add_middleware(CompressionMiddleware.from_env)
+app.add_middleware(AdmissionMiddleware, control=admission)
+app.add_middleware(ServerTimingMiddleware, monitor=query_monitor)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
+
+
+def render_index() -> str:
+    """首页只渲染一次，页面不含按请求变化的内容"""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    environment = Environment(loader=FileSystemLoader("app/templates"), autoescape=select_autoescape())
+    environment.globals["asset"] = asset_url
+    return environment.get_template("index.html").render()
 
 
 def get_db_session() -> Generator[Session, None, None]:
@@ -45,14 +127,111 @@ def get_db_session() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    """只读路由的会话：使用只读引擎，客户端刚写入过时除外"""
+    db = SessionLocal() if reads_from_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 @app.get("/health")
 async def health_check() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """供负载均衡与部署脚本使用的就绪检查：数据库可达且提醒调度器在运行"""
+    checks: dict = {"draining": app_state["draining"]}
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+        checks["database"] = "ok"
+    except Exception as exc:  # noqa: BLE001
+        checks["database"] = f"error: {exc.__class__.__name__}"
+    if READ_REPLICA:
+        try:
+            with ReadSessionLocal() as db:
+                db.execute(text("SELECT 1"))
+            checks["read_database"] = "ok"
+        except Exception as exc:  # noqa: BLE001
+            checks["read_database"] = f"error: {exc.__class__.__name__}"
+    checks["dispatcher"] = dispatcher.status()
+    ready = (
+        not app_state["draining"]
+        and checks["database"] == "ok"
+        and dispatcher.running
+    )
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", **checks},
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@app.get("/admission")
+async def admission_stats() -> dict:
+    """限流与过载拒绝计数，以及高开销路由的排队状态"""
+    return admission.stats()
+
+
+@app.get("/admin/diagnostics", dependencies=[Depends(require_admin)])
+async def diagnostics_status() -> dict:
+    """本 worker 进程的分析器与 SQL 观测状态"""
+    return {"profiler": profiler.status(), "queries": query_monitor.status()}
+
+
+@app.put("/admin/diagnostics/queries", dependencies=[Depends(require_admin)])
+async def configure_query_monitor(update: schemas.QueryMonitorUpdate) -> dict:
+    query_monitor.configure(
+        slow_log=update.slow_log,
+        slow_ms=update.slow_ms,
+        explain=update.explain,
+        capture_params=update.capture_params,
+        request_timing=update.server_timing,
+    )
+    return query_monitor.status()
+
+
+@app.get("/admin/diagnostics/slow-queries", dependencies=[Depends(require_admin)])
+async def list_slow_queries(limit: int = Query(50, ge=1, le=200)) -> list:
+    return list(reversed(query_monitor.entries))[:limit]
+
+
+@app.delete(
+    "/admin/diagnostics/slow-queries",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(require_admin)],
+)
+async def clear_slow_queries() -> Response:
+    query_monitor.entries.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.post("/admin/diagnostics/profiler/start", dependencies=[Depends(require_admin)])
+async def start_profiler(
+    interval_ms: float = Query(10, ge=1, le=1000),
+    max_seconds: float = Query(60, gt=0, le=600),
+) -> dict:
+    if not profiler.start(interval=interval_ms / 1000, max_seconds=max_seconds):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Profiler already running")
+    return profiler.status()
+
+
+@app.post(
+    "/admin/diagnostics/profiler/stop",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def stop_profiler() -> PlainTextResponse:
+    """停止采样并返回折叠栈（``flamegraph.pl`` / speedscope 的输入格式）"""
+    return PlainTextResponse(profiler.stop())
+
+
 @app.get("/", response_class=HTMLResponse)
-async def index(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse("index.html", {"request": request})
+async def index() -> HTMLResponse:
+    return HTMLResponse(app_state["index_html"], headers={"Cache-Control": "no-cache"})
 
 
 @app.post("/events", response_model=schemas.Event, status_code=status.HTTP_201_CREATED)
@@ -69,20 +248,73 @@ async def create_event(
 
 @app.get("/events", response_model=list[schemas.Event])
 async def list_events(
+    request: Request,
+    response: Response,
     start_after: Optional[datetime] = None,
     end_before: Optional[datetime] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db_session),
+    tz: Optional[str] = Query(None, max_length=64, description="IANA time zone used to render times"),
+    db: Session = Depends(get_read_session),
 ):
+    response.headers["Cache-Control"] = LIST_CACHE_CONTROL
+    if tz is not None:
+        try:
+            get_zone(tz)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     events = crud.list_events(db, start_after=start_after, end_before=end_before, category=category)
-    return events
+    if columnar.accepts_columnar(request.headers.get("accept")):
+        # 列式格式的时间为纪元秒，tz= 对其不适用
+        return JSONResponse(
+            columnar.encode_events(events),
+            media_type=columnar.MEDIA_TYPE,
+            headers={"Cache-Control": LIST_CACHE_CONTROL, "Vary": "Accept"},
+        )
+    response.headers["Vary"] = "Accept"
+    if tz is None:
+        return events
+    # 响应模型会把时间统一为 UTC，按时区输出时绕过它
+    payload = []
+    for event in events:
+        item = schemas.Event.from_orm(event).dict()
+        item["start_time"] = to_zone(event.start_time, tz)
+        item["end_time"] = to_zone(event.end_time, tz)
+        if event.recurrence_end_date is not None:
+            item["recurrence_end_date"] = to_zone(event.recurrence_end_date, tz)
+        payload.append(item)
+    return JSONResponse(jsonable_encoder(payload), headers={"Cache-Control": LIST_CACHE_CONTROL, "Vary": "Accept"})
+
+
+@app.get("/events/search", response_model=list[schemas.EventSearchHit])
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_session),
+):
+    hits = crud.search_events(db, q, offset=offset, limit=limit)
+    return [schemas.EventSearchHit(event=event, rank=rank, snippet=snippet) for event, rank, snippet in hits]
 
 
 @app.get("/events/{event_id}", response_model=schemas.Event)
-async def read_event(event_id: int, db: Session = Depends(get_db_session)):
-    event = crud.get_event(db, event_id)
+async def read_event(
+    event_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_session),
+):
+    event = crud.get_event(db, event_id, include_archive=True)
     if event is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
+    modified = last_modified(event)
+    validators = {
+        "ETag": event_etag(event),
+        "Last-Modified": format_datetime(modified.replace(microsecond=0), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if is_not_modified(request, validators["ETag"], modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    response.headers.update(validators)
     return event
 
 
@@ -92,9 +324,11 @@ async def update_event(
     event_in: schemas.EventUpdate,
     db: Session = Depends(get_db_session),
 ):
-    event = crud.get_event(db, event_id)
+    event = crud.get_event(db, event_id, include_archive=True)
     if event is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
+    if isinstance(event, models.ArchivedEvent):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Archived events are read-only")
     try:
         updated = crud.update_event(db, event=event, event_in=event_in)
     except ValueError as exc:
@@ -102,27 +336,193 @@ async def update_event(
     return updated
 
 
-@app.delete("/events/by-category", response_model=dict)
+@app.get("/stats", response_model=schemas.StatsResponse)
+async def read_stats(
+    group_by: str = Query("category", regex=f"^({'|'.join(GROUP_BY_CHOICES)})$"),
+    start_after: Optional[datetime] = None,
+    end_before: Optional[datetime] = None,
+    term_start: Optional[datetime] = Query(None, description="First day of term, used by group_by=week"),
+    # 按从主库读取的写入版本号缓存；延迟的只读副本会把过期的统计缓存到新版本号下
+    db: Session = Depends(get_db_session),
+):
+    try:
+        source, rows = compute_stats(
+            db,
+            group_by=group_by,
+            start_after=start_after,
+            end_before=end_before,
+            term_start=term_start,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return schemas.StatsResponse(
+        group_by=group_by,
+        source=source,
+        buckets=[
+            schemas.StatsBucket(key=key, event_count=count, total_minutes=round(seconds / 60, 2))
+            for key, count, seconds in rows
+        ],
+    )
+
+
+@app.post("/availability/find", response_model=schemas.AvailabilityResponse)
+async def find_availability(
+    query: schemas.AvailabilityRequest,
+    db: Session = Depends(get_read_session),
+):
+    zone_name = query.timezone or DEFAULT_TIMEZONE
+    busy = availability.merge_busy(
+        crud.busy_intervals(
+            db,
+            participants=query.participants,
+            locations=query.locations,
+            window_start=query.window_start,
+            window_end=query.window_end,
+        )
+    )
+    windows = availability.working_windows(
+        query.window_start,
+        query.window_end,
+        day_start=query.working_hours_start,
+        day_end=query.working_hours_end,
+        weekdays=query.working_days,
+        zone_name=zone_name,
+    )
+    slots = availability.free_slots(
+        busy,
+        windows,
+        duration=query.duration_minutes * 60,
+        step=query.step_minutes * 60,
+        limit=query.limit,
+    )
+    zone = get_zone(zone_name)
+    return schemas.AvailabilityResponse(
+        timezone=zone_name,
+        slots=[
+            schemas.AvailabilitySlot(
+                start_time=datetime.fromtimestamp(start, zone),
+                end_time=datetime.fromtimestamp(end, zone),
+            )
+            for start, end in slots
+        ],
+        busy_intervals=len(busy),
+    )
+
+
+@app.post(
+    "/recurring-events",
+    response_model=schemas.RecurringEventSummary,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_recurring_event(
+    event_in: schemas.RecurringEventCreate,
+    db: Session = Depends(get_db_session),
+):
+    try:
+        events = crud.create_recurring_event(db, event_in)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    if not events:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Recurrence rule produced no occurrences",
+        )
+    parent = events[0]
+    return schemas.RecurringEventSummary(
+        parent_event_id=parent.id,
+        title=parent.title,
+        recurrence_rule=parent.recurrence_rule,
+        instance_count=len(events),
+        first_start_time=parent.start_time,
+        last_start_time=events[-1].start_time,
+    )
+
+
+@app.get("/recurring-events", response_model=list[schemas.Event])
+async def list_recurring_events(db: Session = Depends(get_read_session)):
+    return crud.list_recurring_events(db)
+
+
+@app.patch("/recurring-events/{parent_event_id}", response_model=schemas.Event)
+async def update_recurring_event(
+    parent_event_id: int,
+    series_in: schemas.SeriesUpdate,
+    db: Session = Depends(get_db_session),
+):
+    parent = crud.get_recurring_parent(db, parent_event_id)
+    series = crud.get_series(db, parent.series_id) if parent is not None and parent.series_id else None
+    if series is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurring event not found")
+    try:
+        crud.update_series(db, series=series, series_in=series_in)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return crud.get_recurring_parent(db, parent_event_id)
+
+
+@app.get("/recurring-events/{parent_event_id}/instances", response_model=list[schemas.Event])
+async def list_recurring_event_instances(
+    parent_event_id: int,
+    start_after: Optional[datetime] = None,
+    end_before: Optional[datetime] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_session),
+):
+    if crud.get_recurring_parent(db, parent_event_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurring event not found")
+    return crud.get_recurring_event_instances(
+        db,
+        parent_event_id,
+        start_after=start_after,
+        end_before=end_before,
+        offset=offset,
+        limit=limit,
+    )
+
+
+async def _bulk_delete(field: str, value: str, dry_run: bool, db: Session, response: Response):
+    if dry_run:
+        matched, archived = crud.count_matching_events(db, field=field, value=value)
+        return schemas.DeletePreview(field=field, value=value, matched=matched, archived=archived)
+    job = await bulk_deleter.submit(field, value)
+    response.status_code = status.HTTP_202_ACCEPTED
+    response.headers["Location"] = f"/delete-jobs/{job.id}"
+    return schemas.DeleteJob.from_orm(job)
+
+
+@app.delete("/events/by-category", response_model=Union[schemas.DeleteJob, schemas.DeletePreview])
 async def delete_events_by_category(
+    response: Response,
     category: str = Query(..., min_length=1, max_length=50),
+    dry_run: bool = Query(False, description="Only count the events that would be deleted"),
     db: Session = Depends(get_db_session),
 ):
-    deleted = crud.delete_events_by_category(db, category=category)
-    return {"deleted": deleted}
+    return await _bulk_delete("category", category, dry_run, db, response)
 
 
-@app.delete("/events/by-title", response_model=dict)
+@app.delete("/events/by-title", response_model=Union[schemas.DeleteJob, schemas.DeletePreview])
 async def delete_events_by_title(
+    response: Response,
     title: str = Query(..., min_length=1, max_length=255),
+    dry_run: bool = Query(False, description="Only count the events that would be deleted"),
     db: Session = Depends(get_db_session),
 ):
-    deleted = crud.delete_events_by_title(db, title=title)
-    return {"deleted": deleted}
+    return await _bulk_delete("title", title, dry_run, db, response)
+
+
+@app.get("/delete-jobs/{job_id}", response_model=schemas.DeleteJob)
+async def read_delete_job(job_id: str, db: Session = Depends(get_db_session)):
+    # 进度由执行者写入主库；轮询只读副本时进度可能倒退
+    job = crud.get_delete_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delete job not found")
+    return job
 
 
 @app.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(event_id: int, db: Session = Depends(get_db_session)):
-    event = crud.get_event(db, event_id)
+    event = crud.get_event(db, event_id, include_archive=True)
     if event is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event not found")
     crud.delete_event(db, event=event)
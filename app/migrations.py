@@ -0,0 +1,170 @@
+"""
+Schema 升级与数据迁移
+
+migrate_database 在启动与部署钩子中调用，仅当 schema 指纹变化时执行。
+
+series 归并：早期版本中周期性事件的每个实例行都复制一份标题、备注、地点、提醒设置等字段。
+迁移后实例行只保留时间、提醒状态与 series_id，未单独修改过的字段置空，读取时由 series 补全。
+迁移是幂等的：已关联系列的行不会重复处理，可在每次 schema 升级时运行。
+"""
+import logging
+from typing import Dict, List
+
+from sqlalchemy import inspect, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from . import models
+from .database import Base, add_missing_columns, add_missing_indexes, engine, run_migrations_once
+from .search import SEARCH_INDEX_VERSION, drop_search_index, ensure_search_index
+from .stats import ROLLUP_ENABLED, drop_rollup_triggers, ensure_generation, ensure_rollup
+
+logger = logging.getLogger(__name__)
+
+_OCCURRENCE_TABLES = ("events", "events_archive")
+
+
+def _tables_requiring_title(bind: Engine) -> List[str]:
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    result = []
+    for name in _OCCURRENCE_TABLES:
+        if name not in existing:
+            continue
+        columns = {column["name"]: column for column in inspector.get_columns(name)}
+        if not columns.get("title", {}).get("nullable", True):
+            result.append(name)
+    return result
+
+
+def _relax_title(connection: Connection, name: str) -> None:
+    """去掉 title 的 NOT NULL 约束；SQLite 不支持修改列约束，按官方步骤重建表"""
+    if connection.dialect.name != "sqlite":
+        connection.exec_driver_sql(f"ALTER TABLE {name} ALTER COLUMN title DROP NOT NULL")
+        return
+    _rebuild_sqlite_table(connection, name)
+
+
+def _rebuild_sqlite_table(connection: Connection, name: str) -> None:
+    """按当前模型定义重建 SQLite 表并复制数据（调用方需先删除依赖该表的索引表、视图与触发器）"""
+    table = Base.metadata.tables[name]
+    inspector = inspect(connection)
+    present = {column["name"] for column in inspector.get_columns(name)}
+    columns = ", ".join(column.name for column in table.columns if column.name in present)
+    for index in inspector.get_indexes(name):
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index['name']}")
+    connection.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {name}_legacy")
+    table.create(connection)
+    connection.exec_driver_sql(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {name}_legacy")
+    connection.exec_driver_sql(f"DROP TABLE {name}_legacy")
+
+
+def _extract_series(connection: Connection) -> Dict[str, int]:
+    events = models.Event.__table__
+    archive = models.ArchivedEvent.__table__
+    series = models.Series.__table__
+
+    parents = connection.execute(
+        select(events)
+        .where(events.c.is_recurring.is_(True))
+        .where(events.c.parent_event_id == events.c.id)
+        .where(events.c.series_id.is_(None))
+    ).mappings().all()
+
+    linked = 0
+    for parent in parents:
+        values = {field: parent[field] for field in models.SERIES_FIELDS}
+        values["title"] = values["title"] or ""
+        series_id = connection.execute(series.insert().values(**values)).inserted_primary_key[0]
+        for table in (events, archive):
+            linked += connection.execute(
+                update(table)
+                .where(table.c.series_id.is_(None))
+                .where(table.c.parent_event_id == parent["id"])
+                .values(series_id=series_id)
+            ).rowcount
+
+    # 与系列值相同的字段不再逐行保存；不同的视为该实例的单独修改，保留原值
+    cleared = 0
+    for table in (events, archive):
+        for field in models.SERIES_FIELDS:
+            shared = select(series.c[field]).where(series.c.id == table.c.series_id).scalar_subquery()
+            cleared += connection.execute(
+                update(table)
+                .where(table.c.series_id.is_not(None))
+                .where(table.c[field].is_not(None))
+                .where(table.c[field].is_not_distinct_from(shared))
+                .values({field: None})
+            ).rowcount
+    return {"series_created": len(parents), "rows_linked": linked, "fields_cleared": cleared}
+
+
+def _drop_table_dependents(connection: Connection) -> None:
+    """重建行程表前删除全文索引与汇总触发器，由 ensure_search_index / ensure_rollup 重新创建"""
+    drop_search_index(connection)
+    drop_rollup_triggers(connection)
+    if not ROLLUP_ENABLED:
+        # 未启用时触发器不会重建，避免日后启用时沿用过期的汇总数据
+        connection.exec_driver_sql("DROP TABLE IF EXISTS event_daily_rollup")
+
+
+def ensure_event_id_sequence(bind: Engine) -> None:
+    """保证新行程不会复用已归档行程的ID（幂等）
+
+    SQLite 上 events 表改为 AUTOINCREMENT（旧库重建一次），并把序列推进到两表的最大ID；
+    PostgreSQL 的序列本身不回退，无需处理。
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    with bind.begin() as connection:
+        definition = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name='events'"
+        ).scalar()
+        if definition is not None and "AUTOINCREMENT" not in definition.upper():
+            _drop_table_dependents(connection)
+            _rebuild_sqlite_table(connection, "events")
+        highest = connection.exec_driver_sql(
+            "SELECT max(coalesce((SELECT max(id) FROM events), 0), coalesce((SELECT max(id) FROM events_archive), 0))"
+        ).scalar()
+        updated = connection.exec_driver_sql(
+            f"UPDATE sqlite_sequence SET seq = max(seq, {int(highest)}) WHERE name = 'events'"
+        ).rowcount
+        if not updated and highest:
+            connection.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('events', {int(highest)})")
+
+
+def normalize_series(bind: Engine) -> Dict[str, int]:
+    """迁移已有数据到 series 表（幂等），返回处理数量
+
+    重建表会连带删除全文索引与汇总触发器，调用方随后需执行 ensure_search_index / ensure_rollup。
+    """
+    rebuild = _tables_requiring_title(bind)
+    with bind.begin() as connection:
+        if rebuild:
+            _drop_table_dependents(connection)
+            for name in rebuild:
+                _relax_title(connection, name)
+        counts = _extract_series(connection)
+    counts["tables_rebuilt"] = len(rebuild)
+    if counts["series_created"]:
+        logger.info(
+            "Moved %(series_created)d recurring series into the series table "
+            "(%(rows_linked)d rows linked, %(fields_cleared)d duplicated values cleared)",
+            counts,
+        )
+    return counts
+
+
+def _migrate() -> None:
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
+    normalize_series(engine)
+    ensure_event_id_sequence(engine)
+    ensure_search_index(engine)
+    ensure_rollup(engine)
+    ensure_generation(engine)
+
+
+def migrate_database() -> bool:
+    """schema 指纹过期时建表/升级，部署钩子也调用此函数"""
+    return run_migrations_once(engine, _migrate, extra=f"rollup={ROLLUP_ENABLED};search={SEARCH_INDEX_VERSION}")
@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, Text, DateTime, cast, extract, select
+from sqlalchemy.orm import declared_attr, relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import func
 from sqlalchemy.types import DateTime as SADateTime, TypeDecorator
 
@@ -35,29 +37,178 @@ class UTCDateTime(TypeDecorator):
         return value.astimezone(timezone.utc)
 
 
-class Event(Base):
-    __tablename__ = "events"
+def utc_now() -> datetime:
+    """在 Python 侧生成修改时间：SQLite 的 CURRENT_TIMESTAMP 只精确到秒，
+    同一秒内的两次修改否则会得到相同的 HTTP 校验值"""
+    return datetime.now(timezone.utc)
+
+
+# 周期性事件各实例共享、存放在 series 表中的属性；实例行上的同名列仅保存单次覆盖值
+SERIES_FIELDS = (
+    "title",
+    "description",
+    "category",
+    "location",
+    "reminder_minutes_before",
+    "reminder_email",
+    "notification_channels",
+    "webhook_url",
+    "recurrence_rule",
+    "recurrence_end_date",
+    "timezone",
+)
+
+
+class Series(Base):
+    """周期性事件系列的共享属性"""
+
+    __tablename__ = "series"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     category = Column(String(50), nullable=True)
     location = Column(String(255), nullable=True)
-    start_time = Column(UTCDateTime(), nullable=False)
+    reminder_minutes_before = Column(Integer, nullable=True)
+    reminder_email = Column(String(255), nullable=True)
+    notification_channels = Column(String(100), nullable=True)
+    webhook_url = Column(String(500), nullable=True)
+    recurrence_rule = Column(String(500), nullable=True)
+    recurrence_end_date = Column(UTCDateTime(), nullable=True)
+    timezone = Column(String(64), nullable=True)
+    created_at = Column(UTCDateTime(), nullable=False, server_default=func.now())
+    updated_at = Column(UTCDateTime(), nullable=False, server_default=func.now(), onupdate=utc_now)
+
+
+class EventColumns:
+    """行程与其归档副本共有的列"""
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(255), nullable=True)  # 系列实例为空时取 series.title
+    description = Column(Text, nullable=True)
+    category = Column(String(50), nullable=True)
+    location = Column(String(255), nullable=True)
+    start_time = Column(UTCDateTime(), nullable=False, index=True)
     end_time = Column(UTCDateTime(), nullable=False)
     reminder_minutes_before = Column(Integer, nullable=True)
     reminder_email = Column(String(255), nullable=True)
     reminder_sent = Column(Boolean, nullable=False, default=False)
+    notification_channels = Column(String(100), nullable=True)  # 逗号分隔的通知渠道，空表示按已填写的目标（邮箱/Webhook）投递
+    webhook_url = Column(String(500), nullable=True)
     
     # 新增：周期性事件字段
     is_recurring = Column(Boolean, nullable=False, default=False)
     recurrence_rule = Column(String(500), nullable=True)  # 存储RRULE字符串
     recurrence_end_date = Column(UTCDateTime(), nullable=True)  # 重复结束日期
     parent_event_id = Column(Integer, nullable=True)  # 父事件ID（用于重复事件）
+    timezone = Column(String(64), nullable=True)  # IANA时区名称，用于重复规则展开与展示
+    series_id = Column(Integer, nullable=True, index=True)  # 所属系列（共享属性见 series 表）
     
     created_at = Column(UTCDateTime(), nullable=False, server_default=func.now())
-    updated_at = Column(UTCDateTime(), nullable=False, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(UTCDateTime(), nullable=False, server_default=func.now(), onupdate=utc_now)
+
+    @declared_attr
+    def series(cls):
+        return relationship(
+            Series,
+            primaryjoin=lambda: cls.series_id == Series.id,
+            foreign_keys=lambda: [cls.series_id],
+            lazy="joined",
+            viewonly=True,
+        )
 
     def remaining_minutes_until_start(self, reference: datetime) -> int:
         delta = self.start_time - reference
         return int(delta.total_seconds() // 60)
+
+
+def effective(model, field: str):
+    """系列属性字段的 SQL 表达式：优先取行上的覆盖值，否则取系列的值"""
+    column = getattr(model, field)
+    if field not in SERIES_FIELDS:
+        return column
+    shared = select(getattr(Series, field)).where(Series.id == model.series_id).scalar_subquery()
+    return func.coalesce(column, shared)
+
+
+def epoch_seconds(column, dialect: str):
+    """UTC 时间列换算为整数 Unix 秒（向下取整）的 SQL 表达式
+
+    不支持的数据库返回 None。
+    """
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    if dialect == "postgresql":
+        return cast(func.floor(extract("epoch", column)), BigInteger)
+    return None
+
+
+def reminder_epoch(model, dialect: str):
+    """提醒时间的整数 Unix 秒（向下取整）SQL 表达式
+
+    提醒查询可直接按提醒时间过滤，无需加载所有即将开始的行程；不支持的数据库返回 None。
+    """
+    start = epoch_seconds(model.start_time, dialect)
+    if start is None:
+        return None
+    return start - effective(model, "reminder_minutes_before") * 60
+
+
+def hydrate_series(instances):
+    """用所属系列的值补全实例行上为空的系列属性
+
+    补全的值作为已提交状态写入，不会被当作覆盖值写回数据库。
+    """
+    for instance in instances:
+        series = instance.series
+        if series is None:
+            continue
+        for field in SERIES_FIELDS:
+            if getattr(instance, field) is None:
+                set_committed_value(instance, field, getattr(series, field))
+    return instances
+
+
+class Event(EventColumns, Base):
+    __tablename__ = "events"
+    # 归档行保留原ID；SQLite 默认取当前最大ID加一，会复用刚被归档的ID，改用只增不减的序列
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class ArchivedEvent(EventColumns, Base):
+    """已结束较久的行程（由保留任务从 events 表迁移而来，保留原始ID）"""
+
+    __tablename__ = "events_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    end_time = Column(UTCDateTime(), nullable=False, index=True)
+    archived_at = Column(UTCDateTime(), nullable=False, server_default=func.now())
+
+
+class DeleteJob(Base):
+    """按分类/标题批量删除的后台任务（分批推进，进度随每批一起提交，可在重启后续跑）"""
+
+    __tablename__ = "delete_jobs"
+
+    id = Column(String(32), primary_key=True)
+    field = Column(String(20), nullable=False)  # "category" 或 "title"
+    value = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/interrupted/completed/failed
+    matched = Column(Integer, nullable=False, default=0)  # 创建任务时匹配的行程数
+    deleted = Column(Integer, nullable=False, default=0)
+    last_id = Column(Integer, nullable=False, default=0)  # 已处理到的 id（不含更大的 id）
+    max_id = Column(Integer, nullable=False, default=0)  # 创建任务时 events 表的最大 id
+    error = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime(), nullable=False, server_default=func.now())
+    finished_at = Column(UTCDateTime(), nullable=True)
+    claimed_by = Column(String(32), nullable=True)  # 当前执行该任务的进程（BulkDeleteRunner 实例）
+    heartbeat_at = Column(UTCDateTime(), nullable=True)  # running 期间每批更新；过期说明执行进程已退出
+
+
+class CacheGeneration(Base):
+    """跨进程缓存的版本号：写入方在同一事务中递增，各 worker 读取后据此判断本地缓存是否过期"""
+
+    __tablename__ = "cache_generations"
+
+    name = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,56 @@
+"""
+HTTP 内容协商：解析 Accept / Accept-Encoding 中的 q 值（RFC 9110 §12.4.2）
+
+q=0 表示明确拒绝；未写 q 时为 1；q 值不合法的项按规范忽略。
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+def parse_qvalues(header: Optional[str]) -> Dict[str, float]:
+    """把 "gzip;q=0.8, br" 这样的列表解析为 {取值（小写，不含参数）: q}；同一取值出现多次时取最大的 q"""
+    qualities: Dict[str, float] = {}
+    for element in (header or "").split(","):
+        value, *params = (part.strip() for part in element.split(";"))
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip().lower() != "q":
+                continue
+            try:
+                quality = float(raw.strip())
+            except ValueError:
+                quality = -1.0
+            break
+        if not 0.0 <= quality <= 1.0:
+            continue
+        value = value.lower()
+        qualities[value] = max(quality, qualities.get(value, 0.0))
+    return qualities
+
+
+def media_type_quality(qualities: Dict[str, float], media_type: str) -> float:
+    """媒体类型的 q：精确匹配优先，其次 type/*，再次 */*；均未列出时为 0"""
+    main_type = media_type.split("/", 1)[0]
+    for candidate in (media_type, f"{main_type}/*", "*/*"):
+        if candidate in qualities:
+            return qualities[candidate]
+    return 0.0
+
+
+def acceptable_encodings(header: Optional[str], available: Iterable[str]) -> List[str]:
+    """available 中客户端接受（q > 0）的内容编码，按 q 从高到低排列（q 相同时保持 available 的顺序）
+
+    未列出的编码取 "*" 的 q；请求不带 Accept-Encoding 时不压缩。
+    """
+    qualities = parse_qvalues(header)
+    wildcard = qualities.get("*", 0.0)
+    ranked = [(qualities.get(encoding, wildcard), encoding) for encoding in available]
+    ranked.sort(key=lambda item: -item[0])
+    return [encoding for quality, encoding in ranked if quality > 0]
+
+
+def choose_encoding(header: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """客户端最偏好的可用内容编码；没有可接受的编码时返回 None"""
+    return next(iter(acceptable_encodings(header, available)), None)
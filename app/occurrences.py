@@ -0,0 +1,83 @@
+"""
+周期性事件展开缓存
+
+以 (RRULE, 首次开始时间, 持续时长, 时区) 为键缓存完整的展开结果；
+结果以 array('q')（UTC 纪元秒）紧凑存储，而不是 datetime 元组列表。
+展开结果完全由键决定，规则修改后自然对应新键，缓存项无需失效，只按 LRU 淘汰。
+"""
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from .utils import generate_recurrence_dates, parse_ical_rrule
+
+CacheKey = Tuple[str, int, int, Optional[str]]
+
+
+class OccurrenceCache:
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[CacheKey, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def starts(
+        self,
+        rrule: str,
+        dtstart: datetime,
+        duration: timedelta,
+        *,
+        tz: Optional[str] = None,
+    ) -> array:
+        """返回各次发生的开始时间（UTC 纪元秒）"""
+        key: CacheKey = (rrule, int(dtstart.timestamp()), int(duration.total_seconds()), tz)
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        result = _expand(rrule, dtstart, duration, tz)
+
+        with self._lock:
+            self._items[key] = result
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return result
+
+
+def _expand(
+    rrule: str,
+    dtstart: datetime,
+    duration: timedelta,
+    tz: Optional[str],
+) -> array:
+    rule = parse_ical_rrule(rrule)
+    dates = generate_recurrence_dates(
+        start_date=dtstart,
+        end_date=dtstart + duration,
+        frequency=rule.get("frequency", "weekly"),
+        interval=rule.get("interval", 1),
+        until_date=rule.get("until_date"),
+        count=rule.get("count"),
+        tz=tz,
+    )
+    return array("q", (int(start.timestamp()) for start, _end in dates))
+
+
+def to_intervals(starts: array, duration: timedelta) -> List[Tuple[datetime, datetime]]:
+    return [
+        (start, start + duration)
+        for start in (datetime.fromtimestamp(epoch, tz=timezone.utc) for epoch in starts)
+    ]
+
+
+occurrence_cache = OccurrenceCache()
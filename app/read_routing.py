@@ -0,0 +1,61 @@
+import os
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import READ_REPLICA
+
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# 只是因为查询放不进 URL 才用 POST，这些路由不写入
+READ_ONLY_PATHS = ("/availability/find",)
+
+
+def reads_from_primary(request: Request) -> bool:
+    """该请求是否必须读主库才能看到客户端自己的写入"""
+    if not READ_REPLICA:
+        return True
+    try:
+        return float(request.cookies[STICKY_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """客户端写入后的 ``sticky_seconds`` 秒内，其读请求固定走主库
+
+    成功的非安全请求设置一个记录到期时间的 Cookie，跨 worker 生效且无需服务端状态；
+    该时长应大于只读副本的通常延迟。未配置只读引擎时不做任何处理。
+    """
+
+    def __init__(self, app: ASGIApp, *, sticky_seconds: float = 5.0) -> None:
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    @classmethod
+    def from_env(cls, app: ASGIApp) -> "ReadYourWritesMiddleware":
+        return cls(app, sticky_seconds=float(os.getenv("READ_STICKY_SECONDS", "5")))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not READ_REPLICA
+            or scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or scope["path"] in READ_ONLY_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                expires = time.time() + self.sticky_seconds
+                MutableHeaders(raw=message["headers"]).append(
+                    "Set-Cookie",
+                    f"{STICKY_COOKIE}={expires:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
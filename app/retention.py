@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from . import crud
+from .database import SessionLocal
+from .lease import FileLease
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """定期把结束超过 ``retain_days`` 天的行程迁移到归档表
+
+    每批在工作线程中以单独的短事务执行，批次之间稍作停顿，API 写入与提醒调度器
+    不会被长时间持有的写锁卡住。每个 worker 进程都运行该任务，但只有持有租约
+    （``ARCHIVE_LEASE_FILE``）的那个执行归档，其余的在每个间隔重试。
+    """
+
+    def __init__(
+        self,
+        retain_days: int,
+        *,
+        interval_seconds: int = 3600,
+        batch_size: int = 500,
+        pause_seconds: float = 0.2,
+        lease_path: Optional[str] = None,
+    ) -> None:
+        self.retain_days = retain_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._lease = FileLease(lease_path or os.getenv("ARCHIVE_LEASE_FILE", "archive.lock"))
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run(), name="archive-retention")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop_event.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        logger.info("Retention job started (archiving events ended more than %d days ago)", self.retain_days)
+        try:
+            while not self._stop_event.is_set():
+                if self._lease.acquire():
+                    try:
+                        await self.run_once()
+                    except Exception as exc:  # noqa: BLE001
+                        logger.exception("Archiving failed: %s", exc)
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=self.interval_seconds)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            self._lease.release()
+        logger.info("Retention job stopped")
+
+    async def run_once(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retain_days)
+        total = 0
+        while not self._stop_event.is_set():
+            moved = await asyncio.to_thread(self._archive_batch, cutoff)
+            total += moved
+            if moved < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+        if total:
+            logger.info("Archived %d events ended before %s", total, cutoff.isoformat())
+        return total
+
+    def _archive_batch(self, cutoff: datetime) -> int:
+        with SessionLocal() as db:
+            return crud.archive_events_batch(db, ended_before=cutoff, batch_size=self.batch_size)
@@ -1,71 +1,267 @@
 import asyncio
 import logging
-from datetime import datetime, timezone
-from typing import Optional
+import os
+from collections import defaultdict
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
-from . import crud, emailer
+from . import crud, emailer, models
+from .admission import AdmissionControl
+from .channels import Channel, channel_names_for, load_channels
+from .clock import Clock
 from .database import SessionLocal
+from .lease import FileLease
+from .sendlog import SendLog, reminder_key
+from .wakeup import WakeupListener
 
 logger = logging.getLogger(__name__)
 
 
+def render_event_lines(event: models.Event) -> List[str]:
+    lines = [
+        f"标题: {event.title}",
+        f"开始时间 (UTC): {event.start_time.isoformat()}",
+        f"结束时间 (UTC): {event.end_time.isoformat()}",
+    ]
+    if event.location:
+        lines.append(f"地点: {event.location}")
+    if event.description:
+        lines.append("\n备注:\n" + event.description)
+    return lines
+
+
+@dataclass
+class Delivery:
+    channel: Channel
+    target: str
+    subject: str
+    body: str
+    events: List[models.Event]
+
+    def keys(self) -> List[str]:
+        return [f"{reminder_key(event)}:{self.channel.name}" for event in self.events]
+
+
+def render_digest(events: List[models.Event]) -> Tuple[str, str]:
+    subject = f"提醒: {len(events)} 个即将开始的行程"
+    sections = []
+    for index, event in enumerate(events, 1):
+        sections.append(f"[{index}]\n" + "\n".join(render_event_lines(event)))
+    return subject, "\n\n".join(sections)
+
+
 class ReminderDispatcher:
-    def __init__(self, poll_interval_seconds: int = 60) -> None:
+    """发送到期提醒；两次发送之间休眠到下一个提醒的到期时间
+
+    配置 ``wakeup`` 监听时，改变提醒时间的写入会立即唤醒循环重新规划，兜底的对账扫描
+    可以拉长间隔（``reconcile_interval_seconds``）；未配置时每个轮询间隔扫描一次。
+    ``admission`` 在每批发送期间暂扣高开销 API 请求的名额。
+    ``clock`` 与 ``channels`` 可以替换，例如 scripts/simulate_reminders.py 用虚拟时间
+    和本地接收端重放一个月的提醒。
+    """
+
+    def __init__(
+        self,
+        poll_interval_seconds: int = 60,
+        *,
+        digest: bool = False,
+        digest_window_minutes: int = 30,
+        send_log_path: Optional[str] = None,
+        max_concurrency: int = 16,
+        lease_path: Optional[str] = None,
+        wakeup: Optional[WakeupListener] = None,
+        reconcile_interval_seconds: int = 300,
+        clock: Optional[Clock] = None,
+        channels: Optional[Dict[str, Channel]] = None,
+        admission: Optional[AdmissionControl] = None,
+    ) -> None:
         self.poll_interval_seconds = poll_interval_seconds
+        self.scan_interval_seconds = reconcile_interval_seconds if wakeup is not None else poll_interval_seconds
+        self.digest = digest
+        self.digest_window_minutes = max(1, digest_window_minutes)
+        self.max_concurrency = max(1, max_concurrency)
         self._task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
+        self._wake_event = asyncio.Event()
+        self._wakeup = wakeup
+        self._admission = admission
+        self._clock = clock or Clock()
         self._smtp_settings = emailer.load_smtp_settings()
+        self._channels: Dict[str, Channel] = channels if channels is not None else load_channels(self._smtp_settings)
+        self._send_log = SendLog(send_log_path or os.getenv("REMINDER_SEND_LOG", "reminder_send.log"))
+        self._lease = FileLease(lease_path or os.getenv("REMINDER_LEASE_FILE", "reminder.lock"))
+        self.last_tick_at: Optional[datetime] = None
+        self.next_reminder_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lease.held
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "leader": self.is_leader,
+            "last_tick_at": self.last_tick_at.isoformat() if self.last_tick_at else None,
+            "poll_interval_seconds": self.poll_interval_seconds,
+            "scan_interval_seconds": self.scan_interval_seconds,
+            "wakeup": self._wakeup.backend if self._wakeup is not None else None,
+            "next_reminder_at": self.next_reminder_at.isoformat() if self.next_reminder_at else None,
+        }
 
     async def start(self) -> None:
         if self._task is not None and not self._task.done():
             return
         self._stop_event.clear()
-        self._task = asyncio.create_task(self._run())
+        self._task = asyncio.create_task(self._run(), name="reminder-dispatcher")
 
     async def stop(self) -> None:
         if self._task is None:
             return
         self._stop_event.set()
+        self._wake_event.set()
         await self._task
         self._task = None
 
     async def _run(self) -> None:
         logger.info("Reminder dispatcher started")
-        while not self._stop_event.is_set():
-            await self._dispatch_once()
-            try:
-                await asyncio.wait_for(self._stop_event.wait(), timeout=self.poll_interval_seconds)
-            except asyncio.TimeoutError:
-                continue
+        if self._wakeup is not None:
+            await self._wakeup.start(self._wake_event.set)
+        reload_send_log = False
+        try:
+            while not self._stop_event.is_set():
+                # 在规划之前清除，发送过程中到达的唤醒不会丢失
+                self._wake_event.clear()
+                delay = self.poll_interval_seconds
+                # 只有持有租约的 worker 发送；备用 worker（如平滑重启时的新一代）在持有者停止后接手
+                if not self._lease.held:
+                    # 上一个持有者可能在发送后、提交前退出；它记下的键只在文件中，
+                    # 不在本 worker 启动时加载的副本里
+                    reload_send_log = True
+                if self._lease.acquire():
+                    now = self._clock.now()
+                    try:
+                        if reload_send_log:
+                            self._send_log.reload()
+                            reload_send_log = False
+                        # 发送期间减少并发的高开销 API 请求（见 admission.py）
+                        async with self._admission.reserved() if self._admission else nullcontext():
+                            await self._dispatch_once(now)
+                        delay = self._next_delay(now)
+                    except Exception as exc:  # noqa: BLE001
+                        # 例如批量删除期间的 "database is locked"；一个轮询间隔后重试
+                        logger.exception("Reminder dispatch failed: %s", exc)
+                        delay = self.poll_interval_seconds
+                self.last_tick_at = self._clock.now()
+                await self._clock.wait(self._wake_event, delay)
+        finally:
+            # 此时进行中的批次已提交，接任者从干净的状态开始
+            self._lease.release()
+            if self._wakeup is not None:
+                await self._wakeup.stop()
         logger.info("Reminder dispatcher stopped")
 
-    async def _dispatch_once(self) -> None:
-        now = datetime.now(timezone.utc)
+    def _next_delay(self, now: datetime) -> float:
+        """距下一个提醒到期的秒数，不超过对账间隔"""
+        with SessionLocal() as db:
+            self.next_reminder_at = crud.next_reminder_at(
+                db, after=now, horizon=timedelta(seconds=self.scan_interval_seconds)
+            )
+        if self.next_reminder_at is None:
+            return self.scan_interval_seconds
+        seconds = (self.next_reminder_at - self._clock.now()).total_seconds()
+        return min(self.scan_interval_seconds, max(0.0, seconds))
+
+    async def _dispatch_once(self, now: datetime) -> None:
+        # 没有收到唤醒的到期提醒仍会被下一次扫描发现，最多晚一个扫描间隔
+        lookback_minutes = max(1, -(-self.scan_interval_seconds // 60))
         with SessionLocal() as db:
-            due_events = crud.due_reminders(db, as_of=now, lookback_minutes=max(1, self.poll_interval_seconds // 60))
+            due_events = crud.due_reminders(db, as_of=now, lookback_minutes=lookback_minutes)
             if not due_events:
                 return
             logger.debug("Processing %d due reminders", len(due_events))
-            for event in due_events:
-                subject = f"提醒: {event.title}"
-                body_lines = [
-                    f"标题: {event.title}",
-                    f"开始时间 (UTC): {event.start_time.isoformat()}",
-                    f"结束时间 (UTC): {event.end_time.isoformat()}",
-                ]
-                if event.location:
-                    body_lines.append(f"地点: {event.location}")
-                if event.description:
-                    body_lines.append("\n备注:\n" + event.description)
-                body = "\n".join(body_lines)
+            deliveries = self._plan_deliveries(due_events)
+            # 崩溃前（或上一轮部分完成时）已投递的渠道不再重复发送
+            pending = [delivery for delivery in deliveries if not all(key in self._send_log for key in delivery.keys())]
+            await self._deliver_all(pending)
+
+            planned = {event.id for delivery in deliveries for event in delivery.events}
+            undeliverable = [event.id for event in due_events if event.id not in planned]
+            if undeliverable:
+                logger.warning("No deliverable channel for due reminder(s) %s", undeliverable)
+            outstanding = {
+                event.id
+                for delivery in deliveries
+                for event, key in zip(delivery.events, delivery.keys())
+                if key not in self._send_log
+            }
+            # 没有可投递渠道的行程保持未发送，不标记为已提醒
+            sent_ids = [event.id for event in due_events if event.id in planned and event.id not in outstanding]
+            if sent_ids:
+                crud.mark_reminders_sent(db, sent_ids)
+            # 保留部分投递成功的行程的键，重试时跳过已成功的渠道
+            self._send_log.retain(lambda key: int(key.split(":", 1)[0]) in outstanding)
+
+    def _plan_deliveries(self, events: List[models.Event]) -> List[Delivery]:
+        deliveries: List[Delivery] = []
+        digest_candidates: List[models.Event] = []
+        for event in events:
+            for name in channel_names_for(event):
+                channel = self._channels.get(name)
+                if channel is None:
+                    logger.warning("Unknown notification channel %r on event %s", name, event.id)
+                    continue
+                target = channel.target_for(event)
+                if not target:
+                    logger.warning("Event %s lists channel %r but has no target for it", event.id, name)
+                    continue
+                if self.digest and channel.name == "email":
+                    digest_candidates.append(event)
+                    continue
+                deliveries.append(
+                    Delivery(channel, target, f"提醒: {event.title}", "\n".join(render_event_lines(event)), [event])
+                )
+        if digest_candidates:
+            email_channel = self._channels["email"]
+            for (recipient, _bucket), grouped in self._group_for_digest(digest_candidates).items():
+                if len(grouped) == 1:
+                    subject = f"提醒: {grouped[0].title}"
+                    body = "\n".join(render_event_lines(grouped[0]))
+                else:
+                    subject, body = render_digest(grouped)
+                deliveries.append(Delivery(email_channel, recipient, subject, body, grouped))
+        return deliveries
+
+    async def _deliver_all(self, deliveries: List[Delivery]) -> None:
+        """并发投递，一个慢渠道不会拖住其他渠道"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def deliver(delivery: Delivery) -> None:
+            async with semaphore:
                 try:
-                    await asyncio.to_thread(
-                        emailer.send_email,
-                        event.reminder_email,
-                        subject,
-                        body,
-                        self._smtp_settings,
-                    )
-                    crud.mark_reminder_sent(db, event)
+                    await delivery.channel.send(delivery.target, delivery.subject, delivery.body, delivery.events)
                 except Exception as exc:  # noqa: BLE001
-                    logger.exception("Failed to send reminder for event %s: %s", event.id, exc)
+                    logger.exception(
+                        "Failed to send %s reminder for event(s) %s: %s",
+                        delivery.channel.name,
+                        [event.id for event in delivery.events],
+                        exc,
+                    )
+                    return
+            self._send_log.record(delivery.keys())
+
+        await asyncio.gather(*(deliver(delivery) for delivery in deliveries))
+
+    def _group_for_digest(self, events: List[models.Event]) -> Dict[Tuple[str, int], List[models.Event]]:
+        """按收件人与行程开始时间所在的时间段对提醒分组"""
+        bucket_seconds = self.digest_window_minutes * 60
+        groups: Dict[Tuple[str, int], List[models.Event]] = defaultdict(list)
+        for event in events:
+            bucket = int(event.start_time.timestamp()) // bucket_seconds
+            groups[(event.reminder_email, bucket)].append(event)
+        return groups
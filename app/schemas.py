@@ -1,7 +1,45 @@
-from datetime import datetime, timezone
+from datetime import datetime, time, timedelta, timezone
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, root_validator, validator
+
+from .utils import get_zone
+
+
+# 通知渠道及其投递目标字段；未指定渠道时按已填写的目标投递
+CHANNEL_TARGETS = {"email": "reminder_email", "webhook": "webhook_url"}
+NOTIFICATION_CHANNELS = set(CHANNEL_TARGETS)
+
+
+def channels_without_target(channels: Optional[str], targets: dict) -> list[str]:
+    """channels 中缺少投递目标（targets 中对应字段为空）的渠道"""
+    if not channels:
+        return []
+    return [name for name in channels.split(",") if name in CHANNEL_TARGETS and not targets.get(CHANNEL_TARGETS[name])]
+
+
+def _check_channel_targets(cls, values: dict) -> dict:
+    missing = channels_without_target(values.get("notification_channels"), values)
+    if missing:
+        raise ValueError(f"Notification channel(s) without a target: {', '.join(missing)}")
+    return values
+
+
+def _normalize_channels(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in NOTIFICATION_CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown notification channel(s): {', '.join(unknown)}")
+    return ",".join(dict.fromkeys(names)) or None
+
+
+def _validate_timezone_name(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    get_zone(value)
+    return value
 
 
 class EventBase(BaseModel):
@@ -13,11 +51,17 @@ class EventBase(BaseModel):
     end_time: datetime
     reminder_minutes_before: Optional[int] = Field(None, ge=0, le=10080)
     reminder_email: Optional[EmailStr] = None
+    notification_channels: Optional[str] = Field(None, max_length=100)  # 例如 "email,webhook"
+    webhook_url: Optional[str] = Field(None, max_length=500, regex="^https?://")
     
     # 新增：周期性事件字段
     is_recurring: Optional[bool] = False
     recurrence_rule: Optional[str] = Field(None, max_length=500)
     recurrence_end_date: Optional[datetime] = None
+    timezone: Optional[str] = Field(None, max_length=64)
+
+    _check_timezone = validator("timezone", allow_reuse=True)(_validate_timezone_name)
+    _check_channels = validator("notification_channels", allow_reuse=True)(_normalize_channels)
 
     @validator("start_time", "end_time", pre=True)
     def ensure_datetime_obj(cls, value):
@@ -50,7 +94,7 @@ class EventBase(BaseModel):
 
 
 class EventCreate(EventBase):
-    pass
+    _check_channel_targets = root_validator(skip_on_failure=True, allow_reuse=True)(_check_channel_targets)
 
 
 class EventUpdate(BaseModel):
@@ -62,11 +106,17 @@ class EventUpdate(BaseModel):
     end_time: Optional[datetime] = None
     reminder_minutes_before: Optional[int] = Field(None, ge=0, le=10080)
     reminder_email: Optional[EmailStr] = None
+    notification_channels: Optional[str] = Field(None, max_length=100)  # 例如 "email,webhook"
+    webhook_url: Optional[str] = Field(None, max_length=500, regex="^https?://")
     
     # 新增：周期性事件字段
     is_recurring: Optional[bool] = None
     recurrence_rule: Optional[str] = Field(None, max_length=500)
     recurrence_end_date: Optional[datetime] = None
+    timezone: Optional[str] = Field(None, max_length=64)
+
+    _check_timezone = validator("timezone", allow_reuse=True)(_validate_timezone_name)
+    _check_channels = validator("notification_channels", allow_reuse=True)(_normalize_channels)
 
     @validator("start_time", "end_time", pre=True)
     def ensure_datetime_obj(cls, value):
@@ -106,6 +156,7 @@ class Event(EventBase):
     id: int
     reminder_sent: bool
     parent_event_id: Optional[int] = None
+    series_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -113,6 +164,12 @@ class Event(EventBase):
         orm_mode = True
 
 
+class EventSearchHit(BaseModel):
+    event: Event
+    rank: float
+    snippet: Optional[str] = None
+
+
 # 新增：周期性事件创建请求
 class RecurringEventCreate(BaseModel):
     title: str = Field(..., max_length=255)
@@ -123,12 +180,19 @@ class RecurringEventCreate(BaseModel):
     end_time: datetime
     reminder_minutes_before: Optional[int] = Field(None, ge=0, le=10080)
     reminder_email: Optional[EmailStr] = None
+    notification_channels: Optional[str] = Field(None, max_length=100)  # 例如 "email,webhook"
+    webhook_url: Optional[str] = Field(None, max_length=500, regex="^https?://")
     
     # 周期性设置
     recurrence_frequency: str = Field(..., regex="^(weekly|daily|monthly)$")
     recurrence_interval: int = Field(1, ge=1, le=52)  # 间隔周数
     recurrence_end_date: datetime
     recurrence_count: Optional[int] = Field(None, ge=1, le=100)  # 重复次数（可选）
+    timezone: Optional[str] = Field(None, max_length=64)  # 按该时区的本地时间展开，默认 DEFAULT_TIMEZONE
+
+    _check_timezone = validator("timezone", allow_reuse=True)(_validate_timezone_name)
+    _check_channels = validator("notification_channels", allow_reuse=True)(_normalize_channels)
+    _check_channel_targets = root_validator(skip_on_failure=True, allow_reuse=True)(_check_channel_targets)
 
     @validator("start_time", "end_time", "recurrence_end_date")
     def ensure_timezone(cls, value: datetime):
@@ -149,3 +213,160 @@ class RecurringEventCreate(BaseModel):
         if start_time and recurrence_end_date <= start_time:
             raise ValueError("Recurrence end date must be after start time")
         return recurrence_end_date
+
+
+class SeriesUpdate(BaseModel):
+    """修改周期性事件系列的共享属性（时间与重复规则不在此修改）"""
+
+    title: Optional[str] = Field(None, max_length=255)
+    description: Optional[str] = None
+    category: Optional[str] = Field(None, max_length=50)
+    location: Optional[str] = Field(None, max_length=255)
+    reminder_minutes_before: Optional[int] = Field(None, ge=0, le=10080)
+    reminder_email: Optional[EmailStr] = None
+    notification_channels: Optional[str] = Field(None, max_length=100)
+    webhook_url: Optional[str] = Field(None, max_length=500, regex="^https?://")
+
+    _check_channels = validator("notification_channels", allow_reuse=True)(_normalize_channels)
+
+
+class RecurringEventSummary(BaseModel):
+    """周期性事件创建结果（不返回全部实例）"""
+
+    parent_event_id: int
+    title: str
+    recurrence_rule: Optional[str] = None
+    instance_count: int
+    first_start_time: datetime
+    last_start_time: datetime
+
+
+class StatsBucket(BaseModel):
+    key: str
+    event_count: int
+    total_minutes: float
+
+
+class StatsResponse(BaseModel):
+    group_by: str
+    source: str  # "events"（原始表聚合）或 "rollup"（按日汇总表）
+    buckets: list[StatsBucket]
+
+
+class DeleteJob(BaseModel):
+    """批量删除任务进度"""
+
+    id: str
+    field: str
+    value: str
+    status: str  # pending/running/interrupted/completed/failed
+    matched: int
+    deleted: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    progress: float = 0.0
+
+    @validator("progress", always=True)
+    def compute_progress(cls, value: float, values):
+        if values.get("status") == "completed":
+            return 1.0
+        matched = values.get("matched") or 0
+        return min(values.get("deleted", 0) / matched, 1.0) if matched else 0.0
+
+    class Config:
+        orm_mode = True
+
+
+class DeletePreview(BaseModel):
+    """dry_run=true 时只返回将被删除的行程数（matched 含已归档的 archived 条）"""
+
+    field: str
+    value: str
+    matched: int
+    archived: int = 0
+    dry_run: bool = True
+
+
+MAX_AVAILABILITY_WINDOW = timedelta(days=62)
+
+
+class AvailabilityRequest(BaseModel):
+    """查找共同空闲时段：参与者按提醒邮箱匹配其行程，地点按 location 精确匹配"""
+
+    participants: list[EmailStr] = Field(default_factory=list, max_items=100)
+    locations: list[str] = Field(default_factory=list, max_items=50)
+    duration_minutes: int = Field(..., ge=5, le=1440)
+    window_start: datetime
+    window_end: datetime
+    working_hours_start: time = time(9, 0)
+    working_hours_end: time = time(18, 0)  # 00:00 表示到当天结束
+    working_days: list[int] = Field(default_factory=lambda: [1, 2, 3, 4, 5])  # ISO 星期，1 为周一
+    timezone: Optional[str] = Field(None, max_length=64)  # 工作时段所在时区，默认 DEFAULT_TIMEZONE
+    step_minutes: int = Field(15, ge=5, le=240)  # 候选开始时间的间隔（从工作开始时刻对齐）
+    limit: int = Field(5, ge=1, le=50)
+
+    _check_timezone = validator("timezone", allow_reuse=True)(_validate_timezone_name)
+
+    @validator("window_start", "window_end")
+    def ensure_timezone(cls, value: datetime):
+        if value.tzinfo is None or value.tzinfo.utcoffset(value) is None:
+            raise ValueError("Datetime must include timezone information")
+        return value.astimezone(timezone.utc)
+
+    @validator("window_end")
+    def validate_window(cls, window_end: datetime, values):
+        window_start = values.get("window_start")
+        if window_start and window_end <= window_start:
+            raise ValueError("Window end must be after window start")
+        if window_start and window_end - window_start > MAX_AVAILABILITY_WINDOW:
+            raise ValueError(f"Search window must not exceed {MAX_AVAILABILITY_WINDOW.days} days")
+        return window_end
+
+    @validator("working_hours_start", "working_hours_end")
+    def ensure_local_time(cls, value: time):
+        if value.tzinfo is not None:
+            raise ValueError("Working hours are local times; set the zone with timezone")
+        return value
+
+    @validator("working_hours_end")
+    def validate_working_hours(cls, working_hours_end: time, values):
+        working_hours_start = values.get("working_hours_start")
+        if working_hours_start and working_hours_end != time(0) and working_hours_end <= working_hours_start:
+            raise ValueError("Working hours end must be after start")
+        return working_hours_end
+
+    @validator("working_days")
+    def validate_working_days(cls, value: list[int]):
+        if not value or any(day < 1 or day > 7 for day in value):
+            raise ValueError("Working days must be ISO weekdays 1-7")
+        return sorted(set(value))
+
+    @root_validator(skip_on_failure=True)
+    def require_resources(cls, values):
+        if not values.get("participants") and not values.get("locations"):
+            raise ValueError("At least one participant or location is required")
+        return values
+
+
+class AvailabilitySlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class AvailabilityResponse(BaseModel):
+    """最早的可用时段（按请求时区返回），busy_intervals 为合并后的忙碌区间数"""
+
+    timezone: str
+    slots: list[AvailabilitySlot]
+    busy_intervals: int
+
+
+class QueryMonitorUpdate(BaseModel):
+    """运行时调整慢查询日志与 Server-Timing（未给出的字段保持不变）"""
+
+    slow_log: Optional[bool] = None
+    slow_ms: Optional[float] = Field(None, ge=0)
+    explain: Optional[bool] = None  # 为慢 SELECT 附带执行计划
+    capture_params: Optional[bool] = None  # 记录绑定参数（可能含个人信息）
+    server_timing: Optional[bool] = None
@@ -0,0 +1,451 @@
+"""
+行程全文检索（标题、备注、地点）
+
+- 检索范围包括已归档的行程：events 与 events_archive 各建一套索引，查询时合并两边结果
+- SQLite：FTS5 外部内容表 + trigram 分词器（可直接匹配中文子串），内容来自合并了系列属性的视图，
+  由 events/events_archive 与 series 上的触发器保持同步
+- SQLite 短查询（1～2个字符）：trigram 无法匹配，改查 unicode61 分词的 *_fts_short 表，
+  写入时每个中日韩字符两侧插入零宽空格（search_terms 函数，由 database.py 在连接上注册），
+  单字成词，词组查询即等价于子串匹配；拉丁字母按词前缀匹配
+- PostgreSQL：events、events_archive 与 series 上基于 to_tsvector 的 GIN 表达式索引，随表自动维护；
+  'simple' 配置不切分中文，含中日韩字符的查询改走 pg_trgm（gin_trgm_ops）索引上的 ILIKE
+- 其他情况：回退为 LIKE 扫描，摘要在 Python 中截取
+"""
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+SearchHit = Tuple[models.EventColumns, float, Optional[str]]
+
+# trigram 分词器无法匹配短于3个字符的查询
+MIN_FTS_QUERY_LENGTH = 3
+# 索引定义变化时递增，使已有数据库在下次启动时重新执行迁移
+SEARCH_INDEX_VERSION = 3
+
+# 中日韩统一表意文字（含扩展A与兼容区）、假名与谚文音节
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+# unicode61 把零宽空格（Cf 类）视为分隔符，显示时可原样去除
+_ZWSP = "\u200b"
+_SNIPPET_CONTEXT = 16
+
+_SEARCH_COLUMNS = ("title", "description", "location")
+
+
+def _pg_document(*sources: str) -> str:
+    """拼接检索文本；多个来源时按顺序取第一个非空值（实例覆盖值优先于系列值）"""
+    parts = []
+    for column in _SEARCH_COLUMNS:
+        candidates = ", ".join(f"{source}{column}" for source in sources)
+        parts.append(f"coalesce({candidates}, '')")
+    return " || ' ' || ".join(parts)
+
+
+# 与表达式索引定义保持一致（不带表前缀）
+_PG_DOCUMENT = _pg_document("")
+_PG_MERGED_DOCUMENT = _pg_document("e.", "s.")
+
+# 主表与归档表各有一套索引：归档保留原 id，旧库中归档行的 id 可能与主表行重复，不能共用 rowid
+_INDEXED_TABLES = ("events", "events_archive")
+# 各表触发器名前缀（主表沿用最初的名称，已有数据库中的触发器无需重建）
+_SERIES_TRIGGER_PREFIX = {"events": "series", "events_archive": "series_archive"}
+
+
+def _source_view(table: str) -> str:
+    return f"{table}_search_source"
+
+
+def _old_value(column: str) -> str:
+    return f"coalesce(old.{column}, (SELECT {column} FROM series WHERE id = old.series_id))"
+
+
+def _sqlite_ddl(table: str) -> List[str]:
+    """table 的 trigram 全文索引：外部内容取自合并了系列属性的视图"""
+    view, fts, series = _source_view(table), f"{table}_fts", _SERIES_TRIGGER_PREFIX[table]
+    insert_new = (
+        f"INSERT INTO {fts}(rowid, title, description, location) "
+        f"SELECT id, title, description, location FROM {view}"
+    )
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, title, description, location) "
+        f"VALUES ('delete', old.id, {_old_value('title')}, {_old_value('description')}, {_old_value('location')});"
+    )
+    return [
+        f"""
+        CREATE VIEW IF NOT EXISTS {view} AS
+        SELECT e.id AS id,
+               coalesce(e.title, s.title) AS title,
+               coalesce(e.description, s.description) AS description,
+               coalesce(e.location, s.location) AS location
+        FROM {table} e LEFT JOIN series s ON s.id = e.series_id
+        """,
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            title, description, location,
+            content='{view}', content_rowid='id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            {insert_new} WHERE id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            {delete_old}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au
+        AFTER UPDATE OF title, description, location, series_id ON {table} BEGIN
+            {delete_old}
+            {insert_new} WHERE id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {series}_fts_au AFTER UPDATE OF title, description, location ON series BEGIN
+            INSERT INTO {fts}({fts}, rowid, title, description, location)
+            SELECT 'delete', id,
+                   coalesce(title, old.title), coalesce(description, old.description), coalesce(location, old.location)
+            FROM {table} WHERE series_id = old.id;
+            {insert_new} WHERE id IN (SELECT id FROM {table} WHERE series_id = new.id);
+        END
+        """,
+    ]
+
+
+def _short_source(table: str) -> str:
+    return (
+        f"SELECT id, search_terms(title), search_terms(description), search_terms(location) "
+        f"FROM {_source_view(table)}"
+    )
+
+
+def _sqlite_short_ddl(table: str) -> List[str]:
+    """table 的短查询索引（unicode61，中日韩字符单字成词）"""
+    fts, series, source = f"{table}_fts_short", _SERIES_TRIGGER_PREFIX[table], _short_source(table)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            title, description, location, tokenize='unicode61'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, title, description, location) {source} WHERE id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            DELETE FROM {fts} WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au
+        AFTER UPDATE OF title, description, location, series_id ON {table} BEGIN
+            DELETE FROM {fts} WHERE rowid = old.id;
+            INSERT INTO {fts}(rowid, title, description, location) {source} WHERE id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {series}_fts_short_au AFTER UPDATE OF title, description, location ON series BEGIN
+            DELETE FROM {fts} WHERE rowid IN (SELECT id FROM {table} WHERE series_id = old.id);
+            INSERT INTO {fts}(rowid, title, description, location) {source}
+            WHERE id IN (SELECT id FROM {table} WHERE series_id = new.id);
+        END
+        """,
+    ]
+
+
+def _sqlite_drop(table: str) -> List[str]:
+    series = _SERIES_TRIGGER_PREFIX[table]
+    return [
+        *(f"DROP TRIGGER IF EXISTS {table}_fts_short_{suffix}" for suffix in ("ai", "ad", "au")),
+        f"DROP TRIGGER IF EXISTS {series}_fts_short_au",
+        f"DROP TABLE IF EXISTS {table}_fts_short",
+        *(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}" for suffix in ("ai", "ad", "au")),
+        f"DROP TRIGGER IF EXISTS {series}_fts_au",
+        f"DROP TABLE IF EXISTS {table}_fts",
+        f"DROP VIEW IF EXISTS {_source_view(table)}",
+    ]
+
+
+_fts_dialect: Optional[str] = None
+_fts_checked = False
+# SQLite 上为 events_fts_short 表，PostgreSQL 上为 pg_trgm 索引
+_short_ready = False
+
+
+def search_terms(value: Optional[str]) -> Optional[str]:
+    """在每个中日韩字符两侧插入零宽空格，使 unicode61 分词器单字成词"""
+    if value is None:
+        return None
+    return _CJK_CHAR.sub(lambda match: f"{_ZWSP}{match.group(0)}{_ZWSP}", value)
+
+
+def _short_phrase(query: str) -> Optional[str]:
+    """短查询对应的 FTS5 词组；以拉丁字母或数字结尾时末词按前缀匹配"""
+    tokens = re.findall(r"[^\W_]+", search_terms(query))
+    if not tokens:
+        return None
+    phrase = '"' + " ".join(tokens) + '"'
+    return phrase if _CJK_CHAR.fullmatch(tokens[-1]) else phrase + " *"
+
+
+def drop_search_index(connection) -> None:
+    """删除 SQLite 全文索引及其触发器、视图（重建 events/events_archive 表前调用）"""
+    if connection.dialect.name == "sqlite":
+        for table in _INDEXED_TABLES:
+            for statement in _sqlite_drop(table):
+                connection.exec_driver_sql(statement)
+
+
+def _sqlite_table_exists(connection, name: str) -> bool:
+    return (
+        connection.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE type='table' AND name='{name}'").first()
+        is not None
+    )
+
+
+def ensure_search_index(bind: Engine) -> None:
+    """创建全文索引（幂等）；首次创建时回填已有数据"""
+    global _fts_dialect, _fts_checked, _short_ready
+    dialect = bind.dialect.name
+    try:
+        with bind.begin() as connection:
+            if dialect == "sqlite":
+                existing = connection.exec_driver_sql(
+                    "SELECT sql FROM sqlite_master WHERE type='table' AND name='events_fts'"
+                ).first()
+                if existing is not None and _source_view("events") not in (existing[0] or ""):
+                    # 旧版索引直接以 events 为内容表，系列实例的共享属性不在其中
+                    drop_search_index(connection)
+                for table in _INDEXED_TABLES:
+                    exists = _sqlite_table_exists(connection, f"{table}_fts")
+                    for statement in _sqlite_ddl(table):
+                        connection.exec_driver_sql(statement)
+                    if not exists:
+                        connection.exec_driver_sql(f"INSERT INTO {table}_fts({table}_fts) VALUES('rebuild')")
+                    short_exists = _sqlite_table_exists(connection, f"{table}_fts_short")
+                    for statement in _sqlite_short_ddl(table):
+                        connection.exec_driver_sql(statement)
+                    if not short_exists:
+                        connection.exec_driver_sql(
+                            f"INSERT INTO {table}_fts_short(rowid, title, description, location) "
+                            f"{_short_source(table)}"
+                        )
+            elif dialect == "postgresql":
+                for table in ("series", *_INDEXED_TABLES):
+                    connection.exec_driver_sql(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_fulltext ON {table} "
+                        f"USING GIN (to_tsvector('simple', {_PG_DOCUMENT}))"
+                    )
+            else:
+                return
+    except OperationalError as exc:
+        logger.warning("Full-text index unavailable, falling back to LIKE search: %s", exc)
+        return
+    _fts_dialect = dialect
+    _fts_checked = True
+    _short_ready = dialect == "sqlite" or _ensure_pg_trigram(bind)
+
+
+def _ensure_pg_trigram(bind: Engine) -> bool:
+    """创建 pg_trgm 扩展及三元组索引；无权限安装扩展时中文查询回退为 LIKE 扫描"""
+    try:
+        with bind.begin() as connection:
+            connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for table in ("series", *_INDEXED_TABLES):
+                connection.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_trigram ON {table} "
+                    f"USING GIN (({_PG_DOCUMENT}) gin_trgm_ops)"
+                )
+    except DBAPIError as exc:
+        logger.warning("pg_trgm unavailable, CJK search falls back to LIKE: %s", exc)
+        return False
+    return True
+
+
+def _detect_fts(db: Session) -> Optional[str]:
+    """启动时可能跳过了建索引步骤，首次检索时探测索引是否存在"""
+    global _fts_dialect, _fts_checked, _short_ready
+    if _fts_checked:
+        return _fts_dialect
+    dialect = db.get_bind().dialect.name
+    # 以归档表的索引为准：它们在主表之后创建
+    if dialect == "sqlite":
+        found = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='events_archive_fts'")
+        ).first()
+        short = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='events_archive_fts_short'")
+        ).first()
+    elif dialect == "postgresql":
+        found = db.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_events_archive_fulltext'")
+        ).first()
+        short = db.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_events_archive_trigram'")).first()
+    else:
+        found = short = None
+    _fts_dialect = dialect if found else None
+    _short_ready = short is not None
+    _fts_checked = True
+    return _fts_dialect
+
+
+def _fts_phrase(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _like_snippet(event: models.EventColumns, query: str) -> Optional[str]:
+    """第一个包含查询串的字段中，命中处前后各若干字符"""
+    needle = query.lower()
+    for column in _SEARCH_COLUMNS:
+        value = getattr(event, column) or ""
+        index = value.lower().find(needle)
+        if index < 0:
+            continue
+        start = max(0, index - _SNIPPET_CONTEXT)
+        end = min(len(value), index + len(query) + _SNIPPET_CONTEXT)
+        return (
+            ("…" if start > 0 else "")
+            + f"{value[start:index]}[{value[index:index + len(query)]}]{value[index + len(query):end]}"
+            + ("…" if end < len(value) else "")
+        )
+    return None
+
+
+_MODELS = {"events": models.Event, "events_archive": models.ArchivedEvent}
+
+
+def _hydrate(db: Session, rows) -> List[SearchHit]:
+    """rows 为 (表名, id, 相关度, 摘要)；按表分别加载后保持原顺序"""
+    loaded = {}
+    for table, model in _MODELS.items():
+        ids = [row[1] for row in rows if row[0] == table]
+        if ids:
+            for event in models.hydrate_series(db.query(model).filter(model.id.in_(ids)).all()):
+                loaded[(table, event.id)] = event
+    return [(loaded[row[0], row[1]], float(row[2]), row[3]) for row in rows if (row[0], row[1]) in loaded]
+
+
+def _sqlite_match(db: Session, index: str, match: str, *, offset: int, limit: int):
+    """在主表与归档表的同类索引上同时检索，合并后按 bm25 排序分页"""
+    parts = [
+        f"SELECT '{table}' AS source, rowid AS id, bm25({table}_{index}) AS rank, "
+        f"snippet({table}_{index}, -1, '[', ']', '…', 16) AS snippet "
+        f"FROM {table}_{index} WHERE {table}_{index} MATCH :q"
+        for table in _INDEXED_TABLES
+    ]
+    return db.execute(
+        text(" UNION ALL ".join(parts) + " ORDER BY rank, source, id LIMIT :limit OFFSET :offset"),
+        {"q": match, "limit": limit, "offset": offset},
+    ).all()
+
+
+def _pg_trigram_part(table: str) -> str:
+    return (
+        f"SELECT '{table}' AS source, e.id AS id, word_similarity(:q, {_PG_MERGED_DOCUMENT}) AS rank, "
+        f"NULL AS snippet "
+        f"FROM (SELECT id FROM {table} WHERE ({_PG_DOCUMENT}) ILIKE :pattern "
+        f"UNION SELECT id FROM {table} WHERE series_id IN ("
+        f"SELECT id FROM series WHERE ({_PG_DOCUMENT}) ILIKE :pattern)) candidates "
+        f"JOIN {table} e ON e.id = candidates.id "
+        f"LEFT JOIN series s ON s.id = e.series_id "
+        f"WHERE ({_PG_MERGED_DOCUMENT}) ILIKE :pattern"
+    )
+
+
+def _pg_fulltext_part(table: str) -> str:
+    return (
+        f"SELECT '{table}' AS source, e.id AS id, "
+        f"ts_rank(to_tsvector('simple', {_PG_MERGED_DOCUMENT}), q.q) AS rank, "
+        f"ts_headline('simple', {_PG_MERGED_DOCUMENT}, q.q, 'StartSel=[,StopSel=]') AS snippet "
+        f"FROM (SELECT id FROM {table}, q WHERE to_tsvector('simple', {_PG_DOCUMENT}) @@ q.q "
+        f"UNION SELECT id FROM {table} WHERE series_id IN ("
+        f"SELECT id FROM series, q WHERE to_tsvector('simple', {_PG_DOCUMENT}) @@ q.q)) candidates "
+        f"JOIN {table} e ON e.id = candidates.id "
+        f"LEFT JOIN series s ON s.id = e.series_id, q "
+        f"WHERE to_tsvector('simple', {_PG_MERGED_DOCUMENT}) @@ q.q"
+    )
+
+
+def _like_search(db: Session, query: str, *, offset: int, limit: int) -> List[models.EventColumns]:
+    """无全文索引时的 LIKE 扫描：两表各取前 offset+limit 条，按开始时间合并后分页"""
+    pattern = _like_pattern(query)
+    matched = []
+    for model in _MODELS.values():
+        matched.extend(
+            db.query(model)
+            .filter(
+                or_(
+                    *(
+                        models.effective(model, column).ilike(pattern, escape="\\")
+                        for column in _SEARCH_COLUMNS
+                    )
+                )
+            )
+            .order_by(model.start_time, model.id)
+            .limit(offset + limit)
+            .all()
+        )
+    matched.sort(key=lambda event: (event.start_time, event.id))
+    return models.hydrate_series(matched[offset:offset + limit])
+
+
+def search_events(db: Session, query: str, *, offset: int = 0, limit: int = 20) -> List[SearchHit]:
+    """按相关度返回匹配的行程及摘要片段（含已归档的行程）"""
+    query = query.strip()
+    if not query:
+        return []
+    dialect = db.get_bind().dialect.name
+    fts_dialect = _detect_fts(db)
+    if fts_dialect == dialect == "sqlite" and len(query) >= MIN_FTS_QUERY_LENGTH:
+        rows = _sqlite_match(db, "fts", _fts_phrase(query), offset=offset, limit=limit)
+        # bm25 越小越相关，对外统一为越大越相关
+        return [(event, -rank, snippet) for event, rank, snippet in _hydrate(db, rows)]
+    phrase = _short_phrase(query)
+    if fts_dialect == dialect == "sqlite" and _short_ready and phrase is not None:
+        rows = _sqlite_match(db, "fts_short", phrase, offset=offset, limit=limit)
+        return [
+            (event, -rank, snippet.replace(_ZWSP, "") if snippet else snippet)
+            for event, rank, snippet in _hydrate(db, rows)
+        ]
+    if fts_dialect == dialect == "postgresql" and _short_ready and _CJK_CHAR.search(query):
+        # to_tsvector('simple') 把连续的中文当作一个词，改用三元组索引做子串匹配
+        rows = db.execute(
+            text(
+                " UNION ALL ".join(_pg_trigram_part(table) for table in _INDEXED_TABLES)
+                + " ORDER BY rank DESC, source, id LIMIT :limit OFFSET :offset"
+            ),
+            {"q": query, "pattern": _like_pattern(query), "limit": limit, "offset": offset},
+        ).all()
+        return [(event, rank, _like_snippet(event, query)) for event, rank, _ in _hydrate(db, rows)]
+    if fts_dialect == dialect == "postgresql" and not _CJK_CHAR.search(query):
+        # 候选集分别走 events/events_archive 与 series 的索引，再按合并后的文本复核与排序
+        rows = db.execute(
+            text(
+                "WITH q AS (SELECT plainto_tsquery('simple', :q) AS q) "
+                + " UNION ALL ".join(_pg_fulltext_part(table) for table in _INDEXED_TABLES)
+                + " ORDER BY rank DESC, source, id LIMIT :limit OFFSET :offset"
+            ),
+            {"q": query, "limit": limit, "offset": offset},
+        ).all()
+        return _hydrate(db, rows)
+
+    events = _like_search(db, query, offset=offset, limit=limit)
+    return [(event, 0.0, _like_snippet(event, query)) for event in events]
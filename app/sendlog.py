@@ -0,0 +1,72 @@
+import os
+import threading
+from typing import Callable, Iterable, Set
+
+from . import models
+
+
+def reminder_key(event: models.Event) -> str:
+    """某个行程在某一时间安排下的提醒幂等键
+
+    改期或修改提前量会得到新的键，新安排的提醒不会被跳过。
+    """
+    return f"{event.id}:{int(event.start_time.timestamp())}:{event.reminder_minutes_before}"
+
+
+class SendLog:
+    """只追加的日志：已投递但尚未提交到数据库的提醒键
+
+    发送成功后立即追加（并写入操作系统缓冲），该批次的批量 UPDATE 提交后删除。
+    进程在两者之间退出时键仍然保留，下一次调度把这些行程标记为已发送而不重复投递。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._keys: Set[str] = set()
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """用文件中的键替换内存中的键，例如崩溃的租约持有者留下的键"""
+        keys: Set[str] = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as handle:
+                keys.update(line.strip() for line in handle if line.strip())
+        with self._lock:
+            self._keys = keys
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def record(self, keys: Iterable[str]) -> None:
+        keys = [key for key in keys if key not in self._keys]
+        if not keys:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write("".join(f"{key}\n" for key in keys))
+                handle.flush()
+            self._keys.update(keys)
+
+    def retain(self, keep: Callable[[str], bool]) -> None:
+        """删除 ``keep`` 返回假的键，必要时重写文件"""
+        with self._lock:
+            kept = {key for key in self._keys if keep(key)}
+            if kept == self._keys:
+                return
+            self._keys = kept
+            if not kept:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            with open(self.path, "w", encoding="utf-8") as handle:
+                handle.write("".join(f"{key}\n" for key in sorted(kept)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
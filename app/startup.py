@@ -0,0 +1,45 @@
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """记录启动各阶段的耗时，设置 ``STARTUP_PROFILE=1`` 时启用
+
+    按模块细分导入耗时可运行 ``python -X importtime -m uvicorn app.main:app``。
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float, int]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        modules_before = len(sys.modules)
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - began, len(sys.modules) - modules_before))
+
+    def report(self) -> None:
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self.started
+        lines = ["Startup profile:"]
+        for name, elapsed, modules in self.phases:
+            lines.append(f"  {name:<32} {elapsed * 1000:8.1f} ms  (+{modules} modules)")
+        lines.append(f"  {'time to ready':<32} {total * 1000:8.1f} ms  ({len(sys.modules)} modules loaded)")
+        print("\n".join(lines), file=sys.stderr, flush=True)
+
+
+profile = StartupProfile(os.getenv("STARTUP_PROFILE", "false").lower() in {"1", "true", "yes"})
@@ -63,6 +63,50 @@ function openFormDialog(eventData = null) {
   dialog.show();
 }
 
+const COLUMNAR_MEDIA_TYPE = "application/vnd.calendar4me.columnar+json";
+const COLUMNAR_TIME_FIELDS = new Set(["start_time", "end_time", "recurrence_end_date", "created_at", "updated_at"]);
+const COLUMNAR_FLAG_FIELDS = new Set(["reminder_sent", "is_recurring"]);
+const COLUMNAR_STRING_FIELDS = new Set([
+  "title",
+  "description",
+  "category",
+  "location",
+  "reminder_email",
+  "notification_channels",
+  "webhook_url",
+  "recurrence_rule",
+  "timezone",
+]);
+
+function decodeColumnarValue(field, value, strings) {
+  if (COLUMNAR_FLAG_FIELDS.has(field)) {
+    return value === 1;
+  }
+  if (value === null) {
+    return null;
+  }
+  if (COLUMNAR_STRING_FIELDS.has(field)) {
+    return strings[value];
+  }
+  if (COLUMNAR_TIME_FIELDS.has(field)) {
+    return new Date(value * 1000).toISOString();
+  }
+  return value;
+}
+
+// 将列式响应（字符串字典 + 纪元秒）还原为与普通 JSON 相同结构的对象数组；
+// 逐列遍历 columns，服务端新增的普通列（如 series_id）无需修改此处即可还原
+function decodeColumnar(payload) {
+  const { count, strings, columns } = payload;
+  const items = Array.from({ length: count }, () => ({}));
+  for (const [field, values] of Object.entries(columns)) {
+    for (let i = 0; i < count; i += 1) {
+      items[i][field] = decodeColumnarValue(field, values[i], strings);
+    }
+  }
+  return items;
+}
+
 async function fetchEvents(fetchInfo, successCallback, failureCallback) {
   const params = new URLSearchParams();
   if (fetchInfo.startStr) {
@@ -72,11 +116,15 @@ async function fetchEvents(fetchInfo, successCallback, failureCallback) {
     params.set("end_before", dayjs(fetchInfo.end).toISOString());
   }
   try {
-    const response = await fetch(`/events?${params.toString()}`);
+    const response = await fetch(`/events?${params.toString()}`, {
+      headers: { Accept: `${COLUMNAR_MEDIA_TYPE}, application/json;q=0.9` },
+    });
     if (!response.ok) {
       throw new Error(`加载行程失败: ${response.status}`);
     }
-    const data = await response.json();
+    const body = await response.json();
+    const contentType = response.headers.get("Content-Type") ?? "";
+    const data = contentType.startsWith(COLUMNAR_MEDIA_TYPE) ? decodeColumnar(body) : body;
     const events = data.map((item) => ({
       id: String(item.id),
       title: item.title,
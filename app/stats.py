@@ -0,0 +1,431 @@
+"""
+行程统计：按分类、学期周、地点、日期聚合时长与数量
+
+- 原始表聚合在 SQL 中完成（日期分桶按 UTC）
+- 结果缓存在进程内：行程写入在同一事务中递增共享的版本号（cache_generations 表），
+  其他 worker 读取版本号即可发现变更；另设有效期（STATS_CACHE_TTL 秒）兜底其他途径的写入
+- 可选的按日汇总表 event_daily_rollup（SQLite，由触发器增量维护），长时间范围报表无需扫描原始行程；
+  行程被归档时汇总数据保留；原始表聚合同样合并归档表，两种来源对同一范围的结果一致
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, time, timezone
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, event as sa_event, func, insert, literal, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import crud, models
+from .models import UTCDateTime
+from .utils import get_week_number
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY_CHOICES = ("category", "location", "day", "week", "month")
+
+ROLLUP_ENABLED = os.getenv("STATS_ROLLUP", "false").lower() in {"1", "true", "yes"}
+_CACHE_SIZE = 256
+CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL", "60"))
+_GENERATION = "stats"
+
+_SQLITE_DURATION = "((julianday(e.end_time) - julianday(e.start_time)) * 86400.0)"
+_ROLLUP_KEY = "date(e.start_time), coalesce(e.category, s.category, ''), coalesce(e.location, s.location, '')"
+
+
+def _row_key(row: str) -> Tuple[str, str]:
+    """触发器中 new/old 行的分类与地点（实例未覆盖时取所属系列的值）"""
+    return tuple(
+        f"coalesce({row}.{column}, (SELECT {column} FROM series WHERE id = {row}.series_id), '')"
+        for column in ("category", "location")
+    )
+
+
+_NEW_CATEGORY, _NEW_LOCATION = _row_key("new")
+_OLD_CATEGORY, _OLD_LOCATION = _row_key("old")
+
+_ADD_NEW_ROW = f"""
+        INSERT INTO event_daily_rollup (day, category, location, event_count, total_seconds)
+        VALUES (date(new.start_time), {_NEW_CATEGORY}, {_NEW_LOCATION}, 1,
+                (julianday(new.end_time) - julianday(new.start_time)) * 86400.0)
+        ON CONFLICT (day, category, location) DO UPDATE SET
+            event_count = event_count + 1,
+            total_seconds = total_seconds + excluded.total_seconds;
+"""
+
+_REMOVE_OLD_ROW = f"""
+        UPDATE event_daily_rollup SET
+            event_count = event_count - 1,
+            total_seconds = total_seconds - (julianday(old.end_time) - julianday(old.start_time)) * 86400.0
+        WHERE day = date(old.start_time)
+          AND category = {_OLD_CATEGORY}
+          AND location = {_OLD_LOCATION};
+        DELETE FROM event_daily_rollup WHERE event_count <= 0;
+"""
+
+# 系列的分类/地点变更时，把未覆盖该字段的实例整体从旧分桶移到新分桶
+_SERIES_MEMBERS = """
+    FROM events e
+    WHERE e.series_id = old.id
+      AND date(e.start_time) = event_daily_rollup.day
+      AND coalesce(e.category, old.category, '') = event_daily_rollup.category
+      AND coalesce(e.location, old.location, '') = event_daily_rollup.location
+"""
+
+_SQLITE_ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS event_daily_rollup (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        location TEXT NOT NULL,
+        event_count INTEGER NOT NULL,
+        total_seconds REAL NOT NULL,
+        PRIMARY KEY (day, category, location)
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_daily_rollup_ai AFTER INSERT ON events BEGIN
+        {_ADD_NEW_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_daily_rollup_ad AFTER DELETE ON events
+    WHEN NOT EXISTS (SELECT 1 FROM events_archive WHERE id = old.id) BEGIN
+        {_REMOVE_OLD_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_daily_rollup_au
+    AFTER UPDATE OF start_time, end_time, category, location, series_id ON events BEGIN
+        {_REMOVE_OLD_ROW}
+        {_ADD_NEW_ROW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS series_daily_rollup_au AFTER UPDATE OF category, location ON series BEGIN
+        UPDATE event_daily_rollup SET
+            event_count = event_count - (SELECT count(*) {_SERIES_MEMBERS}),
+            total_seconds = total_seconds - (
+                SELECT coalesce(sum({_SQLITE_DURATION}), 0) {_SERIES_MEMBERS}
+            )
+        WHERE EXISTS (SELECT 1 {_SERIES_MEMBERS});
+        DELETE FROM event_daily_rollup WHERE event_count <= 0;
+        INSERT INTO event_daily_rollup (day, category, location, event_count, total_seconds)
+        SELECT date(e.start_time), coalesce(e.category, new.category, ''), coalesce(e.location, new.location, ''),
+               count(*), sum({_SQLITE_DURATION})
+        FROM events e WHERE e.series_id = new.id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, location) DO UPDATE SET
+            event_count = event_count + excluded.event_count,
+            total_seconds = total_seconds + excluded.total_seconds;
+    END
+    """,
+]
+
+_ROLLUP_TRIGGERS = ("event_daily_rollup_ai", "event_daily_rollup_ad", "event_daily_rollup_au", "series_daily_rollup_au")
+
+_rollup_ready: Optional[bool] = None
+
+
+class _StatsCache:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[tuple, Tuple[float, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if monotonic() - stored_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: tuple) -> None:
+        with self._lock:
+            self._items[key] = (monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _StatsCache(_CACHE_SIZE, CACHE_TTL_SECONDS)
+_generations = models.CacheGeneration.__table__
+
+
+def invalidate() -> None:
+    _cache.clear()
+
+
+def ensure_generation(bind: Engine) -> None:
+    """写入统计缓存版本号的初始行（幂等）"""
+    with bind.begin() as connection:
+        exists = connection.execute(
+            select(_generations.c.name).where(_generations.c.name == _GENERATION)
+        ).first()
+        if not exists:
+            connection.execute(insert(_generations).values(name=_GENERATION, value=0))
+
+
+def _current_generation(db: Session) -> int:
+    value = db.execute(select(_generations.c.value).where(_generations.c.name == _GENERATION)).scalar()
+    return value or 0
+
+
+def bump_generation(connection) -> None:
+    """随本次写入一起提交，其他 worker 的缓存键随之失效；回滚时版本号也不变
+
+    ORM 写入由下方的监听器自动调用；直接以 Core 语句写入行程的脚本需自行调用。
+    """
+    connection.execute(
+        update(_generations).where(_generations.c.name == _GENERATION).values(value=_generations.c.value + 1)
+    )
+
+
+# 统计同时计入归档行程，归档表的写入同样使缓存失效
+_COUNTED_MODELS = (models.Event, models.ArchivedEvent, models.Series)
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _COUNTED_MODELS):
+            invalidate()
+            bump_generation(session.connection())
+            return
+
+
+@sa_event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_write(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ in _COUNTED_MODELS for mapper in orm_execute_state.all_mappers):
+        invalidate()
+        bump_generation(orm_execute_state.session.connection())
+
+
+def drop_rollup_triggers(connection) -> None:
+    """删除汇总触发器（汇总数据保留），由 ensure_rollup 重新创建"""
+    if connection.dialect.name == "sqlite":
+        for name in _ROLLUP_TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def ensure_rollup(bind: Engine) -> None:
+    """按需创建按日汇总表及触发器（幂等），首次创建时回填"""
+    global _rollup_ready
+    if not ROLLUP_ENABLED:
+        return
+    if bind.dialect.name != "sqlite":
+        logger.warning("Daily stats rollup is only supported on SQLite; using raw aggregation")
+        return
+    try:
+        with bind.begin() as connection:
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_daily_rollup'"
+            ).first()
+            legacy = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='event_daily_rollup_ai' "
+                "AND sql NOT LIKE '%series%'"
+            ).first()
+            if legacy:
+                # 旧版触发器不识别系列属性，汇总数据本身仍然有效
+                drop_rollup_triggers(connection)
+            for statement in _SQLITE_ROLLUP_DDL:
+                connection.exec_driver_sql(statement)
+            if not exists:
+                connection.exec_driver_sql(
+                    f"INSERT INTO event_daily_rollup (day, category, location, event_count, total_seconds) "
+                    f"SELECT {_ROLLUP_KEY}, count(*), sum({_SQLITE_DURATION}) "
+                    f"FROM events e LEFT JOIN series s ON s.id = e.series_id "
+                    f"GROUP BY {_ROLLUP_KEY}"
+                )
+    except OperationalError as exc:
+        logger.warning("Daily stats rollup unavailable: %s", exc)
+        return
+    _rollup_ready = True
+
+
+def _rollup_available(db: Session) -> bool:
+    """启动时可能跳过了建表步骤，首次查询时探测汇总表是否存在"""
+    global _rollup_ready
+    if _rollup_ready is None:
+        _rollup_ready = (
+            ROLLUP_ENABLED
+            and db.get_bind().dialect.name == "sqlite"
+            and db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_daily_rollup'")
+            ).first()
+            is not None
+        )
+    return _rollup_ready
+
+
+def _is_midnight(value: Optional[datetime]) -> bool:
+    return value is None or value.astimezone(timezone.utc).time() == time(0)
+
+
+def _term_parameter(dialect: str, term_start: datetime):
+    value = term_start.astimezone(timezone.utc)
+    if dialect == "sqlite":
+        # 与 SQLite 中存储的无时区 UTC 文本格式一致
+        return value.replace(tzinfo=None).isoformat(sep=" ")
+    return value
+
+
+def _bucket_expression(model, dialect: str, group_by: str, term_start: Optional[datetime]):
+    start = model.start_time
+    if group_by in ("category", "location"):
+        return func.coalesce(models.effective(model, group_by), "")
+    if dialect == "sqlite":
+        if group_by == "day":
+            return func.date(start)
+        if group_by == "month":
+            return func.strftime("%Y-%m", start)
+        if term_start is None:
+            return func.strftime("%Y-W%W", start)
+        # 调用方保证 start_time >= term_start，因此截断等价于向下取整
+        days = func.julianday(start) - func.julianday(literal(_term_parameter(dialect, term_start)))
+        return cast(days / 7, Integer) + 1
+    utc_start = func.timezone("UTC", start)
+    if group_by == "day":
+        return func.to_char(utc_start, "YYYY-MM-DD")
+    if group_by == "month":
+        return func.to_char(utc_start, "YYYY-MM")
+    if term_start is None:
+        return func.to_char(utc_start, 'IYYY-"W"IW')
+    seconds = func.extract("epoch", start - literal(_term_parameter(dialect, term_start), UTCDateTime()))
+    return cast(func.floor(seconds / 604800), Integer) + 1
+
+
+def _duration_expression(model, dialect: str):
+    if dialect == "sqlite":
+        return (func.julianday(model.end_time) - func.julianday(model.start_time)) * 86400.0
+    return func.extract("epoch", model.end_time - model.start_time)
+
+
+def _aggregate(
+    db: Session,
+    model,
+    group_by: str,
+    start_after: Optional[datetime],
+    end_before: Optional[datetime],
+    term_start: Optional[datetime],
+) -> list:
+    dialect = db.get_bind().dialect.name
+    bucket = _bucket_expression(model, dialect, group_by, term_start).label("bucket")
+    query = db.query(bucket, func.count(model.id), func.sum(_duration_expression(model, dialect)))
+    if start_after is not None:
+        query = query.filter(model.start_time >= start_after)
+    if end_before is not None:
+        query = query.filter(model.start_time < end_before)
+    if group_by == "week" and term_start is not None:
+        query = query.filter(model.start_time >= term_start)
+    return query.group_by(bucket).all()
+
+
+def _raw_stats(
+    db: Session,
+    group_by: str,
+    start_after: Optional[datetime],
+    end_before: Optional[datetime],
+    term_start: Optional[datetime],
+) -> List[Tuple[str, int, float]]:
+    """主表与归档表分别聚合后按分桶合并（与汇总表一样把已归档的行程计入）"""
+    totals: Dict[object, List[float]] = defaultdict(lambda: [0, 0.0])
+    sources = [models.Event]
+    horizon = crud.archive_horizon(db)
+    # 不带时区的参数稍后在绑定时被拒绝（ValueError → 400），这里不做比较
+    if horizon is not None and (start_after is None or start_after.tzinfo is None or start_after <= horizon):
+        sources.append(models.ArchivedEvent)
+    for model in sources:
+        for key, count, seconds in _aggregate(db, model, group_by, start_after, end_before, term_start):
+            totals[key][0] += count
+            totals[key][1] += seconds or 0.0
+    return [(str(key), int(count), float(seconds)) for key, (count, seconds) in sorted(totals.items())]
+
+
+def _rollup_stats(
+    db: Session,
+    group_by: str,
+    start_after: Optional[datetime],
+    end_before: Optional[datetime],
+    term_start: Optional[datetime],
+) -> List[Tuple[str, int, float]]:
+    clauses, params = [], {}
+    if start_after is not None:
+        clauses.append("day >= :start_day")
+        params["start_day"] = start_after.astimezone(timezone.utc).date().isoformat()
+    if end_before is not None:
+        clauses.append("day < :end_day")
+        params["end_day"] = end_before.astimezone(timezone.utc).date().isoformat()
+    if group_by == "week" and term_start is not None:
+        clauses.append("day >= :term_day")
+        params["term_day"] = term_start.astimezone(timezone.utc).date().isoformat()
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    column = {"category": "category", "location": "location", "month": "substr(day, 1, 7)"}.get(group_by, "day")
+    rows = db.execute(
+        text(
+            f"SELECT {column} AS bucket, sum(event_count), sum(total_seconds) "
+            f"FROM event_daily_rollup {where} GROUP BY bucket ORDER BY bucket"
+        ),
+        params,
+    ).all()
+    if group_by != "week":
+        return [(str(key), int(count), float(seconds or 0.0)) for key, count, seconds in rows]
+
+    # 按日汇总行数很少（一年至多366行），周分桶在 Python 中完成
+    weeks: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    for day, count, seconds in rows:
+        day_start = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+        if term_start is not None:
+            key = str(get_week_number(term_start.astimezone(timezone.utc), day_start))
+        else:
+            key = day_start.strftime("%Y-W%W")
+        weeks[key][0] += count
+        weeks[key][1] += seconds or 0.0
+    ordered = sorted(weeks.items(), key=lambda item: (len(item[0]), item[0]))
+    return [(key, int(count), float(seconds)) for key, (count, seconds) in ordered]
+
+
+def compute_stats(
+    db: Session,
+    *,
+    group_by: str,
+    start_after: Optional[datetime] = None,
+    end_before: Optional[datetime] = None,
+    term_start: Optional[datetime] = None,
+) -> Tuple[str, List[Tuple[str, int, float]]]:
+    """返回 (数据来源, [(分桶, 行程数, 总秒数), ...])"""
+    if group_by not in GROUP_BY_CHOICES:
+        raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY_CHOICES)}")
+    # 先读版本号再聚合：聚合期间的并发写入会递增版本号，不会被旧键命中
+    key = (_current_generation(db), group_by, start_after, end_before, term_start)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    use_rollup = (
+        _rollup_available(db)
+        and _is_midnight(start_after)
+        and _is_midnight(end_before)
+        and (group_by != "week" or _is_midnight(term_start))
+    )
+    if use_rollup:
+        result = ("rollup", _rollup_stats(db, group_by, start_after, end_before, term_start))
+    else:
+        result = ("events", _raw_stats(db, group_by, start_after, end_before, term_start))
+    _cache.put(key, result)
+    return result
@@ -3,10 +3,43 @@
 周期性事件处理工具
 """
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import os
 import re
 
 
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Shanghai")
+
+# 时区偏移缓存的时间粒度（秒）。现行时区规则的切换点都落在15分钟边界上。
+_OFFSET_BUCKET_SECONDS = 15 * 60
+
+
+@lru_cache(maxsize=128)
+def get_zone(name: str) -> ZoneInfo:
+    """按名称获取IANA时区（带缓存），未知时区抛出ValueError"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown time zone: {name}") from exc
+
+
+@lru_cache(maxsize=8192)
+def _utc_offset_for_bucket(zone_name: str, bucket: int) -> timezone:
+    instant = datetime.fromtimestamp(bucket * _OFFSET_BUCKET_SECONDS, tz=timezone.utc)
+    offset = instant.astimezone(get_zone(zone_name)).utcoffset()
+    return timezone(offset)
+
+
+def to_zone(value: datetime, zone_name: str) -> datetime:
+    """将带时区的时间转换为指定时区（固定偏移表示），偏移按15分钟分桶缓存"""
+    if value.tzinfo is None or value.tzinfo.utcoffset(value) is None:
+        value = value.replace(tzinfo=timezone.utc)
+    bucket = int(value.timestamp()) // _OFFSET_BUCKET_SECONDS
+    return value.astimezone(_utc_offset_for_bucket(zone_name, bucket))
+
+
 def parse_rrule(rrule: str) -> dict:
     """解析RRULE字符串"""
     if not rrule:
@@ -29,7 +62,8 @@ def generate_recurrence_dates(
     frequency: str = "weekly",
     interval: int = 1,
     until_date: Optional[datetime] = None,
-    count: Optional[int] = None
+    count: Optional[int] = None,
+    tz: Optional[str] = None,
 ) -> List[tuple]:
     """
     生成重复事件的日期列表
@@ -41,16 +75,29 @@ def generate_recurrence_dates(
         interval: 重复间隔
         until_date: 重复结束日期
         count: 重复次数（可选）
+        tz: IANA时区名称；提供时按该时区的本地时间（墙上时间）递推，跨夏令时不漂移
     
     Returns:
         List[tuple]: [(start_time, end_time), ...]
     """
     dates = []
+    zone = get_zone(tz) if tz else None
+    if zone is not None:
+        # 在本地墙上时间上递推，再换算回UTC
+        start_date = start_date.astimezone(zone).replace(tzinfo=None)
+        end_date = end_date.astimezone(zone).replace(tzinfo=None)
+        if until_date is not None:
+            until_date = until_date.astimezone(zone).replace(tzinfo=None)
     current_start = start_date
     current_end = end_date
     
     # 计算持续时间
     duration = end_date - start_date
+
+    def localize(value: datetime) -> datetime:
+        if zone is None:
+            return value
+        return value.replace(tzinfo=zone).astimezone(timezone.utc)
     
     # 确定结束条件
     if count:
@@ -66,7 +113,7 @@ def generate_recurrence_dates(
         if until_date and current_start > until_date:
             break
             
-        dates.append((current_start, current_end))
+        dates.append((localize(current_start), localize(current_end)))
         
         # 计算下一次重复
         if frequency == "daily":
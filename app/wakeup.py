@@ -0,0 +1,226 @@
+"""
+提醒调度器的唤醒通知
+
+写入会影响提醒时间的行程时发布唤醒信号，调度器收到后立即重新计算下一次提醒时间，
+其余时间只做间隔较长的对账扫描。后端由 REMINDER_WAKEUP 选择：
+
+- postgres：LISTEN/NOTIFY，通知随事务提交送达，跨进程、跨主机
+- unix：进程内信号 + 本机 Unix 数据报套接字广播（REMINDER_WAKEUP_DIR 下每个 worker 一个套接字），
+  适用于 SQLite 单机多 worker
+- local：仅进程内信号（单 worker）
+- off：不发布唤醒，调度器按 REMINDER_POLL_INTERVAL 轮询
+- auto（默认）：PostgreSQL 使用 postgres，其他数据库使用 unix
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.orm import Session
+
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "itinerary_reminders"
+_BACKENDS = ("postgres", "unix", "local", "off")
+
+
+def _configured_backend() -> str:
+    backend = os.getenv("REMINDER_WAKEUP", "auto").lower()
+    if backend == "auto":
+        return "postgres" if engine.dialect.name == "postgresql" else "unix"
+    if backend not in _BACKENDS:
+        logger.warning("Unknown REMINDER_WAKEUP=%r; wake-ups disabled", backend)
+        return "off"
+    return backend
+
+
+BACKEND = _configured_backend()
+SOCKET_DIR = os.getenv("REMINDER_WAKEUP_DIR", "reminder-wakeup")
+
+_local_callbacks: List[Tuple[asyncio.AbstractEventLoop, Callable[[], None]]] = []
+_local_lock = threading.Lock()
+_own_socket: Optional[str] = None
+
+
+# ---------------------------------------------------------------- 发布端
+
+def publish(db: Session) -> None:
+    """在提交前调用；事务提交后唤醒调度器（回滚则不唤醒）"""
+    if BACKEND == "off":
+        return
+    if BACKEND == "postgres":
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": CHANNEL})
+    if not db.info.get("wakeup_pending"):
+        db.info["wakeup_pending"] = True
+        sa_event.listen(db, "after_commit", _after_commit, once=True)
+
+
+def _after_commit(session: Session) -> None:
+    session.info.pop("wakeup_pending", None)
+    _signal_local()
+    if BACKEND == "unix":
+        _broadcast()
+
+
+def _signal_local() -> None:
+    with _local_lock:
+        callbacks = list(_local_callbacks)
+    for loop, callback in callbacks:
+        loop.call_soon_threadsafe(callback)
+
+
+def _broadcast() -> None:
+    """向本机其他 worker 的套接字各发一个数据报；对端已退出的套接字顺便清理"""
+    try:
+        entries = list(os.scandir(SOCKET_DIR))
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        sender.setblocking(False)
+        for entry in entries:
+            if not entry.name.endswith(".sock") or entry.path == _own_socket:
+                continue
+            try:
+                sender.sendto(b"1", entry.path)
+            except BlockingIOError:
+                pass  # 对端缓冲区已满，说明已有未处理的唤醒
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
+
+
+# ---------------------------------------------------------------- 监听端
+
+class WakeupListener:
+    """进程内监听：同一进程中的写入直接唤醒调度器"""
+
+    backend = "local"
+
+    def __init__(self) -> None:
+        self._entry: Optional[Tuple[asyncio.AbstractEventLoop, Callable[[], None]]] = None
+
+    async def start(self, callback: Callable[[], None]) -> None:
+        self._entry = (asyncio.get_running_loop(), callback)
+        with _local_lock:
+            _local_callbacks.append(self._entry)
+
+    async def stop(self) -> None:
+        if self._entry is not None:
+            with _local_lock:
+                _local_callbacks.remove(self._entry)
+            self._entry = None
+
+
+class UnixSocketListener(WakeupListener):
+    """进程内监听 + 绑定本 worker 的 Unix 数据报套接字，接收其他 worker 的广播"""
+
+    backend = "unix"
+
+    def __init__(self, directory: str = SOCKET_DIR) -> None:
+        super().__init__()
+        self.directory = directory
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+
+    async def start(self, callback: Callable[[], None]) -> None:
+        global _own_socket
+        await super().start(callback)
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(self._path)
+        _own_socket = self._path
+
+        def on_readable() -> None:
+            try:
+                while True:
+                    self._socket.recv(64)
+            except BlockingIOError:
+                pass
+            callback()
+
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), on_readable)
+
+    async def stop(self) -> None:
+        global _own_socket
+        if self._socket is not None:
+            asyncio.get_running_loop().remove_reader(self._socket.fileno())
+            self._socket.close()
+            self._socket = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            _own_socket = None
+            self._path = None
+        await super().stop()
+
+
+class PostgresListener(WakeupListener):
+    """在独立连接上 LISTEN，通知到达时由事件循环的读就绪回调处理（需 psycopg2）"""
+
+    backend = "postgres"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._connection = None
+
+    async def start(self, callback: Callable[[], None]) -> None:
+        await super().start(callback)
+        raw = engine.raw_connection()
+        raw.detach()  # 专用连接，不归还连接池
+        connection = raw.driver_connection
+        if not hasattr(connection, "notifies"):
+            raw.close()
+            logger.warning("LISTEN/NOTIFY needs psycopg2; falling back to in-process wake-ups")
+            return
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self._connection = raw
+
+        def on_readable() -> None:
+            try:
+                connection.poll()
+            except Exception as exc:  # noqa: BLE001
+                # 连接断开后停止监听，调度器仍按对账间隔扫描
+                logger.warning("Lost LISTEN connection, relying on reconciliation scans: %s", exc)
+                asyncio.get_running_loop().remove_reader(connection.fileno())
+                return
+            if connection.notifies:
+                connection.notifies.clear()
+                callback()
+
+        asyncio.get_running_loop().add_reader(connection.fileno(), on_readable)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            connection = self._connection.driver_connection
+            try:
+                asyncio.get_running_loop().remove_reader(connection.fileno())
+            except (ValueError, OSError):
+                pass
+            self._connection.close()
+            self._connection = None
+        await super().stop()
+
+
+def create_listener() -> Optional[WakeupListener]:
+    if BACKEND == "postgres":
+        return PostgresListener()
+    if BACKEND == "unix":
+        return UnixSocketListener()
+    if BACKEND == "local":
+        return WakeupListener()
+    return None
@@ -0,0 +1,37 @@
+# Gunicorn 配置：多 worker 的 uvicorn 部署，支持平滑重启
+#
+# 启动:   gunicorn -c deploy/gunicorn.conf.py app.main:app
+# 平滑重启: kill -HUP $(cat /tmp/itinerary-gunicorn.pid)
+#   master 先拉起新一代 worker，再向旧 worker 发送 SIGTERM。监听 socket 始终由 master 持有，
+#   切换期间的新连接在内核队列中排队，不会被拒绝；旧 worker 处理完在途请求（最长
+#   graceful_timeout 秒）后执行 lifespan 关闭：提醒调度器完成当前批次并提交后释放租约，
+#   由新一代 worker 接手。
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+pidfile = os.getenv("GUNICORN_PIDFILE", "/tmp/itinerary-gunicorn.pid")
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+# 不预加载应用：HUP 时新 worker 会重新导入代码
+preload_app = False
+
+
+def on_starting(server):
+    # 在 master 中（子进程执行，避免把应用代码加载进 master）完成一次表结构检查，
+    # 防止多个 worker 同时建表/改表
+    subprocess.run(
+        [sys.executable, "-c", "from app.migrations import migrate_database; migrate_database()"],
+        check=True,
+    )
+
+
+def on_reload(server):
+    on_starting(server)
@@ -4,9 +4,17 @@ set -e
 
 echo "🚀 开始快速部署 Itinerary Planner..."
 
-# 1. 停止可能运行的应用
-echo "📋 停止现有应用..."
-pkill -f uvicorn || true
+PIDFILE=/tmp/itinerary-gunicorn.pid
+
+# 1. 检查现有应用（gunicorn 运行中则稍后平滑重启，不停机）
+echo "📋 检查现有应用..."
+if [ -f "$PIDFILE" ] && kill -0 "$(cat "$PIDFILE")" 2>/dev/null; then
+    RELOAD=1
+else
+    RELOAD=0
+    # 旧版本以 nohup uvicorn 方式运行，首次切换到 gunicorn 时需要停止
+    pkill -f "uvicorn app.main:app" || true
+fi
 
 # 2. 禁用nginx默认站点
 echo "📋 配置nginx..."
@@ -22,6 +30,15 @@ server {
     client_max_body_size 10M;
     
     # 静态文件
+    # 带内容哈希的构建产物（scripts/build_assets.py），直接发送预压缩的 .gz 文件
+    # 如已安装 ngx_brotli 模块，可再加上 brotli_static on;
+    location /static/dist/ {
+        alias /var/www/html/static/dist/;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        add_header Vary Accept-Encoding;
+    }
+
     location /static/ {
         alias /var/www/html/static/;
         expires 1y;
@@ -50,8 +67,9 @@ NGINX_EOF
 # 4. 启用站点配置
 sudo ln -sf /etc/nginx/sites-available/itinerary_app /etc/nginx/sites-enabled/itinerary_app
 
-# 5. 复制静态文件
-echo "📋 复制静态文件..."
+# 5. 构建并复制静态文件（内容哈希 + 预压缩）
+echo "📋 构建并复制静态文件..."
+python3 scripts/build_assets.py
 sudo mkdir -p /var/www/html/static
 sudo cp -r app/static/* /var/www/html/static/
 
@@ -60,13 +78,26 @@ echo "📋 重载nginx..."
 sudo nginx -t
 sudo systemctl reload nginx
 
-# 7. 启动应用
-echo "📋 启动应用..."
+# 7. 启动或平滑重启应用
 source .venv/bin/activate
-nohup uvicorn app.main:app --host 0.0.0.0 --port 8000 > /var/log/itinerary.log 2>&1 &
+pip install -q -r requirements.txt
+if [ "$RELOAD" = "1" ]; then
+    echo "📋 平滑重启应用（SIGHUP）..."
+    kill -HUP "$(cat "$PIDFILE")"
+else
+    echo "📋 启动应用..."
+    BIND=0.0.0.0:8000 GUNICORN_PIDFILE="$PIDFILE" \
+        gunicorn -c deploy/gunicorn.conf.py app.main:app --daemon \
+        --access-logfile /var/log/itinerary.log --error-logfile /var/log/itinerary.log
+fi
 
-# 8. 等待启动
-sleep 3
+# 8. 等待就绪（数据库可用、提醒调度器已启动）
+for _ in $(seq 1 30); do
+    if curl -sf http://localhost:8000/ready > /dev/null; then
+        break
+    fi
+    sleep 1
+done
 
 # 9. 验证部署
 echo "📋 验证部署..."
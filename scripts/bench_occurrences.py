@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+周期性事件展开缓存微基准：对比缓存命中与重新展开的耗时
+
+用法: python3 scripts/bench_occurrences.py [重复次数]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.occurrences import OccurrenceCache, _expand  # noqa: E402
+
+RRULE = "FREQ=WEEKLY;UNTIL=20260106T160000Z"
+DTSTART = datetime(2025, 9, 15, 0, 30, tzinfo=timezone.utc)
+DURATION = timedelta(minutes=95)
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    cache = OccurrenceCache()
+    cache.starts(RRULE, DTSTART, DURATION, tz="Asia/Shanghai")
+
+    fresh = timeit.timeit(
+        lambda: _expand(RRULE, DTSTART, DURATION, "Asia/Shanghai"), number=number
+    )
+    cached = timeit.timeit(
+        lambda: cache.starts(RRULE, DTSTART, DURATION, tz="Asia/Shanghai"), number=number
+    )
+    starts = cache.starts(RRULE, DTSTART, DURATION, tz="Asia/Shanghai")
+    print(f"occurrences per series: {len(starts)} ({starts.itemsize * len(starts)} bytes as array('q'))")
+    print(f"fresh expansion: {fresh / number * 1e6:8.2f} us/call")
+    print(f"cache hit:       {cached / number * 1e6:8.2f} us/call")
+    print(f"speedup:         {fresh / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+/events 响应体积与压缩耗时基准
+
+- 不带参数：生成一学期课程的模拟 /events JSON，比较原始、gzip、brotli 各级别的体积与压缩耗时，
+  以及列式紧凑格式的体积与解析耗时
+- --url：对运行中的服务按典型时间窗口请求 /events，比较不同 Accept-Encoding 下的传输字节数与延迟
+
+用法:
+    python3 scripts/bench_responses.py
+    python3 scripts/bench_responses.py --url http://127.0.0.1:8000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import columnar  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COURSES = [
+    ("电子信息工程中的数学模型与方法", "线上"),
+    ("人工智能算法与系统", "线上"),
+    ("知识图谱构建与应用", "209"),
+    ("数据科学前沿", "209"),
+    ("工程前沿技术讲座", "线上"),
+    ("自然语言处理", "107"),
+    ("智能移动应用技术", "310"),
+]
+WINDOWS = {"week": 7, "month": 31, "semester": 126}
+
+
+def synthetic_events(days: int) -> list:
+    term_start = datetime(2025, 9, 15, 0, 30, tzinfo=timezone.utc)
+    events, next_id = [], 1
+    for week in range(days // 7 + 1):
+        for index, (title, location) in enumerate(COURSES):
+            start = term_start + timedelta(weeks=week, days=index % 5, hours=index)
+            if start >= term_start + timedelta(days=days):
+                continue
+            events.append({
+                "id": next_id,
+                "title": title,
+                "description": location,
+                "category": "course",
+                "location": location,
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=95)).isoformat(),
+                "reminder_minutes_before": 20,
+                "reminder_email": "student@example.com",
+                "notification_channels": None,
+                "webhook_url": None,
+                "is_recurring": True,
+                "recurrence_rule": None,
+                "recurrence_end_date": "2026-01-06T16:00:00+00:00",
+                "timezone": "Asia/Shanghai",
+                "reminder_sent": False,
+                "parent_event_id": index + 1,
+                "created_at": term_start.isoformat(),
+                "updated_at": term_start.isoformat(),
+            })
+            next_id += 1
+    return events
+
+
+def timed(func, repeat: int = 20):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - began) / repeat * 1000
+
+
+def as_rows(events: list) -> list:
+    rows = []
+    for item in events:
+        row = dict(item)
+        for field in columnar.TIME_COLUMNS:
+            if row[field] is not None:
+                row[field] = datetime.fromisoformat(row[field])
+        rows.append(SimpleNamespace(**row))
+    return rows
+
+
+def bench_offline() -> None:
+    for name, days in WINDOWS.items():
+        events = synthetic_events(days)
+        raw = json.dumps(events, ensure_ascii=False).encode("utf-8")
+        compact = json.dumps(columnar.encode_events(as_rows(events)), ensure_ascii=False).encode("utf-8")
+        _, raw_parse = timed(lambda: json.loads(raw))
+        _, compact_parse = timed(lambda: json.loads(compact))
+        print(f"[{name}] identity: {len(raw):>8} B  parse {raw_parse:6.2f} ms")
+        print(
+            f"[{name}] columnar: {len(compact):>8} B  parse {compact_parse:6.2f} ms  "
+            f"(gzip -6 {len(gzip.compress(compact, compresslevel=6))} B)"
+        )
+        for level in (1, 6, 9):
+            body, ms = timed(lambda: gzip.compress(raw, compresslevel=level))
+            print(f"[{name}] gzip -{level}:  {len(body):>8} B  {ms:6.2f} ms  ({len(raw) / len(body):.1f}x)")
+        if brotli is not None:
+            for quality in (1, 4, 8):
+                body, ms = timed(lambda: brotli.compress(raw, quality=quality))
+                print(f"[{name}] br q{quality}:    {len(body):>8} B  {ms:6.2f} ms  ({len(raw) / len(body):.1f}x)")
+
+
+def bench_live(base_url: str) -> None:
+    term_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for name, days in WINDOWS.items():
+        query = (
+            f"start_after={term_start.isoformat().replace('+00:00', 'Z')}"
+            f"&end_before={(term_start + timedelta(days=days)).isoformat().replace('+00:00', 'Z')}"
+        )
+        variants = [("identity", "application/json"), ("gzip", "application/json"), ("br", "application/json"),
+                    ("identity", columnar.MEDIA_TYPE), ("gzip", columnar.MEDIA_TYPE)]
+        for encoding, accept in variants:
+            request = urllib.request.Request(
+                f"{base_url}/events?{query}", headers={"Accept-Encoding": encoding, "Accept": accept}
+            )
+            began = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                body = response.read()
+                served = response.headers.get("Content-Encoding", "identity")
+            ms = (time.perf_counter() - began) * 1000
+            label = "columnar" if accept == columnar.MEDIA_TYPE else "json"
+            print(f"[{name}] {label:<8} Accept-Encoding {encoding:<8} -> {served:<8} {len(body):>8} B  {ms:7.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server")
+    args = parser.parse_args()
+    if args.url:
+        bench_live(args.url.rstrip("/"))
+    else:
+        bench_offline()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+构建前端静态资源：按内容哈希重命名，并生成 .gz / .br 预压缩文件
+
+输出到 app/static/dist/，同时写入 manifest.json（逻辑路径 -> 带哈希的路径），
+模板通过 asset() 引用带哈希的文件名。未安装 brotli 时跳过 .br。
+
+用法: python3 scripts/build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+STATIC_DIR = os.path.join(ROOT, "app", "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+EXTENSIONS = (".js", ".css", ".svg", ".json")
+# 太小的文件压缩收益不抵额外开销
+MIN_COMPRESS_BYTES = 256
+
+
+def iter_sources():
+    for directory, subdirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(directory).startswith(os.path.abspath(DIST_DIR)):
+            continue
+        for name in sorted(files):
+            if name.endswith(EXTENSIONS):
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, STATIC_DIR).replace(os.sep, "/"), path
+
+
+def build() -> dict:
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    manifest = {}
+    for logical, source in iter_sources():
+        with open(source, "rb") as handle:
+            data = handle.read()
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        stem, ext = os.path.splitext(logical)
+        hashed = f"dist/{stem}.{digest}{ext}"
+        target = os.path.join(STATIC_DIR, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as handle:
+            handle.write(data)
+        sizes = [f"{len(data)} B"]
+        if len(data) >= MIN_COMPRESS_BYTES:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            with open(target + ".gz", "wb") as handle:
+                handle.write(compressed)
+            sizes.append(f"gz {len(compressed)} B")
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                with open(target + ".br", "wb") as handle:
+                    handle.write(compressed)
+                sizes.append(f"br {len(compressed)} B")
+        manifest[logical] = hashed
+        print(f"{logical} -> {hashed} ({', '.join(sizes)})")
+    with open(os.path.join(DIST_DIR, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+批量导入课表（.ics 文件）
+
+- 参数可以是文件、目录（递归查找 *.ics）或 glob 模式
+- 解析与周期展开在进程池中并行进行（默认使用全部 CPU 核），主进程边收结果边写入
+- 按 VEVENT 的 UID 跨文件去重，先出现的为准
+- 默认直接写入数据库（DATABASE_URL）：每批一个事务，系列、父事件、实例分别批量插入
+- --ndjson 改为输出 NDJSON，每行形如 {"path": "/recurring-events", "body": {...}}，可逐行 POST 给 API
+- 结束时报告吞吐量；单个文件的错误不会中断导入，汇总后输出并以退出码 1 结束
+
+直接写库不会刷新运行中服务的统计缓存，导入后请平滑重载服务（kill -HUP），或改用 NDJSON 经 API 导入。
+
+用法:
+    python3 scripts/import_timetables.py exports/                      # 写入数据库
+    python3 scripts/import_timetables.py 'exports/**/*.ics' --workers 8
+    python3 scripts/import_timetables.py exports/ --ndjson courses.ndjson
+    python3 scripts/import_timetables.py a.ics b.ics --ndjson - | head
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from parse_ical_courses import parse_ical_events  # noqa: E402
+from app.occurrences import occurrence_cache  # noqa: E402
+from app.utils import DEFAULT_TIMEZONE, create_rrule_string, get_zone, parse_ical_rrule  # noqa: E402
+
+SUPPORTED_FREQUENCIES = ("daily", "weekly", "monthly")
+_TRIGGER_PATTERN = re.compile(r"^-P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:\d+S)?)?$")
+
+Record = Dict[str, object]
+
+
+# ---------------------------------------------------------------- 解析（子进程）
+
+def _property(event: dict, name: str) -> Tuple[str, Optional[str]]:
+    """返回属性的 (参数, 值)；键形如 "DTSTART;TZID=Asia/Shanghai" """
+    for key, value in event.items():
+        head, _, params = key.partition(";")
+        if head == name:
+            return params, value.strip()
+    return "", None
+
+
+def _parse_time(params: str, value: str, default_tz: str) -> Tuple[datetime, str]:
+    tz_name = default_tz
+    for param in params.split(";"):
+        if param.startswith("TZID="):
+            tz_name = param[len("TZID="):]
+    if value.endswith("Z"):
+        return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc), "UTC"
+    fmt = "%Y%m%d" if len(value) == 8 else "%Y%m%dT%H%M%S"  # VALUE=DATE 为全天事件
+    local = datetime.strptime(value, fmt).replace(tzinfo=get_zone(tz_name))
+    return local.astimezone(timezone.utc), tz_name
+
+
+def _alarm_minutes(event: dict) -> Optional[int]:
+    """VALARM 的相对触发时间（如 -PT20M）换算为提前分钟数"""
+    for key, value in event.items():
+        if key.split(";", 1)[0] == "VALARM/TRIGGER":
+            match = _TRIGGER_PATTERN.match(value.strip())
+            if match:
+                weeks, days, hours, minutes = (int(part or 0) for part in match.groups())
+                return ((weeks * 7 + days) * 24 + hours) * 60 + minutes
+    return None
+
+
+def _record(event: dict, default_tz: str) -> Record:
+    title = (event.get("SUMMARY") or "").strip()
+    if not title:
+        raise ValueError("missing SUMMARY")
+    start_params, start_value = _property(event, "DTSTART")
+    end_params, end_value = _property(event, "DTEND")
+    if not start_value or not end_value:
+        raise ValueError("missing DTSTART/DTEND")
+    start, tz_name = _parse_time(start_params, start_value, default_tz)
+    end, _ = _parse_time(end_params, end_value, default_tz)
+    if end <= start:
+        raise ValueError("DTEND is not after DTSTART")
+
+    rrule = None
+    until = None
+    starts = [int(start.timestamp())]
+    if event.get("RRULE"):
+        rule = parse_ical_rrule(event["RRULE"])
+        frequency = rule.get("frequency", "weekly")
+        if frequency not in SUPPORTED_FREQUENCIES:
+            raise ValueError(f"unsupported FREQ={frequency.upper()}")
+        until = rule.get("until_date")
+        rrule = create_rrule_string(
+            frequency=frequency,
+            interval=rule.get("interval", 1),
+            until_date=until,
+            count=rule.get("count"),
+        )
+        starts = list(occurrence_cache.starts(rrule, start, end - start, tz=tz_name))
+        if not starts:
+            raise ValueError("RRULE produced no occurrences")
+
+    uid = (event.get("UID") or "").strip()
+    if not uid:
+        # 没有 UID 时以内容摘要代替，内容完全相同的事件仍会去重
+        uid = "sha1:" + hashlib.sha1(json.dumps(sorted(event.items())).encode("utf-8")).hexdigest()
+    return {
+        "uid": uid,
+        "title": title,
+        "description": (event.get("DESCRIPTION") or "").strip() or None,
+        "location": (event.get("LOCATION") or "").strip() or None,
+        "timezone": tz_name,
+        "rrule": rrule,
+        "until": int(until.timestamp()) if until else None,
+        "duration": int((end - start).total_seconds()),
+        "alarm_minutes": _alarm_minutes(event),
+        "starts": starts,
+    }
+
+
+def parse_file(path: str, default_tz: str) -> Tuple[str, List[Record], List[str]]:
+    """解析单个 .ics 文件，返回 (路径, 记录, 错误)；单个 VEVENT 出错不影响同文件的其他事件"""
+    try:
+        with open(path, encoding="utf-8-sig") as handle:
+            events = parse_ical_events(handle.read())
+    except (OSError, UnicodeDecodeError) as exc:
+        return path, [], [str(exc)]
+    records, errors = [], []
+    for index, event in enumerate(events, 1):
+        try:
+            records.append(_record(event, default_tz))
+        except (ValueError, KeyError) as exc:
+            errors.append(f"VEVENT #{index} ({event.get('UID', 'no UID')}): {exc}")
+    return path, records, errors
+
+
+# ---------------------------------------------------------------- 输出（主进程）
+
+def _utc(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class NdjsonSink:
+    """每个事件一行 API 请求体"""
+
+    def __init__(self, stream, *, category: str, reminder_email: Optional[str]) -> None:
+        self.stream = stream
+        self.category = category
+        self.reminder_email = reminder_email
+        self.occurrences = 0
+
+    def add(self, record: Record) -> None:
+        starts = record["starts"]
+        duration = record["duration"]
+        body = {
+            "title": record["title"],
+            "description": record["description"],
+            "category": self.category,
+            "location": record["location"],
+            "start_time": _utc(starts[0]).isoformat(),
+            "end_time": _utc(starts[0] + duration).isoformat(),
+            "timezone": record["timezone"],
+        }
+        if self.reminder_email and record["alarm_minutes"] is not None:
+            body["reminder_minutes_before"] = record["alarm_minutes"]
+            body["reminder_email"] = self.reminder_email
+        if record["rrule"]:
+            rule = parse_ical_rrule(record["rrule"])
+            body.update(
+                recurrence_frequency=rule["frequency"],
+                recurrence_interval=rule.get("interval", 1),
+                recurrence_end_date=_utc(record["until"] or starts[-1] + duration).isoformat(),
+            )
+            if rule.get("count"):
+                body["recurrence_count"] = rule["count"]
+            line = {"path": "/recurring-events", "body": body}
+        else:
+            line = {"path": "/events", "body": body}
+        self.stream.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.occurrences += len(starts)
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class DatabaseSink:
+    """攒满一批后在单个事务中批量插入：series → 父事件（取回ID）→ 其余实例"""
+
+    def __init__(self, *, batch_size: int, category: str, reminder_email: Optional[str]) -> None:
+        from app.database import engine
+        from app.migrations import migrate_database
+
+        migrate_database()
+        self.engine = engine
+        self.batch_size = batch_size
+        self.category = category
+        self.reminder_email = reminder_email
+        self.pending: List[Record] = []
+        self.occurrences = 0
+
+    def add(self, record: Record) -> None:
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _shared(self, record: Record) -> dict:
+        remind = self.reminder_email is not None and record["alarm_minutes"] is not None
+        return {
+            "title": record["title"],
+            "description": record["description"],
+            "category": self.category,
+            "location": record["location"],
+            "reminder_minutes_before": record["alarm_minutes"] if remind else None,
+            "reminder_email": self.reminder_email if remind else None,
+            "timezone": record["timezone"],
+        }
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        from sqlalchemy import insert, update
+
+        from app import models
+        from app.stats import bump_generation
+
+        events = models.Event.__table__
+        series = models.Series.__table__
+        recurring = [record for record in self.pending if record["rrule"]]
+        single = [record for record in self.pending if not record["rrule"]]
+
+        with self.engine.begin() as connection:
+            if recurring:
+                series_ids = connection.execute(
+                    insert(series).returning(series.c.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            **self._shared(record),
+                            "recurrence_rule": record["rrule"],
+                            "recurrence_end_date": _utc(record["until"]) if record["until"] else None,
+                        }
+                        for record in recurring
+                    ],
+                ).scalars().all()
+                parent_ids = connection.execute(
+                    insert(events).returning(events.c.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "series_id": series_id,
+                            "start_time": _utc(record["starts"][0]),
+                            "end_time": _utc(record["starts"][0] + record["duration"]),
+                            "is_recurring": True,
+                            "reminder_sent": False,
+                        }
+                        for series_id, record in zip(series_ids, recurring)
+                    ],
+                ).scalars().all()
+                connection.execute(
+                    update(events).where(events.c.id.in_(parent_ids)).values(parent_event_id=events.c.id)
+                )
+                instances = [
+                    {
+                        "series_id": series_id,
+                        "parent_event_id": parent_id,
+                        "start_time": _utc(start),
+                        "end_time": _utc(start + record["duration"]),
+                        "is_recurring": True,
+                        "reminder_sent": False,
+                    }
+                    for series_id, parent_id, record in zip(series_ids, parent_ids, recurring)
+                    for start in record["starts"][1:]
+                ]
+                if instances:
+                    connection.execute(insert(events), instances)
+            if single:
+                connection.execute(
+                    insert(events),
+                    [
+                        {
+                            **self._shared(record),
+                            "start_time": _utc(record["starts"][0]),
+                            "end_time": _utc(record["starts"][0] + record["duration"]),
+                            "is_recurring": False,
+                            "reminder_sent": False,
+                        }
+                        for record in single
+                    ],
+                )
+            bump_generation(connection)
+        self.occurrences += sum(len(record["starts"]) for record in self.pending)
+        self.pending = []
+
+
+# ---------------------------------------------------------------- 命令行
+
+def collect_paths(patterns: List[str]) -> List[str]:
+    paths: Dict[str, None] = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.ics"), recursive=True)
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+        for match in sorted(matches):
+            paths.setdefault(os.path.normpath(match), None)
+    return list(paths)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help=".ics files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes (default: all cores)")
+    parser.add_argument("--ndjson", metavar="FILE", help="write NDJSON API payloads instead of the database ('-' for stdout)")
+    parser.add_argument("--batch-size", type=int, default=200, help="events per database transaction")
+    parser.add_argument("--category", default="course")
+    parser.add_argument("--reminder-email", help="enable reminders (from VALARM triggers) for this address")
+    parser.add_argument("--timezone", default=DEFAULT_TIMEZONE, help="zone for times without TZID")
+    args = parser.parse_args()
+
+    paths = collect_paths(args.paths)
+    if not paths:
+        print("No .ics files found", file=sys.stderr)
+        return 1
+
+    output = None
+    if args.ndjson:
+        output = sys.stdout if args.ndjson == "-" else open(args.ndjson, "w", encoding="utf-8")
+        sink = NdjsonSink(output, category=args.category, reminder_email=args.reminder_email)
+    else:
+        sink = DatabaseSink(batch_size=args.batch_size, category=args.category, reminder_email=args.reminder_email)
+
+    workers = max(1, min(args.workers, len(paths)))
+    # 小文件很多时按块分发，减少进程间往返
+    chunksize = max(1, len(paths) // (workers * 8))
+    seen = set()
+    parsed = duplicates = 0
+    failures: List[Tuple[str, str]] = []
+    began = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, records, errors in executor.map(
+            partial(parse_file, default_tz=args.timezone), paths, chunksize=chunksize
+        ):
+            failures.extend((path, error) for error in errors)
+            for record in records:
+                parsed += 1
+                if record["uid"] in seen:
+                    duplicates += 1
+                    continue
+                seen.add(record["uid"])
+                sink.add(record)
+    sink.close()
+    if output is not None and output is not sys.stdout:
+        output.close()
+    elapsed = time.perf_counter() - began
+
+    report = sys.stderr
+    print(
+        f"{len(paths)} files, {parsed} VEVENTs ({duplicates} duplicate UIDs skipped), "
+        f"{len(seen)} imported as {sink.occurrences} occurrences in {elapsed:.2f}s with {workers} workers",
+        file=report,
+    )
+    if elapsed > 0:
+        print(
+            f"throughput: {len(paths) / elapsed:,.0f} files/s, {parsed / elapsed:,.0f} VEVENTs/s, "
+            f"{sink.occurrences / elapsed:,.0f} occurrences/s",
+            file=report,
+        )
+    if failures:
+        failed_files = len({path for path, _ in failures})
+        print(f"{len(failures)} errors in {failed_files} files:", file=report)
+        for path, error in failures[:50]:
+            print(f"  {path}: {error}", file=report)
+        if len(failures) > 50:
+            print(f"  ... {len(failures) - 50} more", file=report)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
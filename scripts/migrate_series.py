@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+把周期性事件的共享属性迁移到 series 表，并报告迁移前后的存储占用
+
+服务启动时的 schema 升级会自动执行同样的迁移；本脚本用于停机窗口内手动执行并查看效果。
+测量前先完成其余的 schema 升级（建表、补列与索引、ID 序列、全文索引、按日汇总），
+两次测量之间只有 series 归并本身（及其重建表时需要重新创建的全文索引与汇总触发器），
+报告的变化不会混入其他升级步骤新建的表与索引。
+SQLite 在迁移前后各执行一次 VACUUM，使两次测量都不含空闲页；PostgreSQL 使用 VACUUM FULL
+（会锁表，数据量大时请在低峰期执行，或加 --no-vacuum 只看逻辑大小变化）。
+
+用法:
+    python3 scripts/migrate_series.py
+    DATABASE_URL=postgresql://... python3 scripts/migrate_series.py --no-vacuum
+"""
+import argparse
+import os
+import sys
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text  # noqa: E402
+
+from app import models  # noqa: E402,F401  注册模型
+from app.database import Base, add_missing_columns, add_missing_indexes, engine  # noqa: E402
+from app.migrations import ensure_event_id_sequence, normalize_series  # noqa: E402
+from app.search import ensure_search_index  # noqa: E402
+from app.stats import ensure_generation, ensure_rollup  # noqa: E402
+
+TABLES = ("events", "events_archive", "series", "events_fts", "events_archive_fts", "event_daily_rollup")
+# FTS5 的影子表（*_data、*_idx 等）及短查询索引计入对应的全文索引
+_FTS_PREFIXES = ("events_archive_fts", "events_fts")
+
+
+def vacuum() -> None:
+    statement = "VACUUM" if engine.dialect.name == "sqlite" else "VACUUM FULL"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql(statement)
+
+
+def measure() -> Dict[str, int]:
+    """各表（含索引）占用字节数，以及数据库总大小"""
+    sizes: Dict[str, int] = {}
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+            sizes["total"] = connection.exec_driver_sql("PRAGMA page_count").scalar() * page_size
+            try:
+                rows = connection.exec_driver_sql(
+                    "SELECT coalesce(m.tbl_name, d.name), sum(d.pgsize) FROM dbstat d "
+                    "LEFT JOIN sqlite_master m ON m.name = d.name GROUP BY 1"
+                ).all()
+            except Exception:
+                rows = []  # 未编译 dbstat 虚拟表时只报告总大小
+            for name, size in rows:
+                key = next((prefix for prefix in _FTS_PREFIXES if name.startswith(prefix)), name)
+                if key in TABLES:
+                    sizes[key] = sizes.get(key, 0) + int(size)
+        else:
+            sizes["total"] = connection.execute(text("SELECT pg_database_size(current_database())")).scalar()
+            for name in TABLES:
+                size = connection.execute(text("SELECT pg_total_relation_size(to_regclass(:name))"), {"name": name}).scalar()
+                if size is not None:
+                    sizes[name] = int(size)
+    return sizes
+
+
+def prepare_schema() -> None:
+    """执行 series 归并以外的全部升级步骤（与 app.migrations._migrate 相同），使测量只反映归并本身"""
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
+    ensure_event_id_sequence(engine)
+    ensure_search_index(engine)
+    ensure_rollup(engine)
+    ensure_generation(engine)
+
+
+def _format(size: int) -> str:
+    return f"{size / 1024:,.1f} KiB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM before/after measuring")
+    args = parser.parse_args()
+
+    prepare_schema()
+    if not args.no_vacuum:
+        vacuum()
+    before = measure()
+
+    counts = normalize_series(engine)
+    if counts["tables_rebuilt"]:
+        # 重建表时删除了全文索引与汇总触发器，恢复后再测量，两次测量包含相同的结构
+        ensure_search_index(engine)
+        ensure_rollup(engine)
+
+    if not args.no_vacuum:
+        vacuum()
+    after = measure()
+
+    print(
+        f"series created: {counts['series_created']}, rows linked: {counts['rows_linked']}, "
+        f"duplicated values cleared: {counts['fields_cleared']}, tables rebuilt: {counts['tables_rebuilt']}"
+    )
+    for name in sorted(set(before) | set(after), key=lambda item: (item == "total", item)):
+        old, new = before.get(name, 0), after.get(name, 0)
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "new"
+        print(f"{name:<20} {_format(old):>14} -> {_format(new):>14}  {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -159,20 +159,46 @@ END:VALARM
 END:VEVENT
 END:VCALENDAR'''
 
+def unfold_lines(ical_data):
+    """按 RFC 5545 展开折行（以空格或制表符开头的行是上一行的延续）"""
+    lines = []
+    for raw in ical_data.splitlines():
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        else:
+            lines.append(raw)
+    return lines
+
+
 def parse_ical_events(ical_data):
-    """解析iCal数据，提取事件信息"""
+    """解析iCal数据，提取事件信息
+
+    VEVENT 内嵌组件（如 VALARM）的属性以 "组件名/属性" 为键保存，不会覆盖事件本身的同名属性。
+    """
     events = []
-    current_event = {}
+    current_event = None
+    nested = []
     
-    for line in ical_data.split('\n'):
+    for line in unfold_lines(ical_data):
         line = line.strip()
         if line == 'BEGIN:VEVENT':
             current_event = {}
+            nested = []
         elif line == 'END:VEVENT':
             if current_event:
                 events.append(current_event)
+            current_event = None
+        elif current_event is None:
+            continue
+        elif line.startswith('BEGIN:'):
+            nested.append(line[len('BEGIN:'):])
+        elif line.startswith('END:'):
+            if nested:
+                nested.pop()
         elif ':' in line:
             key, value = line.split(':', 1)
+            if nested:
+                key = f"{nested[-1]}/{key}"
             current_event[key] = value
     
     return events
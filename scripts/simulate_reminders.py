@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+提醒调度离线仿真：在虚拟时间中回放一个月的提醒，统计漏发、重复、延迟与调度 CPU 时间
+
+- 在临时 SQLite 数据库中生成合成数据（固定随机种子，可复现）：单次行程 + 每周课程系列（series 表），
+  提前量、收件人、通知渠道按比例随机分布，开始时间对齐到 5 分钟以模拟集中提醒
+- ReminderDispatcher 使用 VirtualClock：等待直接跳到下一条提醒时间或超时点，不真实休眠
+- --late-writes 在随机虚拟时刻通过 crud.create_event 写入几分钟后就要提醒的新行程，检验唤醒路径
+- 默认用内存记录渠道代替邮件/Webhook；--smtp 让邮件经 EmailChannel 发到进程内的本地 SMTP 接收器
+  （走真实网络往返，较慢，建议配合较小的 --events / --series）
+- 报告应发/已发数量、漏发、重复、提前、延迟（超过 --late-after 秒）及延迟分位数、调度轮次与 CPU 时间；
+  存在漏发、重复、多发或提前发送时以退出码 1 结束，可用于比较调度器改动
+- 耗时主要取决于调度轮次 × 每轮查询开销，后者随 7 天（最大提前量）内的待发提醒数增长
+
+用法:
+    python3 scripts/simulate_reminders.py
+    python3 scripts/simulate_reminders.py --events 200000 --series 20000 --digest
+    python3 scripts/simulate_reminders.py --no-wakeup --poll 60
+    python3 scripts/simulate_reminders.py --smtp --events 2000 --series 200
+"""
+import argparse
+import asyncio
+import email
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SIM_START = datetime(2030, 9, 1, tzinfo=timezone.utc)
+LEAD_MINUTES = (0, 5, 10, 10, 15, 15, 15, 30, 60, 1440)
+WEBHOOK_URL = "http://sink.invalid/hook"
+
+Delivery = Tuple[int, str, datetime]  # (event id, 渠道, 虚拟发送时间)
+
+
+# ---------------------------------------------------------------- 合成数据
+
+class Workload:
+    """记录每个提醒应在何时、经哪些渠道送达"""
+
+    def __init__(self) -> None:
+        self.expected: Dict[int, Tuple[datetime, Tuple[str, ...]]] = {}
+        self.labels: Dict[Tuple[str, str], int] = {}  # (标题, 开始时间) -> id，供 SMTP 接收器反查
+
+    def add(self, event_id: int, title: str, start: datetime, minutes: int, channels: Tuple[str, ...]) -> None:
+        self.expected[event_id] = (start - timedelta(minutes=minutes), channels)
+        self.labels[(title, start.isoformat())] = event_id
+
+
+def _pick_reminder(rng: random.Random, recipients: int) -> dict:
+    channels = ("email", "webhook") if rng.random() < 0.1 else ("email",)
+    return {
+        "reminder_minutes_before": rng.choice(LEAD_MINUTES),
+        "reminder_email": f"user{rng.randrange(recipients)}@example.com",
+        "notification_channels": ",".join(channels) if len(channels) > 1 else None,
+        "webhook_url": WEBHOOK_URL if "webhook" in channels else None,
+    }
+
+
+def _aligned_start(rng: random.Random, minutes: int, days: int) -> datetime:
+    """开始时间对齐到 5 分钟，且提醒时间落在仿真区间内（开始时间可以在区间之后）"""
+    slots = days * 24 * 60 // 5
+    return SIM_START + timedelta(minutes=minutes + 5 * rng.randrange(slots))
+
+
+def generate(args, workload: Workload) -> None:
+    from sqlalchemy import insert, update
+
+    from app import models
+    from app.database import engine
+
+    rng = random.Random(args.seed)
+    events = models.Event.__table__
+    series = models.Series.__table__
+    with engine.begin() as connection:
+        rows = []
+        for index in range(args.events):
+            reminder = _pick_reminder(rng, args.recipients)
+            start = _aligned_start(rng, reminder["reminder_minutes_before"], args.days)
+            rows.append({
+                "title": f"行程 #{index}",
+                "start_time": start,
+                "end_time": start + timedelta(hours=1),
+                "is_recurring": False,
+                "reminder_sent": False,
+                **reminder,
+            })
+        ids = connection.execute(
+            insert(events).returning(events.c.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        for event_id, row in zip(ids, rows):
+            channels = tuple(row["notification_channels"].split(",")) if row["notification_channels"] else ("email",)
+            workload.add(event_id, row["title"], row["start_time"], row["reminder_minutes_before"], channels)
+
+        # 每周课程：系列属性存于 series，实例行只有时间
+        plans = []
+        for index in range(args.series):
+            reminder = _pick_reminder(rng, args.recipients)
+            reminder["reminder_minutes_before"] = min(reminder["reminder_minutes_before"], 60)
+            first = _aligned_start(rng, reminder["reminder_minutes_before"], 7)
+            starts = [first + timedelta(weeks=week) for week in range(args.days // 7 + 1)]
+            starts = [start for start in starts if start - timedelta(minutes=reminder["reminder_minutes_before"]) < SIM_START + timedelta(days=args.days)]
+            plans.append(({"title": f"课程 #{index}", "recurrence_rule": "FREQ=WEEKLY", **reminder}, starts))
+        if plans:
+            series_ids = connection.execute(
+                insert(series).returning(series.c.id, sort_by_parameter_order=True), [shared for shared, _ in plans]
+            ).scalars().all()
+            instances = [
+                {"series_id": series_id, "start_time": start, "end_time": start + timedelta(minutes=95),
+                 "is_recurring": True, "reminder_sent": False}
+                for series_id, (_, starts) in zip(series_ids, plans)
+                for start in starts
+            ]
+            ids = connection.execute(
+                insert(events).returning(events.c.id, sort_by_parameter_order=True), instances
+            ).scalars().all()
+            parents = {}
+            shared_by_series = dict(zip(series_ids, (shared for shared, _ in plans)))
+            for event_id, row in zip(ids, instances):
+                parents.setdefault(row["series_id"], event_id)
+                shared = shared_by_series[row["series_id"]]
+                channels = tuple(shared["notification_channels"].split(",")) if shared["notification_channels"] else ("email",)
+                workload.add(event_id, shared["title"], row["start_time"], shared["reminder_minutes_before"], channels)
+            for series_id, parent_id in parents.items():
+                connection.execute(
+                    update(events).where(events.c.series_id == series_id).values(parent_event_id=parent_id)
+                )
+
+
+def schedule_late_writes(args, clock, workload: Workload) -> None:
+    """在随机虚拟时刻新建几分钟后就要提醒的行程（经 crud，触发唤醒）"""
+    from app import crud, schemas
+    from app.database import SessionLocal
+
+    rng = random.Random(args.seed + 1)
+    horizon = args.days * 24 * 3600 - 15 * 60
+    for index in range(args.late_writes):
+        at = SIM_START + timedelta(seconds=rng.randrange(horizon))
+        lead = timedelta(seconds=rng.randrange(5, 300))
+
+        def create(index=index, lead=lead) -> None:
+            start = clock.now() + lead + timedelta(minutes=10)
+            title = f"临时 #{index}"
+            with SessionLocal() as db:
+                event = crud.create_event(db, schemas.EventCreate(
+                    title=title, start_time=start, end_time=start + timedelta(minutes=30),
+                    reminder_minutes_before=10, reminder_email=f"late{index}@example.com",
+                ))
+                workload.add(event.id, title, start, 10, ("email",))
+
+        clock.call_at(at, create)
+
+
+# ---------------------------------------------------------------- 发送端
+
+def recording_channels(clock, deliveries: List[Delivery]) -> dict:
+    from app.channels import Channel
+
+    class RecordingChannel(Channel):
+        def __init__(self, name: str, attribute: str) -> None:
+            super().__init__(concurrency=64)
+            self.name = name
+            self.attribute = attribute
+
+        def target_for(self, event):
+            return getattr(event, self.attribute)
+
+        async def _deliver(self, target, subject, body, events) -> None:
+            deliveries.extend((event.id, self.name, clock.now()) for event in events)
+
+    return {"email": RecordingChannel("email", "reminder_email"), "webhook": RecordingChannel("webhook", "webhook_url")}
+
+
+class SMTPSink:
+    """最小化的本地 SMTP 接收器：解析正文中的标题与开始时间，记录为送达"""
+
+    def __init__(self, clock, workload: Workload, deliveries: List[Delivery]) -> None:
+        self.clock = clock
+        self.workload = workload
+        self.deliveries = deliveries
+        self.unknown = 0
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(b"220 sink ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                writer.write(b"250 sink\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 end with .\r\n")
+                await writer.drain()
+                data = []
+                while True:
+                    chunk = await reader.readline()
+                    if chunk in (b".\r\n", b".\n", b""):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                self._record(b"".join(data))
+                writer.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+    def _record(self, raw: bytes) -> None:
+        body = email.message_from_bytes(raw).get_payload(decode=True).decode("utf-8")
+        title = None
+        for line in body.splitlines():
+            if line.startswith("标题: "):
+                title = line[len("标题: "):]
+            elif line.startswith("开始时间 (UTC): ") and title is not None:
+                event_id = self.workload.labels.get((title, line[len("开始时间 (UTC): "):]))
+                if event_id is None:
+                    self.unknown += 1
+                else:
+                    self.deliveries.append((event_id, "email", self.clock.now()))
+                title = None
+
+
+# ---------------------------------------------------------------- 仿真与报告
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def report(args, workload: Workload, deliveries: List[Delivery], dispatcher, wall: float) -> int:
+    counts = Counter((event_id, channel) for event_id, channel, _ in deliveries)
+    first: Dict[Tuple[int, str], datetime] = {}
+    for event_id, channel, at in deliveries:
+        first.setdefault((event_id, channel), at)
+
+    expected: Set[Tuple[int, str]] = {
+        (event_id, channel) for event_id, (_, channels) in workload.expected.items() for channel in channels
+    }
+    missed = [key for key in expected if key not in counts]
+    duplicates = sum(count - 1 for key, count in counts.items() if count > 1)
+    unexpected = sum(count for key, count in counts.items() if key not in expected)
+    lags = sorted(
+        (first[key] - workload.expected[key[0]][0]).total_seconds() for key in expected if key in first
+    )
+    early = sum(1 for lag in lags if lag < 0)
+    late = sum(1 for lag in lags if lag > args.late_after)
+
+    mode = "wake-up" if not args.no_wakeup else "polling"
+    print(
+        f"{len(workload.expected)} reminders over {args.days} days ({len(expected)} deliveries expected), "
+        f"{mode}, scan every {dispatcher.scan_interval_seconds}s, digest={'on' if args.digest else 'off'}"
+    )
+    print(f"delivered:  {len(deliveries)}")
+    print(f"missed:     {len(missed)}")
+    print(f"duplicate:  {duplicates}")
+    print(f"unexpected: {unexpected}")
+    print(f"early:      {early}")
+    print(f"late:       {late} (> {args.late_after:g}s)")
+    print(
+        f"lag:        p50 {_percentile(lags, 0.5):.1f}s  p95 {_percentile(lags, 0.95):.1f}s  "
+        f"p99 {_percentile(lags, 0.99):.1f}s  max {lags[-1] if lags else 0:.1f}s"
+    )
+    print(
+        f"dispatch:   {dispatcher.ticks} ticks, {dispatcher.cpu_seconds:.2f}s CPU "
+        f"({dispatcher.cpu_seconds / max(1, dispatcher.ticks) * 1000:.2f} ms/tick); wall {wall:.1f}s"
+    )
+    for event_id, channel in sorted(missed)[:10]:
+        print(f"  missed {channel} reminder of event {event_id} due {workload.expected[event_id][0].isoformat()}")
+    return 1 if missed or duplicates or unexpected or early else 0
+
+
+async def simulate(args, workdir: str) -> int:
+    from app.clock import VirtualClock
+    from app.emailer import SMTPSettings
+    from app.migrations import migrate_database
+    from app.scheduler import ReminderDispatcher
+    from app.wakeup import WakeupListener
+
+    class MeasuredDispatcher(ReminderDispatcher):
+        ticks = 0
+        cpu_seconds = 0.0
+
+        async def _dispatch_once(self, now):
+            began = time.process_time()
+            await super()._dispatch_once(now)
+            self.ticks += 1
+            self.cpu_seconds += time.process_time() - began
+
+        def _next_delay(self, now):
+            began = time.process_time()
+            try:
+                return super()._next_delay(now)
+            finally:
+                self.cpu_seconds += time.process_time() - began
+
+    migrate_database()
+    workload = Workload()
+    began = time.perf_counter()
+    generate(args, workload)
+    print(f"generated {len(workload.expected)} reminders in {time.perf_counter() - began:.1f}s", file=sys.stderr)
+
+    clock = VirtualClock(SIM_START, freeze_at=SIM_START + timedelta(days=args.days, minutes=args.grace))
+    deliveries: List[Delivery] = []
+    channels = recording_channels(clock, deliveries)
+    sink = None
+    if args.smtp:
+        from app.channels import EmailChannel
+
+        sink = SMTPSink(clock, workload, deliveries)
+        port = await sink.start()
+        settings = SMTPSettings(host="127.0.0.1", port=port, username=None, password=None,
+                                use_tls=False, use_ssl=False, sender="sim@example.com")
+        channels["email"] = EmailChannel(settings, concurrency=16)
+    schedule_late_writes(args, clock, workload)
+
+    dispatcher = MeasuredDispatcher(
+        args.poll,
+        digest=args.digest,
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        max_concurrency=64,
+        wakeup=None if args.no_wakeup else WakeupListener(),
+        reconcile_interval_seconds=args.reconcile,
+        clock=clock,
+        channels=channels,
+    )
+    began = time.perf_counter()
+    await dispatcher.start()
+    await clock.frozen.wait()
+    await dispatcher.stop()
+    wall = time.perf_counter() - began
+    if sink is not None:
+        await sink.close()
+        if sink.unknown:
+            print(f"SMTP sink received {sink.unknown} unrecognised reminders", file=sys.stderr)
+    return report(args, workload, deliveries, dispatcher, wall)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000, help="one-off events with reminders")
+    parser.add_argument("--series", type=int, default=1000, help="weekly series with reminders")
+    parser.add_argument("--late-writes", type=int, default=500, help="events created shortly before their reminder")
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--poll", type=int, default=60, help="REMINDER_POLL_INTERVAL")
+    parser.add_argument("--reconcile", type=int, default=300, help="REMINDER_RECONCILE_INTERVAL")
+    parser.add_argument("--no-wakeup", action="store_true", help="poll instead of waking on writes")
+    parser.add_argument("--digest", action="store_true")
+    parser.add_argument("--smtp", action="store_true", help="deliver email through a local SMTP sink")
+    parser.add_argument("--late-after", type=float, default=60.0, help="seconds after which a reminder counts as late")
+    parser.add_argument("--grace", type=int, default=15, help="minutes simulated after the last reminder is due")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", metavar="DIR", help="keep the simulation database in DIR")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = args.keep or tempfile.mkdtemp(prefix="reminder-sim-")
+    os.makedirs(workdir, exist_ok=True)
+    for name in ("simulation.db", "send.log"):
+        if os.path.exists(os.path.join(workdir, name)):
+            os.remove(os.path.join(workdir, name))
+    # 必须在导入 app 之前设置：数据库与唤醒后端在模块加载时确定
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'simulation.db')}"
+    os.environ["REMINDER_WAKEUP"] = "off" if args.no_wakeup else "local"
+    try:
+        return asyncio.run(simulate(args, workdir))
+    finally:
+        if not args.keep:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
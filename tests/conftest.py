@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+# 数据库引擎与后台任务在导入时从环境变量读取配置
+_WORKDIR = tempfile.mkdtemp(prefix="itinerary-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_WORKDIR, 'test.db')}"
+os.environ["REMINDER_LEASE_FILE"] = os.path.join(_WORKDIR, "reminder.lock")
+os.environ["REMINDER_SEND_LOG"] = os.path.join(_WORKDIR, "reminder_send.log")
+os.environ["ARCHIVE_LEASE_FILE"] = os.path.join(_WORKDIR, "archive.lock")
+os.environ["REMINDER_WAKEUP"] = "off"
+os.environ.setdefault("REMINDER_POLL_INTERVAL", "3600")
+# 所有测试共用一个客户端地址，按客户端限流会让后面的用例收到 429；准入测试自行构造限流器
+os.environ["RATE_LIMIT_PER_SECOND"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    return str(tmp_path)
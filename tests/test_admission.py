@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.admission import AdmissionControl, AdmissionMiddleware, ConcurrencyLimiter, Overloaded, TokenBuckets
+
+
+async def ok(request):
+    return JSONResponse({"ok": True})
+
+
+def _client(control):
+    app = Starlette(
+        routes=[
+            Route("/events", ok, methods=["GET", "POST"]),
+            Route("/events/{event_id:int}", ok),
+            Route("/health", ok),
+            Route("/stats", ok),
+        ]
+    )
+    app.add_middleware(AdmissionMiddleware, control=control)
+    return TestClient(app)
+
+
+def test_token_bucket_allows_burst_then_refills_per_client():
+    buckets = TokenBuckets(rate=2, burst=3)
+
+    assert [buckets.take("a", 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a", 100.0) == pytest.approx(0.5)
+    assert buckets.take("b", 100.0) == 0.0
+    # 0.5 秒补回一个令牌
+    assert buckets.take("a", 100.5) == 0.0
+
+
+def test_rate_limited_client_gets_429_with_retry_after():
+    control = AdmissionControl(TokenBuckets(rate=1, burst=2), None)
+    client = _client(control)
+
+    statuses = [client.get("/events").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    rejected = client.get("/events")
+    assert rejected.json() == {"detail": "Too many requests"}
+    assert int(rejected.headers["retry-after"]) >= 1
+    # 健康检查不计入限流
+    assert client.get("/health").status_code == 200
+    assert control.counters["rate_limited"] == 2
+
+
+def test_full_queue_sheds_expensive_requests_with_503():
+    limiter = ConcurrencyLimiter(1, queue_limit=1, queue_timeout=5)
+
+    async def run():
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        limiter.release(0.1)
+        await queued  # 释放的名额按先进先出交给排队者
+        limiter.release(0.1)
+        return shed.value
+
+    shed = asyncio.run(run())
+    assert shed.status_code == 503
+    assert shed.retry_after > 0
+    assert limiter.stats()["active"] == 0
+
+
+def test_queue_wait_is_bounded():
+    limiter = ConcurrencyLimiter(1, queue_timeout=0.05)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await limiter.acquire()
+        return timed_out.value
+
+    assert asyncio.run(run()).detail == "Server busy, queue wait exceeded"
+    assert limiter.stats()["queued"] == 0
+
+
+def test_dispatcher_reservation_leaves_one_slot_for_api():
+    limiter = ConcurrencyLimiter(3, reserve=2, queue_timeout=0.05)
+
+    async def run():
+        async with limiter.reserved():
+            await limiter.acquire()
+            with pytest.raises(Overloaded):
+                await limiter.acquire()
+        # 调度器结束后恢复全部名额
+        await limiter.acquire()
+        await limiter.acquire()
+        return limiter.stats()["active"]
+
+    assert asyncio.run(run()) == 3
+
+
+def test_cheap_routes_skip_the_concurrency_limit():
+    limiter = ConcurrencyLimiter(1, queue_limit=0)
+    control = AdmissionControl(None, limiter)
+    client = _client(control)
+    asyncio.run(limiter.acquire())  # 高开销名额已被占满
+
+    assert client.get("/stats").status_code == 503
+    assert client.get("/events/1").status_code == 200
+    assert client.post("/events").status_code == 200
+    assert control.counters["shed"] == 1
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+from app import crud, models
+
+ARCHIVE_BEFORE = datetime(2002, 1, 1, tzinfo=timezone.utc)
+
+
+def _archived_event(db, title, start):
+    event = models.Event(
+        title=title,
+        location="北京",
+        start_time=start,
+        end_time=start + timedelta(hours=1),
+        is_recurring=False,
+    )
+    db.add(event)
+    db.commit()
+    event_id = event.id
+    crud.archive_events_batch(db, ended_before=ARCHIVE_BEFORE)
+    assert crud.get_event(db, event_id) is None
+    return event_id
+
+
+def test_search_includes_archived_events(client, db):
+    event_id = _archived_event(db, "Quarterly archivist review 鹦鹉螺", datetime(2001, 2, 1, 9, tzinfo=timezone.utc))
+
+    for query in ("archivist", "鹦鹉螺", "鹦鹉"):
+        hits = client.get("/events/search", params={"q": query}).json()
+        assert [hit["event"]["id"] for hit in hits] == [event_id], query
+
+
+def test_archived_event_is_readable_and_deletable_but_read_only(client, db):
+    event_id = _archived_event(db, "archived by id", datetime(2001, 2, 2, 9, tzinfo=timezone.utc))
+
+    response = client.get(f"/events/{event_id}")
+    assert response.status_code == 200
+    assert response.json()["title"] == "archived by id"
+    assert client.patch(f"/events/{event_id}", json={"title": "renamed"}).status_code == 409
+
+    assert client.delete(f"/events/{event_id}").status_code == 204
+    assert client.get(f"/events/{event_id}").status_code == 404
+    assert client.get("/events/search", params={"q": "archived by id"}).json() == []
+
+
+def test_new_events_do_not_reuse_archived_ids(client, db):
+    # 归档最新创建的行程后，主表中已没有该ID
+    event_id = _archived_event(db, "highest id so far", datetime(2001, 2, 3, 9, tzinfo=timezone.utc))
+
+    created = client.post(
+        "/events",
+        json={
+            "title": "created after archiving",
+            "start_time": "2031-02-03T09:00:00Z",
+            "end_time": "2031-02-03T10:00:00Z",
+        },
+    ).json()
+    assert created["id"] > event_id
+    assert client.get(f"/events/{event_id}").json()["title"] == "highest id so far"
+
+
+def test_recurring_instances_include_archived_occurrences(client, db):
+    summary = client.post(
+        "/recurring-events",
+        json={
+            "title": "weekly across the archive",
+            "start_time": "2001-11-05T09:00:00Z",
+            "end_time": "2001-11-05T10:00:00Z",
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2002-01-28T10:00:00Z",
+            "timezone": "UTC",
+        },
+    ).json()
+    parent_id = summary["parent_event_id"]
+    crud.archive_events_batch(db, ended_before=ARCHIVE_BEFORE)
+
+    listed = client.get(f"/recurring-events/{parent_id}/instances", params={"limit": 500}).json()
+    assert len(listed) == summary["instance_count"]
+    starts = [event["start_time"] for event in listed]
+    assert starts == sorted(starts)
+
+    page = client.get(f"/recurring-events/{parent_id}/instances", params={"offset": 6, "limit": 4}).json()
+    assert [event["id"] for event in page] == [event["id"] for event in listed[6:10]]
@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app import assets
+from app.assets import PrecompressedStaticFiles
+
+SOURCE = "console.log('precompressed');\n" * 20
+
+
+@pytest.fixture()
+def static_client(tmp_path):
+    (tmp_path / "app.js").write_text(SOURCE)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(SOURCE.encode()))
+    app = Starlette(routes=[Mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)))])
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("br;q=1.0, gzip;q=0.5", "gzip"),  # 没有 .br 文件时退回下一个
+        ("*", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=0.000, identity", None),
+        ("*;q=0, identity", None),
+        ("identity", None),
+    ],
+)
+def test_precompressed_file_follows_accept_encoding(static_client, accept_encoding, expected):
+    response = static_client.get("/static/app.js", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected
+    assert response.headers["content-type"].startswith(("application/javascript", "text/javascript"))
+    assert response.headers["vary"] == "Accept-Encoding"
+    # httpx 会透明解压，两种情况下正文都应等于原文件
+    assert response.text == SOURCE
+
+
+def test_only_fingerprinted_files_are_cached_forever(tmp_path):
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / "app.0123456789.js").write_text(SOURCE)
+    (tmp_path / "app.js").write_text(SOURCE)
+    app = Starlette(routes=[Mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)))])
+    with TestClient(app) as client:
+        hashed = client.get("/static/dist/app.0123456789.js")
+        plain = client.get("/static/app.js")
+
+    assert hashed.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert plain.headers["cache-control"] == "no-cache"
+
+
+def test_asset_url_uses_manifest(monkeypatch):
+    monkeypatch.setattr(assets, "load_manifest", lambda: {"js/app.js": "dist/js/app.0123456789.js"})
+
+    assert assets.asset_url("js/app.js") == "/static/dist/js/app.0123456789.js"
+    assert assets.asset_url("css/missing.css") == "/static/css/missing.css"
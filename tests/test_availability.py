@@ -0,0 +1,121 @@
+import random
+from datetime import datetime, time, timezone
+
+from app.availability import free_slots, merge_busy, working_windows
+
+HOUR = 3600
+
+
+def test_merge_joins_overlapping_and_touching_intervals():
+    assert merge_busy([(0, 10), (5, 8), (10, 20), (30, 40), (35, 50)]) == [(0, 20), (30, 50)]
+    assert merge_busy([]) == []
+
+
+def test_working_windows_follow_local_time_across_dst():
+    # 柏林 2035-03-25 开始夏令时：09:00 当地时间由 08:00 UTC 变为 07:00 UTC
+    windows = working_windows(
+        datetime(2035, 3, 23, tzinfo=timezone.utc),
+        datetime(2035, 3, 27, tzinfo=timezone.utc),
+        day_start=time(9),
+        day_end=time(17),
+        weekdays={1, 2, 3, 4, 5},
+        zone_name="Europe/Berlin",
+    )
+    opens = [datetime.fromtimestamp(start, timezone.utc) for start, _, _ in windows]
+    assert [(moment.day, moment.hour) for moment in opens] == [(23, 8), (26, 7)]
+    assert all(end - start == 8 * HOUR for start, end, _ in windows)
+
+
+def _brute_force(busy, windows, duration, step, limit):
+    slots = []
+    for window_start, window_end, anchor in windows:
+        slot = anchor
+        while slot + duration <= window_end:
+            if slot >= window_start and all(slot + duration <= start or slot >= end for start, end in busy):
+                slots.append((slot, slot + duration))
+            slot += step
+    return slots[:limit]
+
+
+def test_sweep_matches_brute_force_on_random_calendars():
+    rng = random.Random(7)
+    for _ in range(200):
+        busy = sorted(
+            (start, start + rng.randrange(1, 8) * 900)
+            for start in (rng.randrange(0, 5 * 24 * 4) * 900 for _ in range(rng.randrange(0, 30)))
+        )
+        windows = [
+            (day * 24 * HOUR + 9 * HOUR + rng.choice((0, 600)), day * 24 * HOUR + 17 * HOUR, day * 24 * HOUR + 9 * HOUR)
+            for day in range(5)
+        ]
+        duration, step, limit = rng.choice((1800, 3600, 5400)), rng.choice((900, 1800)), rng.randrange(1, 20)
+        merged = merge_busy(busy)
+
+        assert free_slots(merged, windows, duration=duration, step=step, limit=limit) == _brute_force(
+            busy, windows, duration, step, limit
+        )
+
+
+def _event(client, title, start, end, **fields):
+    response = client.post("/events", json={"title": title, "start_time": start, "end_time": end, **fields})
+    assert response.status_code == 201, response.text
+
+
+def test_finds_earliest_common_free_slots(client):
+    alice, bob = "alice.free@example.com", "bob.free@example.com"
+    reminder = {"reminder_minutes_before": 10}
+    _event(client, "Alice busy", "2035-06-04T09:00:00+08:00", "2035-06-04T10:30:00+08:00", reminder_email=alice, **reminder)
+    _event(client, "Room busy", "2035-06-04T11:00:00+08:00", "2035-06-04T12:00:00+08:00", location="Room 42")
+    # bob 的每周课程：实例的邮箱保存在 series 行上
+    series = client.post(
+        "/recurring-events",
+        json={
+            "title": "Bob course",
+            "start_time": "2035-06-04T12:00:00+08:00",
+            "end_time": "2035-06-04T17:00:00+08:00",
+            "reminder_email": bob,
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2035-06-30T00:00:00+08:00",
+            "timezone": "Asia/Shanghai",
+            **reminder,
+        },
+    )
+    assert series.status_code == 201, series.text
+
+    response = client.post(
+        "/availability/find",
+        json={
+            "participants": [alice, bob],
+            "locations": ["Room 42"],
+            "duration_minutes": 30,
+            "window_start": "2035-06-04T00:00:00+08:00",
+            "window_end": "2035-06-06T00:00:00+08:00",
+            "working_hours_start": "09:00",
+            "working_hours_end": "18:00",
+            "timezone": "Asia/Shanghai",
+            "step_minutes": 30,
+            "limit": 4,
+        },
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["busy_intervals"] == 2
+    assert [slot["start_time"] for slot in body["slots"]] == [
+        "2035-06-04T10:30:00+08:00",
+        "2035-06-04T17:00:00+08:00",
+        "2035-06-04T17:30:00+08:00",
+        "2035-06-05T09:00:00+08:00",
+    ]
+
+
+def test_rejects_oversized_window(client):
+    response = client.post(
+        "/availability/find",
+        json={
+            "duration_minutes": 30,
+            "window_start": "2035-01-01T00:00:00Z",
+            "window_end": "2035-06-01T00:00:00Z",
+        },
+    )
+    assert response.status_code == 422
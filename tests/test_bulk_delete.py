@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import crud, models
+from app.bulk_delete import BulkDeleteRunner
+
+
+def _add_events(db, category, starts):
+    for start in starts:
+        db.add(
+            models.Event(
+                title=f"{category} {start:%m-%d}",
+                category=category,
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                is_recurring=False,
+            )
+        )
+    db.commit()
+
+
+def _wait_for_job(client, location):
+    for _ in range(100):
+        job = client.get(location).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"delete job did not finish: {job}")
+
+
+def test_bulk_delete_covers_archived_events(client, db):
+    old = datetime(2001, 3, 1, 8, tzinfo=timezone.utc)
+    _add_events(db, "purge-me", [old + timedelta(days=day) for day in range(3)])
+    _add_events(db, "purge-me", [datetime(2031, 3, 1, 8, tzinfo=timezone.utc)])
+    assert crud.archive_events_batch(db, ended_before=datetime(2002, 1, 1, tzinfo=timezone.utc)) >= 3
+
+    preview = client.delete("/events/by-category", params={"category": "purge-me", "dry_run": True}).json()
+    assert preview["matched"] == 4
+    assert preview["archived"] == 3
+
+    response = client.delete("/events/by-category", params={"category": "purge-me"})
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.headers["location"])
+    assert job["status"] == "completed"
+    assert job["deleted"] == 4
+
+    listed = client.get("/events", params={"category": "purge-me"}).json()
+    assert listed == []
+    assert crud.count_matching_events(db, field="category", value="purge-me") == (0, 0)
+
+
+def test_chunks_delete_from_both_tables_in_id_order(db):
+    old = datetime(2001, 6, 1, 8, tzinfo=timezone.utc)
+    _add_events(db, "chunked", [old + timedelta(days=day) for day in range(5)])
+    crud.archive_events_batch(db, ended_before=datetime(2002, 1, 1, tzinfo=timezone.utc))
+    _add_events(db, "chunked", [datetime(2031, 6, day, 8, tzinfo=timezone.utc) for day in range(1, 6)])
+
+    job = crud.create_delete_job(db, field="category", value="chunked")
+    assert job.matched == 10
+    chunks = []
+    while job.status != "completed":
+        chunks.append(crud.delete_events_chunk(db, job, batch_size=2))
+    assert sum(chunks) == 10
+    assert max(chunks) <= 4
+
+
+def test_deleting_recurring_parent_removes_archived_instances(client, db):
+    response = client.post(
+        "/recurring-events",
+        json={
+            "title": "Archived course",
+            "start_time": "2001-09-03T08:00:00+08:00",
+            "end_time": "2001-09-03T09:40:00+08:00",
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2001-10-01T00:00:00+08:00",
+            "timezone": "Asia/Shanghai",
+        },
+    )
+    parent_id = response.json()["parent_event_id"]
+    crud.archive_events_batch(db, ended_before=datetime(2002, 1, 1, tzinfo=timezone.utc))
+    assert db.query(models.ArchivedEvent).filter(models.ArchivedEvent.parent_event_id == parent_id).count() > 0
+
+    assert client.delete(f"/events/{parent_id}").status_code == 204
+    assert db.query(models.ArchivedEvent).filter(models.ArchivedEvent.parent_event_id == parent_id).count() == 0
+
+
+def _orphan_running_job(db, category, *, heartbeat_age):
+    """模拟执行进程被杀：任务停在 running，心跳停在 heartbeat_age 之前"""
+    job = crud.create_delete_job(db, field="category", value=category)
+    assert crud.claim_delete_job(db, job.id, owner="killed-worker")
+    job.heartbeat_at = datetime.now(timezone.utc) - heartbeat_age
+    db.commit()
+    return job.id
+
+
+def test_job_of_killed_worker_is_reclaimed_and_finished(db):
+    _add_events(db, "orphaned", [datetime(2032, 2, day, 8, tzinfo=timezone.utc) for day in range(1, 6)])
+    stale = _orphan_running_job(db, "orphaned", heartbeat_age=timedelta(minutes=5))
+    runner = BulkDeleteRunner(batch_size=2, pause_seconds=0, stale_after_seconds=0.2)
+
+    async def run():
+        await runner.start()
+        await asyncio.sleep(0.3)
+        await runner.stop()
+
+    asyncio.run(run())
+    db.expire_all()
+    job = crud.get_delete_job(db, stale)
+    assert job.status == "completed"
+    assert job.claimed_by == runner.owner
+    assert job.deleted == 5
+    assert crud.count_matching_events(db, field="category", value="orphaned") == (0, 0)
+
+
+def test_live_job_is_not_taken_over(db):
+    _add_events(db, "still-running", [datetime(2032, 3, 1, 8, tzinfo=timezone.utc)])
+    live = _orphan_running_job(db, "still-running", heartbeat_age=timedelta(0))
+    runner = BulkDeleteRunner(stale_after_seconds=60)
+
+    async def run():
+        await runner.start()
+        await asyncio.sleep(0.1)
+        await runner.stop()
+
+    asyncio.run(run())
+    db.expire_all()
+    job = crud.get_delete_job(db, live)
+    assert (job.status, job.claimed_by) == ("running", "killed-worker")
+    # 清理：由当前测试认领并跑完，避免留给后续用例的巡检
+    assert crud.claim_delete_job(db, live, owner="cleanup", statuses=(), stale_before=datetime.now(timezone.utc))
+    job = crud.get_delete_job(db, live)
+    while job.status != "completed":
+        crud.delete_events_chunk(db, job)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app import channels, emailer
+
+SETTINGS = emailer.SMTPSettings(
+    host="localhost", port=25, username=None, password=None, use_tls=False, use_ssl=False, sender="a@example.com"
+)
+
+
+def test_email_delivery_runs_in_worker_threads_within_concurrency(monkeypatch):
+    lock = threading.Lock()
+    active = peak = 0
+    threads = set()
+
+    def fake_send(recipient, subject, body, settings):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+            threads.add(threading.get_ident())
+        time.sleep(0.05)  # 阻塞调用，模拟 SMTP 会话
+        with lock:
+            active -= 1
+
+    monkeypatch.setattr(emailer, "send_email", fake_send)
+    channel = channels.EmailChannel(SETTINGS, concurrency=2)
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        await asyncio.gather(*(channel.send(f"user{i}@example.com", "subject", "body", []) for i in range(6)))
+        beat.cancel()
+        return ticks, threading.get_ident()
+
+    ticks, loop_thread = asyncio.run(run())
+
+    assert peak == 2
+    assert loop_thread not in threads
+    # 三轮各约 50 ms 的阻塞发送期间事件循环仍在运行
+    assert ticks >= 5
+
+
+def test_default_channels_follow_targets():
+    event = SimpleNamespace(notification_channels=None, reminder_email=None, webhook_url="https://example.com/hook")
+    assert channels.channel_names_for(event) == ["webhook"]
+
+    event.notification_channels = "email, webhook"
+    assert channels.channel_names_for(event) == ["email", "webhook"]
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import columnar, models
+from app.negotiation import parse_qvalues
+
+
+def test_parse_qvalues_reads_weights_and_skips_invalid_entries():
+    assert parse_qvalues("text/html, Application/JSON;q=0.5;charset=utf-8, */*;q=0, bad;q=x, over;q=2") == {
+        "text/html": 1.0,
+        "application/json": 0.5,
+        "*/*": 0.0,
+    }
+    assert parse_qvalues(None) == {}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (columnar.MEDIA_TYPE, True),
+        (f"{columnar.MEDIA_TYPE}, application/json;q=0.9", True),
+        (f"{columnar.MEDIA_TYPE};q=0", False),
+        (f"{columnar.MEDIA_TYPE};q=0.0, application/json", False),
+        (f"application/json, {columnar.MEDIA_TYPE};q=0.5", False),
+        ("*/*", False),
+        ("application/*", False),
+        (None, False),
+    ],
+)
+def test_accepts_columnar(accept, expected):
+    assert columnar.accepts_columnar(accept) is expected
+
+
+def test_events_negotiate_columnar_format(client, db):
+    start = datetime(2032, 4, 1, 9, tzinfo=timezone.utc)
+    db.add(models.Event(title="columnar", start_time=start, end_time=start + timedelta(hours=1), is_recurring=False))
+    db.commit()
+    window = {"start_after": "2032-04-01T00:00:00Z", "end_before": "2032-04-02T00:00:00Z"}
+
+    response = client.get("/events", params=window, headers={"Accept": columnar.MEDIA_TYPE})
+    assert response.headers["content-type"].startswith(columnar.MEDIA_TYPE)
+    assert "Accept" in response.headers["vary"]
+    payload = response.json()
+    assert payload["count"] == 1
+    assert set(payload["columns"]) >= {"id", "series_id", "title", "start_time"}
+    assert payload["strings"][payload["columns"]["title"][0]] == "columnar"
+
+    refused = client.get("/events", params=window, headers={"Accept": f"{columnar.MEDIA_TYPE};q=0, application/json"})
+    assert refused.headers["content-type"].startswith("application/json")
+    assert [event["title"] for event in refused.json()] == ["columnar"]
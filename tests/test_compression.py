@@ -0,0 +1,46 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+
+PAYLOAD = [{"title": "压缩测试", "index": index} for index in range(200)]
+
+
+@pytest.fixture(scope="module")
+def compressed_client():
+    app = Starlette(routes=[Route("/items", lambda request: JSONResponse(PAYLOAD))])
+    app.add_middleware(CompressionMiddleware, minimum_size=256)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("*", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=0.0, identity", None),
+        ("*;q=0, identity;q=1", None),
+        ("identity", None),
+    ],
+)
+def test_response_encoding_follows_accept_encoding(compressed_client, accept_encoding, expected):
+    response = compressed_client.get("/items", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.headers.get("content-encoding") == expected
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == PAYLOAD
+
+
+def test_small_responses_are_not_compressed():
+    app = Starlette(routes=[Route("/tiny", lambda request: JSONResponse({"ok": True}))])
+    app.add_middleware(CompressionMiddleware, minimum_size=256)
+    with TestClient(app) as client:
+        response = client.get("/tiny", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"ok":true}'
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from app import diagnostics
+from app.database import query_monitor
+from app.diagnostics import SamplingProfiler
+
+TOKEN = "diagnostics-secret"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture()
+def admin(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", TOKEN)
+    yield
+    query_monitor.configure(slow_log=False, request_timing=False, slow_ms=200, capture_params=False)
+    query_monitor.entries.clear()
+
+
+def test_admin_routes_are_hidden_without_token(client):
+    assert client.get("/admin/diagnostics").status_code == 404
+    assert client.put("/admin/diagnostics/queries", json={"slow_log": True}).status_code == 404
+    assert query_monitor.slow_log is False
+
+
+def test_admin_routes_require_bearer_token(client, admin):
+    assert client.get("/admin/diagnostics").status_code == 401
+    assert client.get("/admin/diagnostics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/admin/diagnostics", headers=AUTH).json()["queries"]["slow_log"] is False
+
+
+def test_slow_query_log_records_statement_and_plan(client, admin):
+    settings = client.put(
+        "/admin/diagnostics/queries", json={"slow_log": True, "slow_ms": 0, "capture_params": True}, headers=AUTH
+    )
+    assert settings.json()["slow_log"] is True
+    client.get("/events", params={"category": "slow-log-probe"})
+
+    entries = client.get("/admin/diagnostics/slow-queries", headers=AUTH).json()
+    probe = next(entry for entry in entries if "slow-log-probe" in entry.get("parameters", ""))
+    assert probe["statement"].lstrip().upper().startswith("SELECT")
+    assert probe["engine"] == "primary"
+    assert probe["plan"]
+
+    assert client.delete("/admin/diagnostics/slow-queries", headers=AUTH).status_code == 204
+    client.put("/admin/diagnostics/queries", json={"slow_log": False}, headers=AUTH)
+    client.get("/events")
+    assert client.get("/admin/diagnostics/slow-queries", headers=AUTH).json() == []
+
+
+def test_server_timing_is_toggled_at_runtime(client, admin):
+    assert "server-timing" not in client.get("/events").headers
+
+    client.put("/admin/diagnostics/queries", json={"server_timing": True}, headers=AUTH)
+    timing = client.get("/events").headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    assert "db;dur=" in timing and 'queries"' in timing
+
+    client.put("/admin/diagnostics/queries", json={"server_timing": False}, headers=AUTH)
+    assert "server-timing" not in client.get("/events").headers
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_samples_code_running_on_the_event_loop():
+    profiler = SamplingProfiler()
+
+    async def run():
+        assert profiler.start(interval=0.005, max_seconds=5)
+        assert not profiler.start()
+        _spin(0.2)
+        await asyncio.sleep(0)
+        return profiler.stop()
+
+    collapsed = asyncio.run(run())
+    assert not profiler.running
+    spinning = [line for line in collapsed.splitlines() if "_spin (" in line and "test_diagnostics.py" in line]
+    assert spinning
+    assert all(line.split(";")[1] == "task" for line in spinning)
@@ -0,0 +1,78 @@
+def _create_series(client, title="Linear Algebra"):
+    response = client.post(
+        "/recurring-events",
+        json={
+            "title": title,
+            "location": "Room 101",
+            "start_time": "2030-03-04T08:00:00+08:00",
+            "end_time": "2030-03-04T09:40:00+08:00",
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2030-04-01T00:00:00+08:00",
+            "timezone": "Asia/Shanghai",
+        },
+    )
+    assert response.status_code == 201
+    parent_id = response.json()["parent_event_id"]
+    instances = client.get(f"/recurring-events/{parent_id}/instances").json()
+    return parent_id, instances[1]["id"]
+
+
+def test_conditional_get_returns_304_for_unchanged_event(client):
+    created = client.post(
+        "/events",
+        json={"title": "Seminar", "start_time": "2030-01-01T10:00:00Z", "end_time": "2030-01-01T11:00:00Z"},
+    ).json()
+    first = client.get(f"/events/{created['id']}")
+    etag = first.headers["etag"]
+
+    assert client.get(f"/events/{created['id']}", headers={"If-None-Match": etag}).status_code == 304
+    assert (
+        client.get(
+            f"/events/{created['id']}", headers={"If-Modified-Since": first.headers["last-modified"]}
+        ).status_code
+        == 304
+    )
+
+    client.patch(f"/events/{created['id']}", json={"title": "Seminar (moved)"})
+    changed = client.get(f"/events/{created['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["title"] == "Seminar (moved)"
+
+
+def test_series_edit_invalidates_instance_validators(client):
+    parent_id, instance_id = _create_series(client)
+    etag = client.get(f"/events/{instance_id}").headers["etag"]
+
+    assert client.patch(f"/recurring-events/{parent_id}", json={"title": "Linear Algebra II"}).status_code == 200
+
+    response = client.get(f"/events/{instance_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Linear Algebra II"
+    assert response.headers["etag"] != etag
+
+
+def test_list_responses_must_be_revalidated(client):
+    window = {"start_after": "2030-01-01T00:00:00Z", "end_before": "2030-01-02T00:00:00Z"}
+    for params in (window, {**window, "tz": "Asia/Shanghai"}):
+        response = client.get("/events", params=params, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["cache-control"] == "private, no-cache"
+        vary = {value.strip() for value in response.headers["vary"].split(",")}
+        assert {"Accept", "Accept-Encoding"} <= vary
+
+
+def test_not_modified_response_repeats_validators(client):
+    created = client.post(
+        "/events",
+        json={"title": "Validators", "start_time": "2030-01-03T10:00:00Z", "end_time": "2030-01-03T11:00:00Z"},
+    ).json()
+    first = client.get(f"/events/{created['id']}")
+    weak = first.headers["etag"]
+    assert weak.startswith('W/"')
+
+    # If-None-Match 使用弱比较，去掉 W/ 前缀或混在列表中都匹配
+    for header in (weak[2:], f'"other", {weak}'):
+        cached = client.get(f"/events/{created['id']}", headers={"If-None-Match": header})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == weak
+        assert cached.headers["last-modified"] == first.headers["last-modified"]
+        assert cached.content == b""
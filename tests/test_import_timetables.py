@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+SCRIPT = os.path.join(ROOT, "scripts", "import_timetables.py")
+
+WEEKLY = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:course-1@example.com
+SUMMARY:Compilers
+LOCATION:Room 3
+DESCRIPTION:Lexing and
+  parsing
+DTSTART;TZID=Asia/Shanghai:20380301T080000
+DTEND;TZID=Asia/Shanghai:20380301T094000
+RRULE:FREQ=WEEKLY;COUNT=4
+BEGIN:VALARM
+TRIGGER:-PT20M
+DESCRIPTION:Alarm text
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:talk-1@example.com
+SUMMARY:Guest talk
+DTSTART:20380305T060000Z
+DTEND:20380305T070000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+# 同一课程从另一份导出中再次出现，另有一个 DTEND 早于 DTSTART 的事件
+OVERLAPPING = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:course-1@example.com
+SUMMARY:Compilers (copy)
+DTSTART;TZID=Asia/Shanghai:20380301T080000
+DTEND;TZID=Asia/Shanghai:20380301T094000
+RRULE:FREQ=WEEKLY;COUNT=4
+END:VEVENT
+BEGIN:VEVENT
+UID:broken@example.com
+SUMMARY:Backwards
+DTSTART:20380306T100000Z
+DTEND:20380306T090000Z
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def _exports(tmp_path):
+    directory = tmp_path / "exports"
+    (directory / "nested").mkdir(parents=True)
+    (directory / "a.ics").write_text(WEEKLY)
+    (directory / "nested" / "b.ics").write_text(OVERLAPPING)
+    return directory
+
+
+def _run(tmp_path, *args):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'import.db'}"}
+    return subprocess.run(
+        [sys.executable, SCRIPT, str(_exports(tmp_path)), "--workers", "2", *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_ndjson_output_dedupes_uids_and_reports_bad_events(tmp_path):
+    result = _run(tmp_path, "--ndjson", "-", "--reminder-email", "me@example.com")
+
+    assert result.returncode == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line["path"] for line in lines] == ["/recurring-events", "/events"]
+    course = lines[0]["body"]
+    assert course["title"] == "Compilers"
+    assert course["description"] == "Lexing and parsing"
+    assert course["start_time"] == "2038-03-01T00:00:00+00:00"
+    assert course["timezone"] == "Asia/Shanghai"
+    assert course["recurrence_frequency"] == "weekly"
+    assert course["recurrence_count"] == 4
+    assert course["reminder_minutes_before"] == 20
+    assert "1 duplicate UIDs skipped" in result.stderr
+    assert "b.ics: VEVENT #2 (broken@example.com): DTEND is not after DTSTART" in result.stderr
+
+
+def test_database_import_writes_series_and_instances(tmp_path):
+    result = _run(tmp_path)
+
+    assert result.returncode == 1, result.stderr
+    assert "2 imported as 5 occurrences" in result.stderr
+    with sqlite3.connect(tmp_path / "import.db") as connection:
+        (series_id, title, rule, reminder), = connection.execute(
+            "SELECT id, title, recurrence_rule, reminder_minutes_before FROM series"
+        ).fetchall()
+        rows = connection.execute(
+            "SELECT id, parent_event_id, start_time FROM events WHERE series_id = ? ORDER BY start_time", (series_id,)
+        ).fetchall()
+        single = connection.execute("SELECT title FROM events WHERE series_id IS NULL").fetchall()
+    assert title == "Compilers"
+    assert "COUNT=4" in rule
+    assert len(rows) == 4
+    assert {parent for _, parent, _ in rows} == {rows[0][0]}
+    assert single == [("Guest talk",)]
+    # 未指定 --reminder-email 时 VALARM 不转换为提醒
+    assert reminder is None
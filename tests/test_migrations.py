@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app import models
+from app.database import engine
+from app.migrations import normalize_series
+
+FIRST = datetime(2037, 9, 1, 8, tzinfo=timezone.utc)
+
+
+def _insert_legacy_series(title, weeks=3):
+    """旧版本写入的系列：每个实例行都复制一份共享字段，没有 series_id"""
+    events = models.Event.__table__
+    shared = {"title": title, "location": "Hall A", "category": "course", "is_recurring": True}
+    with engine.begin() as connection:
+        ids = []
+        for week in range(weeks):
+            start = FIRST + timedelta(weeks=week)
+            ids.append(
+                connection.execute(
+                    events.insert().values(**shared, start_time=start, end_time=start + timedelta(hours=1))
+                ).inserted_primary_key[0]
+            )
+        connection.execute(update(events).where(events.c.id.in_(ids)).values(parent_event_id=ids[0]))
+        # 单独修改过地点的实例
+        connection.execute(update(events).where(events.c.id == ids[-1]).values(location="Hall B"))
+    return ids
+
+
+def test_legacy_rows_are_moved_into_the_series_table(client):
+    ids = _insert_legacy_series("Legacy optics")
+
+    counts = normalize_series(engine)
+    assert counts["series_created"] == 1
+    assert counts["rows_linked"] == 3
+
+    events = models.Event.__table__
+    with engine.connect() as connection:
+        rows = connection.execute(select(events).where(events.c.id.in_(ids)).order_by(events.c.id)).mappings().all()
+    assert len({row["series_id"] for row in rows}) == 1
+    assert [row["title"] for row in rows] == [None, None, None]
+    assert [row["location"] for row in rows] == [None, None, "Hall B"]
+
+    # 读取时由 series 补全，单独修改的值保留
+    rendered = [client.get(f"/events/{event_id}").json() for event_id in ids]
+    assert [event["title"] for event in rendered] == ["Legacy optics"] * 3
+    assert [event["location"] for event in rendered] == ["Hall A", "Hall A", "Hall B"]
+
+    assert normalize_series(engine)["series_created"] == 0
+
+
+def test_series_edit_reaches_migrated_instances(client):
+    ids = _insert_legacy_series("Legacy acoustics")
+    normalize_series(engine)
+
+    response = client.patch(f"/recurring-events/{ids[0]}", json={"title": "Acoustics", "location": "Hall C"})
+    assert response.status_code == 200
+
+    rendered = [client.get(f"/events/{event_id}").json() for event_id in ids]
+    assert [event["title"] for event in rendered] == ["Acoustics"] * 3
+    assert [event["location"] for event in rendered] == ["Hall C", "Hall C", "Hall B"]
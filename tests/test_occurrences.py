@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from app.occurrences import OccurrenceCache, to_intervals
+
+DTSTART = datetime(2025, 9, 15, 0, 30, tzinfo=timezone.utc)
+DURATION = timedelta(minutes=95)
+
+
+def test_repeated_expansion_is_served_from_cache():
+    cache = OccurrenceCache()
+    first = cache.starts("FREQ=WEEKLY;COUNT=4", DTSTART, DURATION, tz="Asia/Shanghai")
+    again = cache.starts("FREQ=WEEKLY;COUNT=4", DTSTART, DURATION, tz="Asia/Shanghai")
+
+    assert again is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [start for start, _ in to_intervals(first, DURATION)] == [
+        DTSTART + timedelta(weeks=week) for week in range(4)
+    ]
+
+
+def test_changed_rule_is_a_new_key():
+    cache = OccurrenceCache()
+    cache.starts("FREQ=WEEKLY;COUNT=4", DTSTART, DURATION)
+
+    assert len(cache.starts("FREQ=WEEKLY;COUNT=2", DTSTART, DURATION)) == 2
+    assert len(cache.starts("FREQ=DAILY;COUNT=4", DTSTART, DURATION)) == 4
+    assert cache.misses == 3
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = OccurrenceCache(maxsize=2)
+    for count in (1, 2):
+        cache.starts(f"FREQ=DAILY;COUNT={count}", DTSTART, DURATION)
+    cache.starts("FREQ=DAILY;COUNT=1", DTSTART, DURATION)
+    cache.starts("FREQ=DAILY;COUNT=3", DTSTART, DURATION)
+
+    assert len(cache) == 2
+    cache.starts("FREQ=DAILY;COUNT=1", DTSTART, DURATION)
+    assert cache.hits == 2
+    cache.starts("FREQ=DAILY;COUNT=2", DTSTART, DURATION)
+    assert cache.misses == 4
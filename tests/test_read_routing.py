@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import read_routing
+from app.read_routing import STICKY_COOKIE, ReadYourWritesMiddleware, reads_from_primary
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+async def read(request: Request) -> JSONResponse:
+    return JSONResponse({"primary": reads_from_primary(request)})
+
+
+async def write(request: Request) -> JSONResponse:
+    return JSONResponse({}, status_code=int(request.query_params.get("status", "201")))
+
+
+@pytest.fixture()
+def routed_client(monkeypatch):
+    monkeypatch.setattr(read_routing, "READ_REPLICA", True)
+    app = Starlette(
+        routes=[
+            Route("/items", read, methods=["GET"]),
+            Route("/items", write, methods=["POST"]),
+            Route("/availability/find", write, methods=["POST"]),
+        ]
+    )
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=30)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_reads_go_to_replica_until_client_writes(routed_client):
+    assert routed_client.get("/items").json() == {"primary": False}
+
+    response = routed_client.post("/items")
+    assert STICKY_COOKIE in response.cookies
+    assert float(response.cookies[STICKY_COOKIE]) > time.time() + 25
+    assert routed_client.get("/items").json() == {"primary": True}
+
+    # 其他客户端（没有 Cookie）仍读副本
+    routed_client.cookies.clear()
+    assert routed_client.get("/items").json() == {"primary": False}
+
+
+def test_failed_and_read_only_posts_do_not_pin_reads(routed_client):
+    assert STICKY_COOKIE not in routed_client.post("/items", params={"status": "409"}).cookies
+    assert STICKY_COOKIE not in routed_client.post("/availability/find").cookies
+    assert routed_client.get("/items").json() == {"primary": False}
+
+
+def test_expired_cookie_reads_from_replica(routed_client):
+    routed_client.cookies.set(STICKY_COOKIE, f"{time.time() - 1:.3f}")
+    assert routed_client.get("/items").json() == {"primary": False}
+
+
+def test_without_replica_everything_reads_primary(client):
+    response = client.post(
+        "/events",
+        json={"title": "No replica", "start_time": "2039-01-01T08:00:00Z", "end_time": "2039-01-01T09:00:00Z"},
+    )
+    assert STICKY_COOKIE not in response.cookies
+
+
+def test_read_only_sqlite_engine_serves_reads_and_rejects_writes(tmp_path):
+    database = tmp_path / "replica.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "DATABASE_READ_URL": f"sqlite:///file:{database}?mode=ro&uri=true",
+        "REMINDER_WAKEUP": "off",
+        "REMINDER_POLL_INTERVAL": "3600",
+        "RATE_LIMIT_PER_SECOND": "0",
+        "REMINDER_LEASE_FILE": str(tmp_path / "reminder.lock"),
+        "REMINDER_SEND_LOG": str(tmp_path / "send.log"),
+        "ARCHIVE_LEASE_FILE": str(tmp_path / "archive.lock"),
+    }
+    script = """
+import sqlalchemy
+from fastapi.testclient import TestClient
+from app.database import ReadSessionLocal
+from app.main import app
+
+with TestClient(app) as client:
+    created = client.post(
+        "/events",
+        json={"title": "Replica", "start_time": "2039-01-01T08:00:00Z", "end_time": "2039-01-01T09:00:00Z"},
+    )
+    assert created.status_code == 201, created.text
+    assert "read_primary_until" in created.cookies
+    assert client.get(f"/events/{created.json()['id']}").json()["title"] == "Replica"
+    client.cookies.clear()
+    assert client.get(f"/events/{created.json()['id']}").status_code == 200
+
+with ReadSessionLocal() as db:
+    try:
+        db.execute(sqlalchemy.text("DELETE FROM events"))
+    except sqlalchemy.exc.OperationalError as exc:
+        print("rejected:", exc.orig)
+"""
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert "rejected: attempt to write a readonly database" in result.stdout
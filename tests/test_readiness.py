@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+from app import main
+from app.lease import FileLease
+from app.scheduler import ReminderDispatcher
+
+
+def test_health_and_ready(client):
+    assert client.get("/health").json() == {"status": "ok"}
+
+    ready = client.get("/ready")
+    assert ready.status_code == 200
+    body = ready.json()
+    assert body["status"] == "ready"
+    assert body["database"] == "ok"
+    assert body["dispatcher"]["running"] is True
+
+
+def test_draining_worker_is_not_ready(client, monkeypatch):
+    monkeypatch.setitem(main.app_state, "draining", True)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+    # 存活检查不受影响，负载均衡只是不再派发新请求
+    assert client.get("/health").status_code == 200
+
+
+def test_lease_is_exclusive_until_released(workdir):
+    path = os.path.join(workdir, "exclusive.lock")
+    first, second = FileLease(path), FileLease(path)
+
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_stopping_dispatcher_hands_over_the_lease(workdir):
+    lease_path = os.path.join(workdir, "reminder.lock")
+    old, new = (
+        ReminderDispatcher(
+            poll_interval_seconds=0.05,
+            send_log_path=os.path.join(workdir, f"{name}.log"),
+            lease_path=lease_path,
+            channels={},
+        )
+        for name in ("old", "new")
+    )
+
+    async def run():
+        await old.start()
+        await new.start()
+        await asyncio.sleep(0.15)
+        assert old.is_leader and not new.is_leader
+        await old.stop()
+        await asyncio.sleep(0.15)
+        assert new.is_leader
+        await new.stop()
+        assert not new.is_leader
+
+    asyncio.run(run())
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app import crud, schemas
+from app.utils import to_zone
+
+
+def _weekly_across_dst_end(timezone_name=None):
+    # 柏林 2033-10-30 结束夏令时：09:00 本地时间在此前为 07:00 UTC，此后为 08:00 UTC
+    return schemas.RecurringEventCreate(
+        title="weekly standup",
+        start_time=datetime(2033, 10, 20, 7, tzinfo=timezone.utc),
+        end_time=datetime(2033, 10, 20, 7, 30, tzinfo=timezone.utc),
+        recurrence_frequency="weekly",
+        recurrence_end_date=datetime(2033, 11, 11, tzinfo=timezone.utc),
+        timezone=timezone_name,
+    )
+
+
+def _utc_hours(events):
+    return [event.start_time.astimezone(timezone.utc).hour for event in events]
+
+
+def test_expansion_keeps_local_wall_time_across_dst(db):
+    events = crud.create_recurring_event(db, _weekly_across_dst_end("Europe/Berlin"))
+
+    assert _utc_hours(events) == [7, 7, 8, 8]
+    assert events[0].series.timezone == "Europe/Berlin"
+
+
+def test_missing_timezone_defaults_to_default_timezone(db, monkeypatch):
+    monkeypatch.setattr(crud, "DEFAULT_TIMEZONE", "Europe/Berlin")
+
+    events = crud.create_recurring_event(db, _weekly_across_dst_end())
+
+    assert _utc_hours(events) == [7, 7, 8, 8]
+    assert events[0].series.timezone == "Europe/Berlin"
+
+
+def test_unknown_timezone_is_rejected():
+    with pytest.raises(ValueError):
+        _weekly_across_dst_end("Mars/Olympus_Mons")
+
+
+def test_cached_offsets_match_zoneinfo_around_transitions():
+    zone = ZoneInfo("Europe/Berlin")
+    # 覆盖 2033-10-30 01:00 UTC 的切换点前后，步长与 15 分钟分桶错开
+    instant = datetime(2033, 10, 29, 23, 0, 7, tzinfo=timezone.utc)
+    while instant < datetime(2033, 10, 30, 3, tzinfo=timezone.utc):
+        assert to_zone(instant, "Europe/Berlin").utcoffset() == instant.astimezone(zone).utcoffset(), instant
+        instant += timedelta(minutes=7)
+
+
+def test_events_render_in_requested_timezone(client):
+    client.post(
+        "/events",
+        json={"title": "rendered", "start_time": "2034-07-01T06:00:00Z", "end_time": "2034-07-01T07:00:00Z"},
+    )
+    window = {"start_after": "2034-07-01T00:00:00Z", "end_before": "2034-07-02T00:00:00Z"}
+
+    utc = client.get("/events", params=window).json()
+    local = client.get("/events", params={**window, "tz": "Europe/Berlin"}).json()
+    assert [event["start_time"] for event in local] == ["2034-07-01T08:00:00+02:00"]
+    assert datetime.fromisoformat(local[0]["start_time"]) == datetime.fromisoformat(
+        utc[0]["start_time"].replace("Z", "+00:00")
+    )
+    assert client.get("/events", params={**window, "tz": "Nowhere/City"}).status_code == 400
+
+
+def _create_series(client, **overrides):
+    body = {
+        "title": "数据库系统",
+        "location": "107",
+        "start_time": "2034-03-06T08:30:00+08:00",
+        "end_time": "2034-03-06T10:05:00+08:00",
+        "recurrence_frequency": "weekly",
+        "recurrence_end_date": "2034-05-01T00:00:00Z",
+        "timezone": "Asia/Shanghai",
+        **overrides,
+    }
+    response = client.post("/recurring-events", json=body)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_create_series_returns_summary_only(client):
+    summary = _create_series(client)
+
+    assert summary["instance_count"] == 8
+    assert summary["title"] == "数据库系统"
+    assert summary["recurrence_rule"].startswith("FREQ=WEEKLY")
+    assert summary["first_start_time"].startswith("2034-03-06T00:30:00")
+    assert summary["last_start_time"].startswith("2034-04-24T00:30:00")
+    assert any(event["id"] == summary["parent_event_id"] for event in client.get("/recurring-events").json())
+
+
+def test_instances_are_windowed_and_paginated(client):
+    parent_id = _create_series(client)["parent_event_id"]
+    url = f"/recurring-events/{parent_id}/instances"
+
+    window = client.get(url, params={"start_after": "2034-03-20T00:00:00Z", "end_before": "2034-04-04T00:00:00Z"})
+    assert [event["start_time"][:10] for event in window.json()] == ["2034-03-20", "2034-03-27", "2034-04-03"]
+
+    pages = [client.get(url, params={"offset": offset, "limit": 3}).json() for offset in (0, 3, 6)]
+    assert [len(page) for page in pages] == [3, 3, 2]
+    ids = [event["id"] for page in pages for event in page]
+    assert ids[0] == parent_id
+    assert len(set(ids)) == 8
+
+
+def test_instances_of_unknown_series_are_not_found(client):
+    single = client.post(
+        "/events",
+        json={"title": "one-off", "start_time": "2034-03-06T08:00:00Z", "end_time": "2034-03-06T09:00:00Z"},
+    ).json()
+
+    assert client.get(f"/recurring-events/{single['id']}/instances").status_code == 404
+    assert client.get("/recurring-events/999999/instances").status_code == 404
+
+
+def test_recurrence_ending_before_start_is_rejected(client):
+    response = client.post(
+        "/recurring-events",
+        json={
+            "title": "never",
+            "start_time": "2034-03-06T08:00:00Z",
+            "end_time": "2034-03-06T09:00:00Z",
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2034-01-01T00:00:00Z",
+        },
+    )
+    assert response.status_code == 422
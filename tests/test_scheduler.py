@@ -0,0 +1,226 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event as sa_event
+
+from app import models
+from app.channels import Channel
+from app.database import engine
+from app.scheduler import ReminderDispatcher
+from app.sendlog import SendLog, reminder_key
+
+
+class RecordingChannel(Channel):
+    name = "webhook"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sent = []
+
+    def target_for(self, event):
+        return event.webhook_url
+
+    async def _deliver(self, target, subject, body, events):
+        self.sent.extend(event.id for event in events)
+
+
+def _due_event(db, title):
+    # 提醒在30秒前到期，位于调度器的回看窗口内
+    start = datetime.now(timezone.utc) + timedelta(minutes=9, seconds=30)
+    event = models.Event(
+        title=title,
+        start_time=start,
+        end_time=start + timedelta(hours=1),
+        reminder_minutes_before=10,
+        webhook_url="https://hooks.example.com/reminders",
+        is_recurring=False,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+def _dispatcher(workdir, channel):
+    return ReminderDispatcher(
+        poll_interval_seconds=0.05,
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        channels={"webhook": channel},
+    )
+
+
+def test_dispatcher_delivers_and_marks_sent(db, workdir):
+    event = _due_event(db, "Office hours")
+    channel = RecordingChannel()
+    dispatcher = _dispatcher(workdir, channel)
+
+    async def run():
+        await dispatcher.start()
+        await asyncio.sleep(0.3)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert channel.sent == [event.id]
+    db.refresh(event)
+    assert event.reminder_sent
+
+
+def test_standby_takes_over_without_resending_crashed_leaders_reminders(db, workdir):
+    event = _due_event(db, "Thesis defence")
+    leader_channel, standby_channel = RecordingChannel(), RecordingChannel()
+    leader = _dispatcher(workdir, leader_channel)
+    # 在主节点仍存活时创建（并加载发送日志）
+    standby = _dispatcher(workdir, standby_channel)
+
+    async def run():
+        assert leader._lease.acquire()
+        await standby.start()
+        await asyncio.sleep(0.1)
+        assert not standby.is_leader
+        # 主节点已投递，但在批量 UPDATE 提交前退出
+        leader._send_log.record([f"{reminder_key(event)}:webhook"])
+        leader._lease.release()
+        await asyncio.sleep(0.3)
+        assert standby.is_leader
+        await standby.stop()
+
+    asyncio.run(run())
+    assert standby_channel.sent == []
+    db.refresh(event)
+    assert event.reminder_sent
+    assert len(SendLog(os.path.join(workdir, "send.log"))) == 0
+
+
+def test_send_log_survives_reopen(workdir):
+    path = os.path.join(workdir, "send.log")
+    log = SendLog(path)
+    log.record(["1:100:10:email", "2:200:10:webhook"])
+    log.retain(lambda key: key.startswith("2:"))
+
+    reopened = SendLog(path)
+    assert "2:200:10:webhook" in reopened
+    assert "1:100:10:email" not in reopened
+
+
+class RecordingEmailChannel(RecordingChannel):
+    name = "email"
+
+    def target_for(self, event):
+        return event.reminder_email
+
+
+def _digest_events():
+    start = datetime(2035, 1, 7, 8, tzinfo=timezone.utc)
+    rows = [
+        (1, "alice@example.com", start),
+        (2, "alice@example.com", start + timedelta(minutes=10)),
+        (3, "alice@example.com", start + timedelta(minutes=20)),
+        (4, "bob@example.com", start),
+        (5, "alice@example.com", start + timedelta(hours=3)),
+    ]
+    return [
+        models.Event(
+            id=event_id,
+            title=f"lecture {event_id}",
+            start_time=begin,
+            end_time=begin + timedelta(minutes=45),
+            reminder_minutes_before=15,
+            reminder_email=recipient,
+            is_recurring=False,
+        )
+        for event_id, recipient, begin in rows
+    ]
+
+
+def test_digest_groups_reminders_per_recipient_and_window(workdir):
+    dispatcher = ReminderDispatcher(
+        digest=True,
+        digest_window_minutes=30,
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        channels={"email": RecordingEmailChannel()},
+    )
+
+    deliveries = dispatcher._plan_deliveries(_digest_events())
+
+    grouped = sorted((delivery.target, [event.id for event in delivery.events]) for delivery in deliveries)
+    assert grouped == [
+        ("alice@example.com", [1, 2, 3]),
+        ("alice@example.com", [5]),
+        ("bob@example.com", [4]),
+    ]
+    digest = next(delivery for delivery in deliveries if len(delivery.events) == 3)
+    assert all(f"lecture {event_id}" in digest.body for event_id in (1, 2, 3))
+
+
+def test_without_digest_every_reminder_is_sent_separately(workdir):
+    dispatcher = ReminderDispatcher(
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        channels={"email": RecordingEmailChannel()},
+    )
+
+    deliveries = dispatcher._plan_deliveries(_digest_events())
+
+    assert sorted(event.id for delivery in deliveries for event in delivery.events) == [1, 2, 3, 4, 5]
+    assert all(len(delivery.events) == 1 for delivery in deliveries)
+
+
+def test_batch_is_marked_sent_with_one_update(db, workdir):
+    events = [_due_event(db, f"Batch reminder {index}") for index in range(5)]
+    channel = RecordingChannel()
+    dispatcher = _dispatcher(workdir, channel)
+    updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE EVENTS"):
+            updates.append(statement)
+
+    sa_event.listen(engine, "before_cursor_execute", count_updates)
+    try:
+        asyncio.run(dispatcher._dispatch_once(datetime.now(timezone.utc)))
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", count_updates)
+
+    assert {item.id for item in events} <= set(channel.sent)
+    assert len(updates) == 1
+    for item in events:
+        db.refresh(item)
+        assert item.reminder_sent
+
+
+class FlakyEmailChannel(RecordingEmailChannel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.failures = 1
+
+    async def _deliver(self, target, subject, body, events):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("SMTP server unavailable")
+        await super()._deliver(target, subject, body, events)
+
+
+def test_failed_channel_is_retried_without_resending_delivered_ones(db, workdir):
+    item = _due_event(db, "Two channels")
+    item.notification_channels = "email,webhook"
+    item.reminder_email = "two.channels@example.com"
+    db.commit()
+    webhook, email = RecordingChannel(), FlakyEmailChannel()
+    dispatcher = ReminderDispatcher(
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        channels={"webhook": webhook, "email": email},
+    )
+
+    asyncio.run(dispatcher._dispatch_once(datetime.now(timezone.utc)))
+    db.refresh(item)
+    assert not item.reminder_sent
+    assert item.id in webhook.sent and item.id not in email.sent
+
+    asyncio.run(dispatcher._dispatch_once(datetime.now(timezone.utc)))
+    db.refresh(item)
+    assert item.reminder_sent
+    assert webhook.sent.count(item.id) == 1
+    assert email.sent.count(item.id) == 1
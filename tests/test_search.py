@@ -0,0 +1,64 @@
+def _create(client, title, **fields):
+    response = client.post(
+        "/events",
+        json={"title": title, "start_time": "2036-05-01T08:00:00Z", "end_time": "2036-05-01T09:00:00Z", **fields},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _search(client, query):
+    return client.get("/events/search", params={"q": query}).json()
+
+
+def test_matches_any_field_with_highlighted_snippet(client):
+    by_title = _create(client, "Zephyrine planning")
+    by_location = _create(client, "Weekly sync", location="Zephyrine hall")
+    by_description = _create(client, "Retro", description="notes on the zephyrine rollout")
+
+    hits = _search(client, "zephyrine")
+
+    assert {hit["event"]["id"] for hit in hits} == {by_title, by_location, by_description}
+    assert all("[" in hit["snippet"] and "]" in hit["snippet"] for hit in hits)
+    ranks = [hit["rank"] for hit in hits]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+def test_chinese_substrings_and_short_queries(client):
+    event_id = _create(client, "计算机网络实验", location="信息楼")
+
+    assert [hit["event"]["id"] for hit in _search(client, "网络实验")] == [event_id]
+    for short in ("网络", "楼"):
+        hits = _search(client, short)
+        assert event_id in [hit["event"]["id"] for hit in hits], short
+
+
+def test_index_follows_updates_and_deletes(client):
+    event_id = _create(client, "Quillfeather review")
+    assert [hit["event"]["id"] for hit in _search(client, "Quillfeather")] == [event_id]
+
+    client.patch(f"/events/{event_id}", json={"title": "Inkwell review"})
+    assert _search(client, "Quillfeather") == []
+    assert [hit["event"]["id"] for hit in _search(client, "Inkwell")] == [event_id]
+
+    client.delete(f"/events/{event_id}")
+    assert _search(client, "Inkwell") == []
+
+
+def test_series_rename_reaches_every_instance(client):
+    summary = client.post(
+        "/recurring-events",
+        json={
+            "title": "Marzipan seminar",
+            "start_time": "2036-06-02T08:00:00Z",
+            "end_time": "2036-06-02T09:00:00Z",
+            "recurrence_frequency": "weekly",
+            "recurrence_end_date": "2036-06-20T00:00:00Z",
+            "timezone": "UTC",
+        },
+    ).json()
+    assert len(_search(client, "Marzipan")) == summary["instance_count"] == 3
+
+    client.patch(f"/recurring-events/{summary['parent_event_id']}", json={"title": "Nougat seminar"})
+    assert _search(client, "Marzipan") == []
+    assert len(_search(client, "Nougat")) == 3
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+from app.clock import VirtualClock
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+START = datetime(2030, 9, 1, tzinfo=timezone.utc)
+
+
+def test_wait_jumps_to_the_deadline_without_sleeping():
+    clock = VirtualClock(START)
+
+    async def run():
+        return await clock.wait(asyncio.Event(), 3600)
+
+    assert asyncio.run(run()) is False
+    assert clock.now() == START + timedelta(hours=1)
+
+
+def test_scheduled_callback_runs_at_its_virtual_time_and_ends_the_wait():
+    clock = VirtualClock(START)
+    woken_at = []
+
+    async def run():
+        event = asyncio.Event()
+
+        def write():
+            woken_at.append(clock.now())
+            event.set()
+
+        clock.call_at(START + timedelta(minutes=10), write)
+        return await clock.wait(event, 3600)
+
+    assert asyncio.run(run()) is True
+    assert woken_at == [START + timedelta(minutes=10)]
+    assert clock.now() == START + timedelta(minutes=10)
+
+
+def test_time_stops_at_freeze_point():
+    clock = VirtualClock(START, freeze_at=START + timedelta(minutes=30))
+
+    async def run():
+        event = asyncio.Event()
+        assert await clock.wait(event, 600) is False
+        waiter = asyncio.ensure_future(clock.wait(event, 3600))
+        await clock.frozen.wait()
+        event.set()
+        return await waiter
+
+    assert asyncio.run(run()) is True
+    assert clock.now() == START + timedelta(minutes=30)
+
+
+def test_simulated_day_has_no_missed_or_duplicate_reminders():
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(ROOT, "scripts", "simulate_reminders.py"),
+            "--events", "100", "--series", "10", "--late-writes", "20", "--recipients", "10", "--days", "1",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "missed:     0" in result.stdout
+    assert "duplicate:  0" in result.stdout
+    assert "early:      0" in result.stdout
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, text
+
+from app.database import run_migrations_once
+from app.startup import StartupProfile
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_migration_runs_only_when_fingerprint_changes(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    calls = []
+
+    def migrate():
+        calls.append(1)
+
+    assert run_migrations_once(bind, migrate, extra="v1") is True
+    assert run_migrations_once(bind, migrate, extra="v1") is False
+    assert len(calls) == 1
+
+    # 功能开关变化也使指纹过期
+    assert run_migrations_once(bind, migrate, extra="v2") is True
+    assert len(calls) == 2
+    with bind.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM schema_state")).scalar() == 1
+
+
+def test_import_does_not_load_delivery_or_template_modules(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'cold.db'}",
+        "REMINDER_WAKEUP": "off",
+    }
+    script = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('smtplib', 'jinja2', 'urllib.request') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_startup_profile_records_phases(capsys):
+    profile = StartupProfile(True)
+    with profile.phase("load"):
+        import json  # noqa: F401
+    profile.report()
+
+    assert [name for name, _, _ in profile.phases] == ["load"]
+    report = capsys.readouterr().err
+    assert "load" in report and "time to ready" in report
+
+
+def test_disabled_profile_records_nothing(capsys):
+    profile = StartupProfile(False)
+    with profile.phase("load"):
+        pass
+    profile.report()
+
+    assert profile.phases == []
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import crud, models, stats
+from app.database import engine
+
+YEAR_START = datetime(2003, 1, 1, tzinfo=timezone.utc)
+YEAR_END = datetime(2004, 1, 1, tzinfo=timezone.utc)
+
+
+def _add(db, category, start, hours=1):
+    db.add(
+        models.Event(
+            title=category,
+            category=category,
+            start_time=start,
+            end_time=start + timedelta(hours=hours),
+            is_recurring=False,
+        )
+    )
+    db.commit()
+
+
+def _bucket(rows, key):
+    return next(((count, seconds) for bucket, count, seconds in rows if bucket == key), (0, 0.0))
+
+
+def test_stats_cache_is_invalidated_by_writes(client, db):
+    _add(db, "cached", datetime(2030, 5, 1, 9, tzinfo=timezone.utc))
+    first = client.get("/stats", params={"group_by": "category"}).json()["buckets"]
+    _add(db, "cached", datetime(2030, 5, 2, 9, tzinfo=timezone.utc))
+    second = client.get("/stats", params={"group_by": "category"}).json()["buckets"]
+
+    count = {bucket["key"]: bucket["event_count"] for bucket in first}["cached"]
+    assert {bucket["key"]: bucket["event_count"] for bucket in second}["cached"] == count + 1
+
+
+def test_raw_and_rollup_agree_after_archiving(db, monkeypatch):
+    monkeypatch.setattr(stats, "ROLLUP_ENABLED", True)
+    stats.ensure_rollup(engine)
+    for day in range(4):
+        _add(db, "consistent", YEAR_START + timedelta(days=30 * day, hours=8), hours=2)
+    assert crud.archive_events_batch(db, ended_before=YEAR_START + timedelta(days=45)) >= 2
+
+    raw = stats._raw_stats(db, "category", YEAR_START, YEAR_END, None)
+    rollup = stats._rollup_stats(db, "category", YEAR_START, YEAR_END, None)
+    # julianday() 的运算精度约为1毫秒
+    assert _bucket(raw, "consistent") == (4, pytest.approx(4 * 7200.0, abs=0.01))
+    assert _bucket(rollup, "consistent") == (4, pytest.approx(4 * 7200.0, abs=0.01))
+
+    # 不按整天对齐的窗口走原始表聚合，同样计入已归档的行
+    source, rows = stats.compute_stats(
+        db, group_by="category", start_after=YEAR_START + timedelta(hours=1), end_before=YEAR_END
+    )
+    assert source == "events"
+    assert _bucket(rows, "consistent") == (4, pytest.approx(4 * 7200.0, abs=0.01))
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from app import crud, schemas, wakeup
+from app.channels import Channel
+from app.scheduler import ReminderDispatcher
+
+
+class RecordingChannel(Channel):
+    name = "webhook"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sent = []
+
+    def target_for(self, event):
+        return event.webhook_url
+
+    async def _deliver(self, target, subject, body, events):
+        self.sent.extend(event.id for event in events)
+
+
+def _create_due_event(db, title):
+    start = datetime.now(timezone.utc) + timedelta(minutes=9, seconds=30)
+    return crud.create_event(
+        db,
+        schemas.EventCreate(
+            title=title,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            reminder_minutes_before=10,
+            webhook_url="https://hooks.example.com/wakeup",
+        ),
+    )
+
+
+def _dispatcher(workdir, channel, listener):
+    # 轮询与对账间隔都远长于测试，只有唤醒能让调度器及时发送
+    return ReminderDispatcher(
+        poll_interval_seconds=3600,
+        reconcile_interval_seconds=3600,
+        send_log_path=os.path.join(workdir, "send.log"),
+        lease_path=os.path.join(workdir, "reminder.lock"),
+        channels={"webhook": channel},
+        wakeup=listener,
+    )
+
+
+def _sent_after_write(db, workdir, title):
+    channel = RecordingChannel()
+    dispatcher = _dispatcher(workdir, channel, wakeup.WakeupListener())
+
+    async def run():
+        await dispatcher.start()
+        await asyncio.sleep(0.1)  # 第一次扫描后进入长睡眠
+        event = _create_due_event(db, title)
+        await asyncio.sleep(0.3)
+        await dispatcher.stop()
+        return event
+
+    event = asyncio.run(run())
+    # 未发送的到期提醒不留给后续用例的调度器
+    crud.delete_event(db, event=event)
+    return event.id in channel.sent
+
+
+def test_write_wakes_sleeping_dispatcher(db, workdir, monkeypatch):
+    monkeypatch.setattr(wakeup, "BACKEND", "local")
+
+    assert _sent_after_write(db, workdir, "Woken reminder")
+
+
+def test_without_wakeups_dispatcher_sleeps_until_next_scan(db, workdir, monkeypatch):
+    monkeypatch.setattr(wakeup, "BACKEND", "off")
+
+    assert not _sent_after_write(db, workdir, "Unannounced reminder")
+
+
+def test_rolled_back_write_does_not_wake(db, monkeypatch):
+    monkeypatch.setattr(wakeup, "BACKEND", "local")
+    woken = []
+
+    async def run():
+        listener = wakeup.WakeupListener()
+        await listener.start(lambda: woken.append(1))
+        wakeup.publish(db)
+        db.rollback()
+        await asyncio.sleep(0.05)
+        wakeup.publish(db)
+        db.commit()
+        await asyncio.sleep(0.05)
+        await listener.stop()
+
+    asyncio.run(run())
+    assert woken == [1]
+
+
+def test_unix_listener_receives_datagrams_from_other_workers(tmp_path):
+    woken = asyncio.Event()
+
+    async def run():
+        listener = wakeup.UnixSocketListener(str(tmp_path))
+        await listener.start(woken.set)
+        (path,) = [str(entry) for entry in tmp_path.glob("*.sock")]
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.sendto(b"1", path)
+        await asyncio.wait_for(woken.wait(), 1)
+        await listener.stop()
+        return path
+
+    path = asyncio.run(run())
+    assert not os.path.exists(path)